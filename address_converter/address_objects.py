@@ -1,12 +1,63 @@
+import threading
+import weakref
+
+
 LETTER = "литера"
 
 
 class AddrObject(object):
+    """Immutable address object
+
+    Use AddrObject.intern to share equal objects, e.g. the same region
+    in many addresses.
+    """
+    __slots__ = ("aoguid", "name", "type_obj", "postalcode", "__weakref__")
+
+    _pool = weakref.WeakValueDictionary()
+    _pool_lock = threading.Lock()
+
     def __init__(self, aoguid, name, type_obj, postalcode):
-        self.aoguid = aoguid
-        self.name = name
-        self.type_obj = type_obj
-        self.postalcode = postalcode
+        object.__setattr__(self, "aoguid", aoguid)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "type_obj", type_obj)
+        object.__setattr__(self, "postalcode", postalcode)
+
+    @classmethod
+    def intern(cls, aoguid, name, type_obj, postalcode):
+        """Get the shared object with the aoguid, create it if it is absent
+        """
+        with cls._pool_lock:
+            addrobj = cls._pool.get(aoguid)
+            if (addrobj is None
+                    or addrobj.name != name
+                    or addrobj.type_obj != type_obj
+                    or addrobj.postalcode != postalcode):
+                addrobj = cls(aoguid, name, type_obj, postalcode)
+                cls._pool[aoguid] = addrobj
+            return addrobj
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AddrObject is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("AddrObject is immutable")
+
+    def __reduce__(self):
+        return (AddrObject.intern,
+                (self.aoguid, self.name, self.type_obj, self.postalcode))
+
+    def __eq__(self, other):
+        return (isinstance(other, AddrObject)
+                and self.aoguid == other.aoguid
+                and self.name == other.name
+                and self.type_obj == other.type_obj
+                and self.postalcode == other.postalcode)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.aoguid)
 
     def __str__(self):
         return "{0} - {1}".format(self.aoguid, self.name)
@@ -16,21 +67,40 @@ class AddrObject(object):
 
 
 class Address(object):
-    def __init__(self):
-        self._addr_path = ()
-        self.house_num = 0
-        self.house_num_liter = ""
-
-    @property
-    def postalcode(self):
-        """Get the postal code from the last address in the list
-        """
-        if any(self.addr_path):
-            return self.addr_path[-1].postalcode
-        else:
-            return ''
+    """Immutable address: a path of address objects and a house number
+    """
+    __slots__ = ("addr_path", "house_num", "house_num_liter",
+                 "postalcode", "_address_string")
+
+    def __init__(self, addr_path=(), house_num=0, house_num_liter=""):
+        addr_path = tuple(
+            [v for v in addr_path if isinstance(v, AddrObject)])
+        object.__setattr__(self, "addr_path", addr_path)
+        object.__setattr__(self, "house_num", house_num)
+        object.__setattr__(self, "house_num_liter", house_num_liter)
+        # the postal code from the last address in the list
+        object.__setattr__(
+            self, "postalcode", addr_path[-1].postalcode if any(addr_path)
+            else '')
+        object.__setattr__(self, "_address_string", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Address is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Address is immutable")
+
+    def __reduce__(self):
+        return (Address,
+                (self.addr_path, self.house_num, self.house_num_liter))
 
     def calc_address_string(self):
+        if self._address_string is None:
+            object.__setattr__(
+                self, "_address_string", self._calc_address_string())
+        return self._address_string
+
+    def _calc_address_string(self):
         result = ", ".join(
             ["{0} {1}".format(addrobj.type_obj, addrobj.name)
              for addrobj in self.addr_path])
@@ -41,12 +111,3 @@ class Address(object):
         if self.postalcode:
             result += ", {0}".format(self.postalcode)
         return result
-
-    @property
-    def addr_path(self):
-        return self._addr_path
-
-    @addr_path.setter
-    def addr_path(self, value):
-        self._addr_path = tuple(
-            [v for v in value if isinstance(v, AddrObject)])
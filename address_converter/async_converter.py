@@ -0,0 +1,190 @@
+from .converter import Converter
+from .neo4j_query_creator import QUERY_ERRORS, QueryExecutor
+from .metrics import BUILD_QUERY_STAGE, EXECUTE_STAGE
+from .config import config
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import asyncio
+import logging
+
+
+class AsyncQueryExecutor(object):
+    """Query executor for asyncio code
+
+    The neo4j.v1 driver has no asyncio interface, so the queries run
+    in a bounded thread pool on the pooled QueryExecutor.
+    max_workers limits the number of queries in flight.
+    """
+    def __init__(self,
+                 server_address,
+                 login,
+                 password,
+                 max_workers=16,
+                 **kwargs):
+        """Create AsyncQueryExecutor
+
+        Args:
+            kwargs: pool arguments of QueryExecutor
+        """
+        self._executor = QueryExecutor(
+            server_address, login, password, **kwargs)
+        self._max_workers = max_workers
+
+    async def __aenter__(self):
+        self._executor.__enter__()
+        self._pool = ThreadPoolExecutor(self._max_workers)
+        return self
+
+    async def __aexit__(self, exception_type, exception_value, traceback):
+        await self.close()
+
+    async def close(self):
+        self._pool.shutdown()
+        self._executor.close()
+
+    async def execute_query(self, query, params=None):
+        assert hasattr(self, "_pool"), "At first create a driver"
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool, self._executor.execute_query, query, params)
+
+
+class AsyncConverter(object):
+    """Converter for asyncio code
+
+    It wraps a Converter, so the parsing, the result cache, ranking
+    and metrics are the same as in Converter.convert. The synchronous
+    methods of Converter are not available: they can not run on
+    the async executor.
+
+    Parsing and spell checking run in parse_executor (the default
+    executor of the loop if it is None), queries run concurrently
+    on AsyncQueryExecutor.
+    """
+    def __init__(self,
+                 spellchecker=None,
+                 queryExecutor=None,
+                 stop_words_list=None,
+                 write_error_log=False,
+                 parse_executor=None,
+                 **kwargs):
+        """Create AsyncConverter
+
+        Args:
+            kwargs: the other arguments of Converter
+        """
+        queryExecutor = queryExecutor \
+            or AsyncQueryExecutor(
+                config.NEO4J_SERVER_ADDRESS,
+                config.NEO4J_SERVER_LOGIN,
+                config.NEO4J_SERVER_PASSWORD,
+                max_pool_size=config.NEO4J_MAX_POOL_SIZE,
+                acquisition_timeout=config.NEO4J_ACQUISITION_TIMEOUT,
+                max_retries=config.NEO4J_MAX_RETRIES)
+        self._converter = Converter(
+            spellchecker,
+            queryExecutor,
+            stop_words_list,
+            write_error_log,
+            **kwargs)
+        self.executor = queryExecutor
+        self.write_error_log = write_error_log
+        self.parse_executor = parse_executor
+
+
+    async def __aenter__(self):
+        await self.executor.__aenter__()
+        return self
+
+
+    async def __aexit__(self, exception_type, exception_value, traceback):
+        await self.aclose()
+
+
+    async def aclose(self):
+        await self.executor.close()
+
+
+    async def execute_query(self, query, params=None):
+        result = await self._execute_query(query, params)
+        return [] if result is None else result
+
+
+    async def _execute_query(self, query, params):
+        """Execute the query, return None if the query failed
+        """
+        try:
+            if params is None:
+                return await self.executor.execute_query(query)
+            return await self.executor.execute_query(query, params)
+        except QUERY_ERRORS:
+            if self.write_error_log:
+                logging.error(
+                    'An error occurred while processing query:\n{0}'.format(
+                        query))
+        return None
+
+
+    async def convert(self,
+                      address,
+                      addrobj_only=True,
+                      is_check_grammar=False,
+                      top_k=None):
+        """Convert the address into the list of Address objects
+
+        Args:
+            see Converter.convert
+        """
+        converter = self._converter
+        stats = converter._start_stats(address)
+        parsed = await asyncio.get_running_loop().run_in_executor(
+            self.parse_executor,
+            converter._parse_recorded,
+            address,
+            addrobj_only,
+            is_check_grammar,
+            stats)
+        key, result = converter._get_cached_result(
+            parsed, addrobj_only, is_check_grammar, top_k, stats)
+        if result is not None:
+            return result
+
+        with stats.measure(BUILD_QUERY_STAGE):
+            query, params = converter._build_top_k_query(parsed, top_k)
+        with stats.measure(EXECUTE_STAGE):
+            query_result = await self._execute_query(query, params)
+        if query_result == [] and converter._is_narrowed_by_names(parsed):
+            with stats.measure(BUILD_QUERY_STAGE):
+                query, params = converter._build_top_k_query(
+                    parsed, top_k, with_names=False)
+            with stats.measure(EXECUTE_STAGE):
+                query_result = await self._execute_query(query, params)
+        return converter._finish_convert(
+            parsed, top_k, key, query, query_result, stats)
+
+
+    async def aconvert_stream(self, addresses, concurrency=16, **kwargs):
+        """Convert addresses from an async iterable concurrently
+
+        Args:
+            addresses: an async iterable of address strings
+            concurrency: int, the maximal number of conversions in flight
+            kwargs: arguments of AsyncConverter.convert
+        Yields:
+            pairs of the address and the list of Address objects,
+            in input order
+        """
+        assert concurrency > 0
+        pending = deque()
+        try:
+            async for address in addresses:
+                pending.append((address, asyncio.ensure_future(
+                    self.convert(address, **kwargs))))
+                if len(pending) >= concurrency:
+                    address, task = pending.popleft()
+                    yield address, await task
+            while any(pending):
+                address, task = pending.popleft()
+                yield address, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
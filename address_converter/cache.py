@@ -0,0 +1,196 @@
+from collections import OrderedDict, namedtuple
+import json
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class CacheInfo(namedtuple(
+        "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])):
+    __slots__ = ()
+
+    @property
+    def hit_rate(self):
+        requests = self.hits + self.misses
+        return float(self.hits) / requests if requests else 0.0
+
+
+class LRUCache(object):
+    """Thread-safe cache with the least recently used eviction
+    """
+    def __init__(self, maxsize, ttl=None, timer=time.monotonic):
+        """Create LRUCache
+
+        Args:
+            maxsize: int, the maximal number of the cached values
+            ttl: float, seconds a value lives in the cache, None for ever
+            timer: function returning the current time in seconds
+        """
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= self._timer():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires = None if self.ttl is None else self._timer() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_if(self, predicate):
+        """Remove all values whose key matches the predicate
+        """
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def invalidate_items_if(self, predicate):
+        """Remove all values for which predicate(key, value) is true
+        """
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items()
+                        if predicate(k, v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                self.maxsize,
+                len(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+class SqliteCache(object):
+    """Thread-safe on-disk cache in a sqlite database
+
+    Keys are stored as json, so they must consist of strings, numbers,
+    lists and tuples; values are pickled.
+    """
+    def __init__(self, filename, ttl=None, timer=time.time):
+        """Create SqliteCache
+
+        Args:
+            filename: str, the database file
+            ttl: float, seconds a value lives in the cache, None for ever
+            timer: function returning the current time in seconds
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires FROM cache WHERE key = ?",
+                (json.dumps(key),)).fetchone()
+            if row is None or (row[1] is not None
+                               and row[1] <= self._timer()):
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        expires = None if self.ttl is None else self._timer() + self.ttl
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (json.dumps(key), value, expires))
+
+    def invalidate(self, key):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM cache WHERE key = ?", (json.dumps(key),))
+
+    def invalidate_if(self, predicate):
+        """Remove all values whose key matches the predicate
+
+        Keys are passed to the predicate as they are loaded from json,
+        so tuples become lists.
+        """
+        with self._lock, self._connection:
+            keys = [(k,) for (k,) in self._connection.execute(
+                "SELECT key FROM cache") if predicate(json.loads(k))]
+            self._connection.executemany(
+                "DELETE FROM cache WHERE key = ?", keys)
+
+    def invalidate_items_if(self, predicate):
+        """Remove all values for which predicate(key, value) is true
+
+        Every value is unpickled, so it is slower than invalidate_if.
+        """
+        with self._lock, self._connection:
+            keys = [(k,) for (k, v) in self._connection.execute(
+                "SELECT key, value FROM cache")
+                if predicate(json.loads(k), pickle.loads(v))]
+            self._connection.executemany(
+                "DELETE FROM cache WHERE key = ?", keys)
+
+    def purge_expired(self):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM cache WHERE expires <= ?", (self._timer(),))
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM cache")
+
+    def close(self):
+        self._connection.close()
+
+    def info(self):
+        with self._lock:
+            currsize = self._connection.execute(
+                "SELECT COUNT(*) FROM cache").fetchone()[0]
+            return CacheInfo(self.hits, self.misses, 0, None, currsize)
+
+    def __len__(self):
+        return self.info().currsize
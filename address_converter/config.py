@@ -12,10 +12,23 @@ class Config(object):
         co = ConfigObj(abs_config_filename, encoding='UTF8')
         self.SPELLCHECKER_DICT_FILENAME = co['spellchecker_dict_filename']
         self.COUNTED_DICT_FILENAME = co['counted_dict_filename']
+        self.SPELLCHECKER_SNAPSHOT_FILENAME = \
+            co['spellchecker_snapshot_filename']
+        self.SPELLCHECKER_BACKEND = co['spellchecker_backend']
+        self.SPELLCHECKER_CACHE_SIZE = int(co['spellchecker_cache_size'])
+        self.SPELLCHECKER_MAX_OPERATIONS = \
+            int(co['spellchecker_max_operations']) or None
+        self.SPELLCHECKER_TIME_BUDGET = \
+            float(co['spellchecker_time_budget']) or None
         self.STOP_WORDS_LIST_FILENAME = co['stop_words_list_filename']
         self.NEO4J_SERVER_ADDRESS = co['neo4j_server_address']
         self.NEO4J_SERVER_LOGIN = co['neo4j_login']
         self.NEO4J_SERVER_PASSWORD = co['neo4j_password']
+        self.NEO4J_MAX_POOL_SIZE = int(co['neo4j_max_pool_size'])
+        self.NEO4J_ACQUISITION_TIMEOUT = \
+            float(co['neo4j_acquisition_timeout'])
+        self.NEO4J_MAX_RETRIES = int(co['neo4j_max_retries'])
+        self.SLOW_QUERY_THRESHOLD = float(co['slow_query_threshold'])
         self.ERROR_LOG_FILENAME = co['error_log_filename']
 
 config = Config()
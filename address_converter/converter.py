@@ -1,14 +1,26 @@
 from .parser import (
     create_stop_words_list,
     clean_address_names_list,
-    parse_address_names,
-    parse_house_nums,
-    parse_postcode)
+    tokenize_address)
 from .neo4j_query_creator import (
+    QUERY_ERRORS,
     QueryExecutor,
+    MIX_STRATEGY,
     create_query,
-    convert_to_addr_objects)
+    create_batch_item,
+    create_batch_query,
+    convert_to_addr_objects,
+    convert_to_grouped_addr_objects,
+    iter_addr_objects)
 from .spellcheck import SpellChecker
+from .ranking import Ranker
+from .metrics import (
+    NULL_STATS,
+    PARSE_STAGE,
+    SPELLCHECK_STAGE,
+    BUILD_QUERY_STAGE,
+    EXECUTE_STAGE,
+    MATERIALIZE_STAGE)
 from .config import config
 import logging
 
@@ -18,22 +30,66 @@ class Converter(object):
                  spellchecker=None,
                  queryExecutor=None,
                  stop_words_list=None,
-                 write_error_log=False):
-        self.spellchecker = spellchecker \
-            or SpellChecker.create(
-                config.SPELLCHECKER_DICT_FILENAME,
-                config.COUNTED_DICT_FILENAME)
+                 write_error_log=False,
+                 parametrized_queries=False,
+                 match_strategy=MIX_STRATEGY,
+                 node_max_num=2,
+                 result_cache=None,
+                 metrics=None,
+                 prefilter=None,
+                 ranker=None,
+                 rank_oversampling=4,
+                 recognizer=None):
+        """Create Converter
+
+        Args:
+            parametrized_queries: bool, pass the values as the query
+                            parameters, it is always on for the executors
+                            with requires_params, e.g. MemoryGraph
+            result_cache: a cache of the conversion results, e.g.
+                            LRUCache or SqliteCache. Results are cached
+                            by the cleaned address names, house numbers,
+                            postal codes and the conversion flags.
+            metrics: ConverterMetrics, measure the stages of convert
+            prefilter: prefilter.RootIndex, start the search at the
+                            regions found by the postal codes or names
+            ranker: ranking.Ranker, score the results if top_k is given,
+                            by default it uses the counted dictionary
+                            of the spellchecker
+            rank_oversampling: int, the query returns top_k multiplied
+                            by it best rows for ranking
+            recognizer: recognizer.AddressRecognizer, drop the address
+                            object types from the names and skip
+                            the address objects of the other types
+                            of the same levels
+        """
+        self.spellchecker = spellchecker or _create_spellchecker()
 
         self.executor = queryExecutor \
             or QueryExecutor(
                 config.NEO4J_SERVER_ADDRESS,
                 config.NEO4J_SERVER_LOGIN,
-                config.NEO4J_SERVER_PASSWORD)
+                config.NEO4J_SERVER_PASSWORD,
+                config.NEO4J_MAX_POOL_SIZE,
+                config.NEO4J_ACQUISITION_TIMEOUT,
+                config.NEO4J_MAX_RETRIES)
 
-        self.stop_words_list = stop_words_list \
-            or create_stop_words_list(config.STOP_WORDS_LIST_FILENAME)
+        self.stop_words_list = frozenset(
+            stop_words_list
+            or create_stop_words_list(config.STOP_WORDS_LIST_FILENAME))
 
         self.write_error_log = write_error_log
+        self.parametrized_queries = parametrized_queries \
+            or getattr(self.executor, "requires_params", False)
+        self.match_strategy = match_strategy
+        self.node_max_num = node_max_num
+        self.result_cache = result_cache
+        self.metrics = metrics
+        self.prefilter = prefilter
+        self.ranker = ranker or Ranker(
+            getattr(self.spellchecker, "counted_dict", None))
+        self.rank_oversampling = rank_oversampling
+        self.recognizer = recognizer
         logging.basicConfig(
             format=u'%(filename)s[LINE:%(lineno)d]# %(levelname)-8s [%(asctime)s]  %(message)s',
             level=logging.ERROR,
@@ -57,33 +113,404 @@ class Converter(object):
         self.executor.close()
 
 
-    def execute_query(self, query):
-        result = []
+    def execute_query(self, query, params=None):
+        result = self._execute_query(query, params)
+        return [] if result is None else result
+
+
+    def _execute_query(self, query, params):
+        """Execute the query, return None if the query failed
+
+        The query without parameters is executed as execute_query(query),
+        so the executors without params still work.
+        """
         try:
-            result = self.executor.execute_query(query)
-        except:
+            if params is None:
+                return self.executor.execute_query(query)
+            return self.executor.execute_query(query, params)
+        except QUERY_ERRORS:
             if self.write_error_log:
                 logging.error('An error occurred while processing \
                               query:\n{0}'.format(query))
-        return result
+        return None
 
 
-    def convert(self,
-                address,
-                addrobj_only=True,
-                is_check_grammar=False):
-        addr_objects = parse_address_names(address)
-        postcodes = parse_postcode(address)
-        nums = [] if addrobj_only else parse_house_nums(address)
+    def _parse(self,
+               address,
+               addrobj_only,
+               is_check_grammar,
+               stats=NULL_STATS):
+        with stats.measure(PARSE_STAGE):
+            if self.recognizer is not None:
+                addr_objects, nums, postcodes, socrnames = \
+                    self.recognizer.recognize(
+                        address, with_house_nums=not addrobj_only)
+            else:
+                addr_objects, nums, postcodes = tokenize_address(
+                    address, with_house_nums=not addrobj_only)
+                socrnames = []
+            # biggestword of the graph is in lower case
+            addr_objects = [name.lower() for name in addr_objects]
+            if addrobj_only:
+                nums = []
 
         if is_check_grammar:
-            addr_objects = self.spellchecker.check_words(addr_objects)
+            with stats.measure(SPELLCHECK_STAGE):
+                addr_objects = self.spellchecker.check_words(addr_objects)
+
+        with stats.measure(PARSE_STAGE):
+            if self.recognizer is not None and is_check_grammar:
+                # the corrected words can be types
+                addr_objects, corrected = \
+                    self.recognizer.split_types(addr_objects)
+                socrnames = sorted(set(socrnames) | set(corrected))
+            addr_objects = clean_address_names_list(
+                addr_objects, self.stop_words_list)
+        return addr_objects, nums, postcodes, socrnames
+
 
+    def _create_query(self, address, addrobj_only, is_check_grammar):
+        return self._build_query(*self._parse(
+            address, addrobj_only, is_check_grammar))
+
+
+    def _build_query(self,
+                     addr_objects,
+                     nums,
+                     postcodes,
+                     socrnames=None,
+                     output_limit=100,
+                     order_by_score=False,
+                     with_names=True):
+        roots = None
+        if self.prefilter is not None:
+            roots = self.prefilter.find_roots(
+                addr_objects if with_names else [], postcodes)
         query = create_query(
-            clean_address_names_list(addr_objects, self.stop_words_list),
+            addr_objects,
             nums,
-            postcodes)
+            postcodes,
+            node_max_num=self.node_max_num,
+            output_limit=output_limit,
+            parametrized=self.parametrized_queries,
+            match_strategy=self.match_strategy,
+            roots=roots,
+            order_by_score=order_by_score,
+            excluded_socrnames=self._exclude_types(socrnames))
+        return query if self.parametrized_queries else (query, None)
+
+
+    def _exclude_types(self, socrnames):
+        if self.recognizer is None or not socrnames:
+            return None
+        return self.recognizer.exclude_types(socrnames)
+
+
+    def convert(self,
+                address,
+                addrobj_only=True,
+                is_check_grammar=False,
+                top_k=None):
+        """Convert the address into the list of Address objects
+
+        Args:
+            addrobj_only: bool, do not search houses
+            is_check_grammar: bool, check spelling of the address names
+            top_k: int, return only this number of the best results
+                            sorted by the score of ranker
+        """
+        stats = self._start_stats(address)
+        parsed = self._parse_recorded(
+            address, addrobj_only, is_check_grammar, stats)
+        key, result = self._get_cached_result(
+            parsed, addrobj_only, is_check_grammar, top_k, stats)
+        if result is not None:
+            return result
+
+        with stats.measure(BUILD_QUERY_STAGE):
+            query, params = self._build_top_k_query(parsed, top_k)
+        with stats.measure(EXECUTE_STAGE):
+            query_result = self._execute_query(query, params)
+        if query_result == [] and self._is_narrowed_by_names(parsed):
+            with stats.measure(BUILD_QUERY_STAGE):
+                query, params = self._build_top_k_query(
+                    parsed, top_k, with_names=False)
+            with stats.measure(EXECUTE_STAGE):
+                query_result = self._execute_query(query, params)
+        return self._finish_convert(
+            parsed, top_k, key, query, query_result, stats)
+
+
+    def _parse_recorded(self, address, addrobj_only, is_check_grammar, stats):
+        """Parse the address, the conversion failed in parsing is
+        recorded in metrics with the error of its stage
+        """
+        try:
+            return self._parse(address, addrobj_only, is_check_grammar, stats)
+        except Exception:
+            self._record_stats(stats)
+            raise
+
+
+    def _start_stats(self, address):
+        return NULL_STATS if self.metrics is None \
+            else self.metrics.start(address)
+
 
-        query_result = self.execute_query(query)
-        result = convert_to_addr_objects(query_result)
+    def _get_cached_result(self,
+                           parsed,
+                           addrobj_only,
+                           is_check_grammar,
+                           top_k,
+                           stats):
+        """Look up the parsed address in result_cache
+
+        Results:
+            the cache key and the list of Address objects or None
+        """
+        if self.result_cache is None:
+            return None, None
+        addr_objects, nums, postcodes, socrnames = parsed
+        key = _create_cache_key(
+            addr_objects, nums, postcodes, addrobj_only,
+            is_check_grammar, top_k, socrnames)
+        result = self.result_cache.get(key)
+        if result is None:
+            return key, None
+        self._record_stats(stats, cached=True)
+        return key, list(result)
+
+
+    def _build_top_k_query(self, parsed, top_k, with_names=True):
+        if top_k is None:
+            return self._build_query(*parsed, with_names=with_names)
+        return self._build_query(
+            *parsed,
+            output_limit=top_k * self.rank_oversampling,
+            order_by_score=True,
+            with_names=with_names)
+
+
+    def _is_narrowed_by_names(self, parsed):
+        """Check that the query starts only at the roots found by
+        the names of the address
+
+        A name of the address can be the name of a region used for
+        a street, e.g. "ул Московская", so the narrowed query can miss
+        the address. Its empty result is checked by the query without
+        these roots.
+        """
+        if self.prefilter is None:
+            return False
+        addr_objects, _, postcodes, _ = parsed
+        return (self.prefilter.find_roots([], postcodes) is None
+                and self.prefilter.find_roots(
+                    addr_objects, postcodes) is not None)
+
+
+    def _finish_convert(self, parsed, top_k, key, query, query_result, stats):
+        """Rank and materialize the query result, cache it and record
+        the stats, query_result is None if the query failed
+        """
+        addr_objects, nums, postcodes, _ = parsed
+        if query_result is None:
+            stats.add_error(EXECUTE_STAGE)
+        with stats.measure(MATERIALIZE_STAGE):
+            records = query_result
+            if top_k is not None:
+                records = self.ranker.rank(
+                    query_result, addr_objects, nums, postcodes, top_k)
+            result = convert_to_addr_objects(records)
+        if self.result_cache is not None and query_result is not None:
+            self.result_cache.put(key, tuple(result))
+        self._record_stats(stats, query, len(query_result or []))
         return result
+
+
+    def _record_stats(self, stats, query=None, records=0, cached=False):
+        if self.metrics is None:
+            return
+        stats.query = query
+        stats.records = records
+        stats.cached = cached
+        self.metrics.record(stats)
+
+
+    def iter_convert(self,
+                     address,
+                     addrobj_only=True,
+                     is_check_grammar=False,
+                     first=None):
+        """Convert the address yielding Address objects as records arrive
+
+        If the executor has the method stream_query, records are read
+        lazily and closing the generator discards the rest of the result.
+        As in convert, the result is looked up in result_cache and
+        the conversion is recorded in metrics. The result is cached only
+        if it is read to the end and not cut by first.
+
+        Args:
+            first: int, return at most this number of addresses
+        Yields:
+            Address objects
+        """
+        stats = self._start_stats(address)
+        parsed = self._parse_recorded(
+            address, addrobj_only, is_check_grammar, stats)
+        key, result = self._get_cached_result(
+            parsed, addrobj_only, is_check_grammar, None, stats)
+        if result is not None:
+            for address in result[:first]:
+                yield address
+            return
+
+        with_names_list = [True]
+        if self._is_narrowed_by_names(parsed):
+            with_names_list.append(False)
+        stream_query = getattr(
+            self.executor, "stream_query", self.executor.execute_query)
+        result = []
+        query = None
+        try:
+            for with_names in with_names_list:
+                with stats.measure(BUILD_QUERY_STAGE):
+                    query, params = self._build_query(
+                        *parsed, output_limit=first or 100,
+                        with_names=with_names)
+                records = None
+                try:
+                    # reading the records is measured as the execution
+                    with stats.measure(EXECUTE_STAGE):
+                        records = stream_query(query) if params is None \
+                            else stream_query(query, params)
+                        addresses = iter_addr_objects(records)
+                        address = next(addresses, None)
+                    while address is not None:
+                        result.append(address)
+                        yield address
+                        with stats.measure(EXECUTE_STAGE):
+                            address = next(addresses, None)
+                except QUERY_ERRORS:
+                    if self.write_error_log:
+                        logging.error('An error occurred while processing \
+                                      query:\n{0}'.format(query))
+                    return
+                finally:
+                    if hasattr(records, "close"):
+                        records.close()
+                if result:
+                    break
+            # the whole result is read, so it is the result of convert
+            if self.result_cache is not None and (
+                    first is None or len(result) < min(first, 100)):
+                self.result_cache.put(key, tuple(result))
+        finally:
+            self._record_stats(stats, query, len(result))
+
+
+    def convert_many(self,
+                     addresses,
+                     addrobj_only=True,
+                     is_check_grammar=False,
+                     batch_size=100):
+        """Convert addresses sending one query per batch
+
+        The batch query matches the words as sets over the whole graph,
+        so match_strategy and prefilter are not used. Results are taken
+        from and put into result_cache as by convert. With metrics each
+        address is counted with its parse stages; the batch query is
+        shared, so its stages are not attributed to the addresses.
+
+        Args:
+            addresses: an iterable of address strings
+            addrobj_only: bool, do not search houses
+            is_check_grammar: bool, check spelling of the address names
+            batch_size: int, a number of addresses in one query
+        Yields:
+            the list of Address objects for each address, in input order
+        """
+        assert batch_size > 0
+        batch = []
+        for address in addresses:
+            batch.append(address)
+            if len(batch) >= batch_size:
+                for result in self._convert_batch(
+                        batch, addrobj_only, is_check_grammar):
+                    yield result
+                batch = []
+        if batch:
+            for result in self._convert_batch(
+                    batch, addrobj_only, is_check_grammar):
+                yield result
+
+
+    def _convert_batch(self, addresses, addrobj_only, is_check_grammar):
+        results = [None] * len(addresses)
+        batch = []
+        keys = {}
+        all_stats = {}
+        for index, address in enumerate(addresses):
+            stats = NULL_STATS if self.metrics is None \
+                else self.metrics.start(address)
+            addr_objects, nums, postcodes, socrnames = self._parse_recorded(
+                address, addrobj_only, is_check_grammar, stats)
+            if self.result_cache is not None:
+                keys[index] = _create_cache_key(
+                    addr_objects, nums, postcodes, addrobj_only,
+                    is_check_grammar, socrnames=socrnames)
+                result = self.result_cache.get(keys[index])
+                if result is not None:
+                    results[index] = list(result)
+                    self._record_stats(stats, cached=True)
+                    continue
+            all_stats[index] = stats
+            batch.append(create_batch_item(
+                index, addr_objects, nums, postcodes,
+                self._exclude_types(socrnames)))
+
+        query, params = create_batch_query(batch, self.node_max_num)
+        query_result = self._execute_query(query, params) \
+            if any(query) else []
+        grouped = convert_to_grouped_addr_objects(
+            query_result, len(addresses))
+        for index, stats in all_stats.items():
+            results[index] = grouped[index]
+            if query_result is None:
+                stats.add_error(EXECUTE_STAGE)
+            elif self.result_cache is not None:
+                self.result_cache.put(keys[index], tuple(grouped[index]))
+            self._record_stats(
+                stats, query or None, len(grouped[index]))
+        return results
+
+
+def _create_cache_key(addr_objects,
+                      nums,
+                      postcodes,
+                      addrobj_only,
+                      is_check_grammar,
+                      top_k=None,
+                      socrnames=()):
+    return (tuple(addr_objects),
+            tuple(sorted(nums)),
+            tuple(postcodes),
+            addrobj_only,
+            is_check_grammar,
+            top_k,
+            tuple(socrnames))
+
+
+def _create_spellchecker():
+    if config.SPELLCHECKER_SNAPSHOT_FILENAME:
+        return SpellChecker.load_snapshot(
+            config.SPELLCHECKER_SNAPSHOT_FILENAME,
+            config.SPELLCHECKER_CACHE_SIZE,
+            max_operations=config.SPELLCHECKER_MAX_OPERATIONS,
+            time_budget=config.SPELLCHECKER_TIME_BUDGET)
+    return SpellChecker.create(
+        config.SPELLCHECKER_DICT_FILENAME,
+        config.COUNTED_DICT_FILENAME,
+        config.SPELLCHECKER_CACHE_SIZE,
+        config.SPELLCHECKER_BACKEND,
+        max_operations=config.SPELLCHECKER_MAX_OPERATIONS,
+        time_budget=config.SPELLCHECKER_TIME_BUDGET)
@@ -0,0 +1,466 @@
+"""Apply the FIAS delta without the full rebuild
+
+The delta files have the format of the full FIAS files. Address objects
+are grouped by aoguid: an object with an actual record is new or changed,
+an object with only historical records is retired. Houses and house
+intervals are matched by the parent, the number or the interval.
+
+The delta is applied to the graph by batched MERGE and DETACH DELETE
+queries (CypherDeltaWriter) or to MemoryGraph (MemoryGraphDeltaWriter).
+Both of them delete a retired address object with its descendants.
+The frequencies of the counted dictionary are changed by the words of
+the old and the new names, and only the affected entries of the converter
+caches are dropped. The spellchecker snapshot is read-only, rebuild it
+by snapshot.py from the updated counted dictionary.
+
+Apply:
+    python -m address_converter.delta --addrobj AS_ADDROBJ.XML
+        --house AS_HOUSE.XML --houseint AS_HOUSEINT.XML
+        --counted <counted json> --pwl <pwl file>
+"""
+from .importer import (
+    ADDROBJ_TAG,
+    HOUSE_TAG,
+    HOUSE_INT_TAG,
+    PARENT_REL,
+    ThroughputReporter,
+    _ADDROBJ_QUERY,
+    create_addrobj_node,
+    create_house_node,
+    create_house_int_node,
+    iter_records)
+from .memory_graph import ADDROBJ_LABEL, HOUSE_LABEL, HOUSE_INT_LABEL
+from .parser import parse_address_names
+from collections import Counter, namedtuple
+from collections.abc import MutableMapping
+import argparse
+import datetime
+import io
+import json
+import os
+import sys
+
+
+WordChanges = namedtuple("WordChanges", ["changed", "added", "removed"])
+
+
+class FiasDelta(object):
+    """Changes of the FIAS delta
+
+    Attributes:
+        addrobjs: dict, the aoguid to the node of the new or changed
+                        address object
+        retired: the set of the aoguids of the retired address objects
+        houses: the list of the new House and HouseInt nodes
+        retired_houses: the list of the retired House and HouseInt nodes
+    """
+    def __init__(self):
+        self.addrobjs = {}
+        self.retired = set()
+        self.houses = []
+        self.retired_houses = []
+
+    @staticmethod
+    def read(addrobj_filenames=(),
+             house_filenames=(),
+             house_int_filenames=(),
+             reporter=None):
+        """Read the delta from the FIAS XML or DBF files
+
+        Args:
+            reporter: importer.ThroughputReporter
+        """
+        delta = FiasDelta()
+        sources = [
+            (addrobj_filenames, ADDROBJ_TAG, delta.add_addrobj_record),
+            (house_filenames, HOUSE_TAG, delta.add_house_record),
+            (house_int_filenames, HOUSE_INT_TAG, delta.add_house_int_record)]
+        for filenames, tag, add_record in sources:
+            for filename in filenames:
+                if reporter is not None:
+                    reporter.start(os.path.basename(filename))
+                for record in iter_records(filename, tag):
+                    add_record(record)
+                    if reporter is not None:
+                        reporter.add()
+                if reporter is not None:
+                    reporter.report()
+        return delta
+
+    def add_addrobj_record(self, record):
+        node = create_addrobj_node(record, actual_only=True)
+        if node is not None:
+            self.addrobjs[node["aoguid"]] = node
+            self.retired.discard(node["aoguid"])
+        elif record["AOGUID"] not in self.addrobjs:
+            self.retired.add(record["AOGUID"])
+
+    def add_house_record(self, record):
+        self._add_house(create_house_node(record, actual_only=True),
+                        create_house_node, record)
+
+    def add_house_int_record(self, record):
+        self._add_house(create_house_int_node(record, actual_only=True),
+                        create_house_int_node, record)
+
+    def _add_house(self, node, create_node, record):
+        if node is not None:
+            self.houses.append(node)
+        else:
+            self.retired_houses.append(create_node(record, actual_only=False))
+
+    def counts(self):
+        return {"new or changed": len(self.addrobjs),
+                "retired": len(self.retired),
+                "houses": len(self.houses),
+                "retired houses": len(self.retired_houses)}
+
+
+_FIND_ADDROBJS_QUERY = """\
+UNWIND $aoguids AS aoguid
+MATCH (a:Addrobj {aoguid: aoguid})
+RETURN a.aoguid AS aoguid, a.parentguid AS parentguid,
+\ta.offname AS offname, a.socrname AS socrname,
+\ta.postalcode AS postalcode, a.biggestword AS biggestword"""
+
+_FIND_ROOTS_QUERY = """\
+UNWIND $aoguids AS aoguid
+MATCH (:Root)<-[:{0}]-(s:Addrobj)<-[:{0}*0..]-(a:Addrobj {{aoguid: aoguid}})
+RETURN a.aoguid AS aoguid, s.aoguid AS root""".format(PARENT_REL)
+
+_RETIRE_ADDROBJS_QUERY = """\
+UNWIND $rows AS aoguid
+MATCH (d:Addrobj)-[:{0}*0..]->(:Addrobj {{aoguid: aoguid}})
+OPTIONAL MATCH (h)-[:{0}]->(d) WHERE h:House OR h:HouseInt
+DETACH DELETE h, d""".format(PARENT_REL)
+
+_RETIRE_HOUSES_QUERY = """\
+UNWIND $rows AS row
+MATCH (h:House {{complexnum: row.complexnum}})
+\t-[:{0}]->(:Addrobj {{aoguid: row.parentguid}})
+DETACH DELETE h""".format(PARENT_REL)
+
+_RETIRE_HOUSE_INTS_QUERY = """\
+UNWIND $rows AS row
+MATCH (hi:HouseInt {{intstart: row.intstart, intend: row.intend}})
+\t-[:{0}]->(:Addrobj {{aoguid: row.parentguid}})
+DETACH DELETE hi""".format(PARENT_REL)
+
+_UNLINK_ADDROBJS_QUERY = """\
+UNWIND $rows AS aoguid
+MATCH (a:Addrobj {{aoguid: aoguid}})-[r:{0}]->()
+DELETE r""".format(PARENT_REL)
+
+_LINK_ADDROBJS_QUERIES = [
+    """\
+MERGE (r:Root)
+WITH r
+UNWIND $rows AS aoguid
+MATCH (a:Addrobj {{aoguid: aoguid}}) WHERE a.parentguid IS NULL
+MERGE (a)-[:{0}]->(r)""".format(PARENT_REL),
+    """\
+UNWIND $rows AS aoguid
+MATCH (a:Addrobj {{aoguid: aoguid}}) WHERE a.parentguid IS NOT NULL
+MATCH (p:Addrobj {{aoguid: a.parentguid}})
+MERGE (a)-[:{0}]->(p)""".format(PARENT_REL)]
+
+_MERGE_HOUSES_QUERY = """\
+UNWIND $rows AS row
+MATCH (a:Addrobj {{aoguid: row.parentguid}})
+MERGE (h:House {{complexnum: row.complexnum}})-[:{0}]->(a)
+SET h.postalcode = row.postalcode, h.housenum = row.housenum,
+\th.building = row.building, h.letter = row.letter,
+\th.structure = row.structure""".format(PARENT_REL)
+
+_MERGE_HOUSE_INTS_QUERY = """\
+UNWIND $rows AS row
+MATCH (a:Addrobj {{aoguid: row.parentguid}})
+MERGE (hi:HouseInt {{intstart: row.intstart, intend: row.intend}})
+\t-[:{0}]->(a)
+SET hi.postalcode = row.postalcode""".format(PARENT_REL)
+
+
+class CypherDeltaWriter(object):
+    """Apply the delta to the server by batched queries
+    """
+    def __init__(self, executor, batch_size=1000):
+        """Create CypherDeltaWriter
+
+        Args:
+            executor: QueryExecutor
+            batch_size: int, a number of rows in one query
+        """
+        assert batch_size > 0
+        self.executor = executor
+        self.batch_size = batch_size
+
+    def find_addrobjs(self, aoguids):
+        """Get the address objects of the graph
+
+        Results:
+            dict, the aoguid to the node
+        """
+        result = {}
+        for rows in self._batches(sorted(aoguids)):
+            for record in self.executor.execute_query(
+                    _FIND_ADDROBJS_QUERY, {"aoguids": rows}):
+                node = dict((key, record[key]) for key in (
+                    "aoguid", "parentguid", "offname", "socrname",
+                    "postalcode", "biggestword"))
+                node["label"] = ADDROBJ_LABEL
+                result[node["aoguid"]] = node
+        return result
+
+    def find_roots(self, aoguids):
+        """Get the top level objects of the address objects
+
+        Results:
+            dict, the aoguid to the aoguid of its top level object
+        """
+        result = {}
+        for rows in self._batches(sorted(aoguids)):
+            for record in self.executor.execute_query(
+                    _FIND_ROOTS_QUERY, {"aoguids": rows}):
+                result[record["aoguid"]] = record["root"]
+        return result
+
+    def apply(self, delta):
+        """Delete the retired nodes, merge the new and changed ones
+
+        The changed address objects are linked again, as their parents
+        can be changed. The retired address objects are deleted after
+        that with their descendants, so the objects moved from them
+        by the delta are kept.
+        """
+        houses = [n for n in delta.retired_houses
+                  if n["label"] == HOUSE_LABEL]
+        house_ints = [n for n in delta.retired_houses
+                      if n["label"] == HOUSE_INT_LABEL]
+        self._execute(_RETIRE_HOUSES_QUERY, houses)
+        self._execute(_RETIRE_HOUSE_INTS_QUERY, house_ints)
+
+        aoguids = sorted(delta.addrobjs)
+        self._execute(_ADDROBJ_QUERY,
+                      [delta.addrobjs[aoguid] for aoguid in aoguids])
+        self._execute(_UNLINK_ADDROBJS_QUERY, aoguids)
+        for query in _LINK_ADDROBJS_QUERIES:
+            self._execute(query, aoguids)
+        self._execute(_RETIRE_ADDROBJS_QUERY, sorted(delta.retired))
+
+        self._execute(_MERGE_HOUSES_QUERY,
+                      [n for n in delta.houses if n["label"] == HOUSE_LABEL])
+        self._execute(_MERGE_HOUSE_INTS_QUERY,
+                      [n for n in delta.houses
+                       if n["label"] == HOUSE_INT_LABEL])
+
+    def _execute(self, query, rows):
+        for batch in self._batches(rows):
+            self.executor.execute_query(query, {"rows": batch})
+
+    def _batches(self, rows):
+        for i in range(0, len(rows), self.batch_size):
+            yield rows[i:i + self.batch_size]
+
+
+class MemoryGraphDeltaWriter(object):
+    """Apply the delta to MemoryGraph
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def find_addrobjs(self, aoguids):
+        result = {}
+        for aoguid in aoguids:
+            node = self.graph.get_addrobj(aoguid)
+            if node is not None:
+                result[aoguid] = node
+        return result
+
+    def find_roots(self, aoguids):
+        return dict((aoguid, self.graph.find_root(aoguid))
+                    for aoguid in aoguids
+                    if self.graph.get_addrobj(aoguid) is not None)
+
+    def apply(self, delta):
+        for node in delta.retired_houses + delta.houses:
+            self._remove_house(node)
+        for node in delta.addrobjs.values():
+            self.graph.add_node(node)
+        self.graph.remove_addrobjs(delta.retired)
+        for node in delta.houses:
+            self.graph.add_node(node)
+
+    def _remove_house(self, node):
+        if node["label"] == HOUSE_LABEL:
+            self.graph.remove_house(node["parentguid"], node["complexnum"])
+        else:
+            self.graph.remove_house_int(
+                node["parentguid"], node["intstart"], node["intend"])
+
+
+def apply_delta(delta, writer, counted_dict=None, converter=None):
+    """Apply the delta to the graph, the dictionary and the converter
+
+    Args:
+        delta: FiasDelta
+        writer: CypherDeltaWriter or MemoryGraphDeltaWriter
+        counted_dict: dict, the counted dictionary changed in place,
+                        by default the one of the converter spellchecker
+                        if it is not a read-only snapshot
+        converter: Converter, its result cache, spellchecker and prefilter
+                        are updated
+    Results:
+        WordChanges of the counted dictionary
+    """
+    spellchecker = getattr(converter, "spellchecker", None)
+    if counted_dict is None and isinstance(
+            getattr(spellchecker, "counted_dict", None), MutableMapping):
+        counted_dict = spellchecker.counted_dict
+
+    aoguids = set(delta.addrobjs) | delta.retired
+    old_nodes = writer.find_addrobjs(aoguids)
+    writer.apply(delta)
+
+    changes = WordChanges(set(), set(), set())
+    if counted_dict is not None:
+        changes = update_counted_dict(
+            counted_dict, old_nodes.values(), delta.addrobjs.values())
+    if converter is None:
+        return changes
+
+    if spellchecker is not None and hasattr(spellchecker, "update_words"):
+        spellchecker.update_words(*changes)
+    if converter.result_cache is not None:
+        words = set(node["biggestword"] for node in old_nodes.values())
+        words.update(node["biggestword"] for node in delta.addrobjs.values())
+        changed_aoguids = aoguids | set(
+            node["parentguid"] for node in delta.houses + delta.retired_houses)
+        converter.result_cache.invalidate_items_if(
+            lambda key, result: _is_affected(
+                key, result, words, changed_aoguids))
+    if converter.prefilter is not None:
+        # retired objects are kept in the index, they only widen the search
+        roots = writer.find_roots(delta.addrobjs)
+        for aoguid, node in delta.addrobjs.items():
+            if aoguid in roots:
+                converter.prefilter.add_node(node, roots[aoguid])
+    return changes
+
+
+def count_words(nodes):
+    """Count the words of the address object names as in counted_dict
+
+    Results:
+        Counter
+    """
+    result = Counter()
+    for node in nodes:
+        result.update(
+            word for word in parse_address_names(
+                (node.get("offname") or "").lower())
+            if word.isalpha())
+    return result
+
+
+def update_counted_dict(counted_dict, old_nodes, new_nodes):
+    """Move the frequencies of the words from the old names to the new ones
+
+    Words whose frequency falls to zero are removed.
+
+    Args:
+        counted_dict: dict, it is changed in place
+        old_nodes: address objects before the delta
+        new_nodes: address objects after the delta
+    Results:
+        WordChanges
+    """
+    diff = count_words(new_nodes)
+    diff.subtract(count_words(old_nodes))
+    changes = WordChanges(set(), set(), set())
+    for word, count in diff.items():
+        if count == 0:
+            continue
+        score = int(counted_dict.get(word, 0)) + count
+        if score > 0:
+            if word in counted_dict:
+                changes.changed.add(word)
+            else:
+                changes.added.add(word)
+            counted_dict[word] = score
+        elif word in counted_dict:
+            del counted_dict[word]
+            changes.removed.add(word)
+    return changes
+
+
+def save_dict_files(counted_dict, changes,
+                    counted_dict_filename, pwl_filename=None):
+    """Write the counted dictionary and update the words of the PWL file
+    """
+    with io.open(counted_dict_filename, "w", encoding="utf8") as output_file:
+        json.dump(counted_dict, output_file, ensure_ascii=False)
+    if pwl_filename is None:
+        return
+    with io.open(pwl_filename, "r", encoding="utf8") as input_file:
+        words = [line.rstrip("\n") for line in input_file]
+    known = set(words)
+    words = [word for word in words if word not in changes.removed]
+    words.extend(sorted(word for word in changes.added if word not in known))
+    with io.open(pwl_filename, "w", encoding="utf8") as output_file:
+        output_file.write("".join(word + "\n" for word in words if word))
+
+
+def _is_affected(key, result, words, aoguids):
+    """Check the cached result: its words are the names of the changed
+    objects or it contains the changed objects
+    """
+    return (any(word.lower() in words for word in key[0])
+            or any(addrobj.aoguid in aoguids
+                   for address in result for addrobj in address.addr_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Apply the FIAS delta to the graph and dictionaries')
+    parser.add_argument('--addrobj', nargs='*', default=[],
+                        help='AS_ADDROBJ XML or ADDROB DBF delta files')
+    parser.add_argument('--house', nargs='*', default=[],
+                        help='AS_HOUSE XML or HOUSE DBF delta files')
+    parser.add_argument('--houseint', nargs='*', default=[],
+                        help='AS_HOUSEINT XML or HOUSEINT DBF delta files')
+    parser.add_argument('--counted', default=None,
+                        help='the counted dictionary json, updated in place')
+    parser.add_argument('--pwl', default=None,
+                        help='the PWL dictionary, updated in place')
+    parser.add_argument('--batchsize', default=1000, type=int,
+                        dest='batch_size')
+    args = parser.parse_args()
+
+    from .config import config
+    from .neo4j_query_creator import QueryExecutor
+    delta = FiasDelta.read(args.addrobj, args.house, args.houseint,
+                           reporter=ThroughputReporter())
+    counted_dict = None
+    if args.counted:
+        with io.open(args.counted, "r", encoding="utf8") as input_file:
+            counted_dict = json.load(input_file)
+
+    start = datetime.datetime.now()
+    with QueryExecutor(config.NEO4J_SERVER_ADDRESS,
+                       config.NEO4J_SERVER_LOGIN,
+                       config.NEO4J_SERVER_PASSWORD) as executor:
+        changes = apply_delta(
+            delta, CypherDeltaWriter(executor, args.batch_size),
+            counted_dict)
+    if counted_dict is not None:
+        save_dict_files(counted_dict, changes, args.counted, args.pwl)
+    sys.stderr.write("applied in {0}: {1}\n".format(
+        datetime.datetime.now() - start,
+        ", ".join("{0} {1}".format(name, count)
+                  for name, count in sorted(delta.counts().items()))))
+    sys.stderr.write("words: {0} changed, {1} added, {2} removed\n".format(
+        len(changes.changed), len(changes.added), len(changes.removed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+"""Import the FIAS database into the graph used by the converter
+
+The FIAS XML (AS_ADDROBJ, AS_HOUSE, AS_HOUSEINT) or DBF (ADDROB, HOUSE,
+HOUSEINT) files are streamed record by record. The nodes are written by
+one of the writers:
+    CsvImportWriter    - CSV files for neo4j-admin import;
+    CypherImportWriter - batched UNWIND queries to the server;
+    JsonLinesWriter    - the file loaded by MemoryGraph.load.
+
+The graph consists of the node Root, the nodes Addrobj linked to their
+parents (or to Root) and the nodes House and HouseInt linked to their
+address objects. The relations point from the child to the parent.
+
+Import:
+    python -m address_converter.importer --addrobj AS_ADDROBJ.XML
+        --house AS_HOUSE.XML --houseint AS_HOUSEINT.XML --csv <directory>
+"""
+from .memory_graph import ADDROBJ_LABEL, HOUSE_LABEL, HOUSE_INT_LABEL
+from .parser import calc_biggest_word, normalize_house_num
+from xml.etree import ElementTree
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+import time
+
+
+ROOT_LABEL = "Root"
+PARENT_REL = "PARENT"
+
+ADDROBJ_TAG = "Object"
+HOUSE_TAG = "House"
+HOUSE_INT_TAG = "HouseInterval"
+
+INDEX_STATEMENTS = [
+    "CREATE INDEX ON :Addrobj(biggestword)",
+    "CREATE INDEX ON :Addrobj(postalcode)",
+    "CREATE INDEX ON :Addrobj(aoguid)",
+    "CREATE INDEX ON :Addrobj(parentguid)",
+    "CREATE INDEX ON :House(housenum)",
+    "CREATE INDEX ON :HouseInt(intstart)"]
+
+
+def iter_xml_records(filename, tag):
+    """Yield the attributes of the elements with the tag
+
+    Parsed elements are removed from the tree, so the memory use does not
+    depend on the file size.
+    """
+    context = ElementTree.iterparse(filename, events=("start", "end"))
+    root = None
+    for event, elem in context:
+        if root is None:
+            root = elem
+        if event == "end" and elem.tag == tag:
+            yield dict(elem.attrib)
+            elem.clear()
+            root.clear()
+
+
+def iter_dbf_records(filename, encoding="cp866"):
+    """Yield the records of the DBF file, it needs dbfread
+    """
+    from dbfread import DBF
+    for record in DBF(filename, encoding=encoding, load=False):
+        yield dict((key, _to_str(value)) for key, value in record.items())
+
+
+def iter_records(filename, tag):
+    """Yield the records of the XML or DBF file as dicts of strings
+    """
+    if filename.lower().endswith(".dbf"):
+        return iter_dbf_records(filename)
+    return iter_xml_records(filename, tag)
+
+
+def create_addrobj_node(record, actual_only=True):
+    """Convert the AS_ADDROBJ record into the Addrobj node
+
+    biggestword is in lower case, as the names of the converter queries.
+
+    Results:
+        dict in the format of MemoryGraph.load, None if the record
+        is not actual
+    """
+    if actual_only and not _is_actual_addrobj(record):
+        return None
+    offname = record.get("OFFNAME") or ""
+    return {"label": ADDROBJ_LABEL,
+            "aoguid": record["AOGUID"],
+            "parentguid": record.get("PARENTGUID") or None,
+            "offname": offname,
+            "socrname": record.get("SHORTNAME") or "",
+            "postalcode": record.get("POSTALCODE") or None,
+            "biggestword": calc_biggest_word(offname)}
+
+
+def create_house_node(record, actual_only=True, today=None):
+    """Convert the AS_HOUSE record into the House node
+
+    complexnum is the house number with the building number after "к"
+    and the structure number after "с", e.g. 12к1с2. It is split into
+    housenum, building, letter and structure by normalize_house_num.
+    """
+    if actual_only and not _is_actual(record, today):
+        return None
+    complexnum = record.get("HOUSENUM") or ""
+    if record.get("BUILDNUM"):
+        complexnum += "к" + record["BUILDNUM"]
+    if record.get("STRUCNUM"):
+        complexnum += "с" + record["STRUCNUM"]
+    house_num = normalize_house_num(complexnum)
+    return {"label": HOUSE_LABEL,
+            "parentguid": record["AOGUID"],
+            "complexnum": complexnum.lower(),
+            "postalcode": record.get("POSTALCODE") or None,
+            "housenum": house_num.number if house_num else None,
+            "building": house_num.building if house_num else 0,
+            "letter": house_num.letter if house_num else "",
+            "structure": house_num.structure if house_num else 0}
+
+
+def create_house_int_node(record, actual_only=True, today=None):
+    """Convert the AS_HOUSEINT record into the HouseInt node
+    """
+    if actual_only and not _is_actual(record, today):
+        return None
+    return {"label": HOUSE_INT_LABEL,
+            "parentguid": record["AOGUID"],
+            "intstart": int(record["INTSTART"]),
+            "intend": int(record["INTEND"]),
+            "postalcode": record.get("POSTALCODE") or None}
+
+
+class ThroughputReporter(object):
+    """Print the number of the processed records and the rate
+    """
+    def __init__(self, output=sys.stderr, interval=5.0, timer=time.time):
+        self.output = output
+        self.interval = interval
+        self._timer = timer
+        self._start = None
+        self._last_report = None
+        self.count = 0
+
+    def start(self, name):
+        self.name = name
+        self.count = 0
+        self._start = self._last_report = self._timer()
+
+    def add(self, count=1):
+        self.count += count
+        now = self._timer()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self):
+        elapsed = self._timer() - self._start
+        self.output.write("{0}: {1} records, {2:.0f} records/s\n".format(
+            self.name,
+            self.count,
+            self.count / elapsed if elapsed > 0 else 0))
+        self.output.flush()
+
+
+def import_fias(writer,
+                addrobj_filenames=(),
+                house_filenames=(),
+                house_int_filenames=(),
+                actual_only=True,
+                reporter=None):
+    """Import the FIAS files by the writer
+
+    Address objects are imported first, so houses can be linked to them.
+
+    Args:
+        writer: CsvImportWriter, CypherImportWriter or JsonLinesWriter
+        addrobj_filenames: a list of AS_ADDROBJ XML or ADDROB DBF files
+        house_filenames: a list of AS_HOUSE XML or HOUSE DBF files
+        house_int_filenames: a list of AS_HOUSEINT XML or HOUSEINT DBF files
+        actual_only: bool, skip the historical records
+        reporter: ThroughputReporter
+    Results:
+        dict, the label to the number of the imported nodes
+    """
+    today = datetime.date.today().isoformat()
+    if actual_only:
+        create_addrobj = create_addrobj_node
+    else:
+        # an address object is one node, so its historical records
+        # are skipped if it has the actual one
+        create_addrobj = _UniqueAddrobjFilter(
+            _find_actual_aoguids(addrobj_filenames)).create_node
+    sources = [
+        (ADDROBJ_LABEL, addrobj_filenames, ADDROBJ_TAG, create_addrobj),
+        (HOUSE_LABEL, house_filenames, HOUSE_TAG,
+         lambda r: create_house_node(r, actual_only, today)),
+        (HOUSE_INT_LABEL, house_int_filenames, HOUSE_INT_TAG,
+         lambda r: create_house_int_node(r, actual_only, today))]
+
+    counts = {}
+    for label, filenames, tag, create_node in sources:
+        counts[label] = 0
+        for filename in filenames:
+            if reporter is not None:
+                reporter.start(os.path.basename(filename))
+            for record in iter_records(filename, tag):
+                node = create_node(record)
+                if node is not None:
+                    writer.add_node(node)
+                    counts[label] += 1
+                if reporter is not None:
+                    reporter.add()
+            if reporter is not None:
+                reporter.report()
+        writer.finish_label(label)
+    writer.close()
+    return counts
+
+
+def _find_actual_aoguids(addrobj_filenames):
+    return set(record["AOGUID"]
+               for filename in addrobj_filenames
+               for record in iter_records(filename, ADDROBJ_TAG)
+               if _is_actual_addrobj(record))
+
+
+class _UniqueAddrobjFilter(object):
+    """Create one Addrobj node per aoguid from all the records
+
+    The actual record is taken if there is one, otherwise the first
+    historical record is.
+    """
+    def __init__(self, actual_aoguids):
+        self.actual_aoguids = actual_aoguids
+        self._seen = set()
+
+    def create_node(self, record):
+        aoguid = record["AOGUID"]
+        if aoguid in self._seen:
+            return None
+        if aoguid in self.actual_aoguids and \
+                not _is_actual_addrobj(record):
+            return None
+        self._seen.add(aoguid)
+        return create_addrobj_node(record, actual_only=False)
+
+
+class JsonLinesWriter(object):
+    """Write the nodes into the file loaded by MemoryGraph.load
+    """
+    def __init__(self, filename):
+        self._output = io.open(filename, "w", encoding="utf8")
+
+    def add_node(self, node):
+        self._output.write(json.dumps(node, ensure_ascii=False) + "\n")
+
+    def finish_label(self, label):
+        pass
+
+    def close(self):
+        self._output.close()
+
+
+class CsvImportWriter(object):
+    """Write the CSV files for neo4j-admin import
+
+    The nodes are written into root.csv, addrobj.csv, house.csv and
+    houseint.csv, the relations into addrobj_parent.csv, addrobj_root.csv,
+    house_parent.csv and houseint_parent.csv. The index statements are
+    written into indexes.cypher, they are executed after the import.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._files = []
+        self._root = self._create_csv(
+            "root.csv", [":ID(Root)", ":LABEL"])
+        self._root.writerow(["root", ROOT_LABEL])
+        self._addrobj = self._create_csv(
+            "addrobj.csv",
+            ["aoguid:ID(Addrobj)", "parentguid", "offname", "socrname",
+             "postalcode", "biggestword", ":LABEL"])
+        self._house = self._create_csv(
+            "house.csv",
+            [":ID(House)", "complexnum", "postalcode", "housenum:int",
+             "building:int", "letter", "structure:int", ":LABEL"])
+        self._house_int = self._create_csv(
+            "houseint.csv",
+            [":ID(HouseInt)", "intstart:int", "intend:int", "postalcode",
+             ":LABEL"])
+        self._addrobj_parent = self._create_csv(
+            "addrobj_parent.csv",
+            [":START_ID(Addrobj)", ":END_ID(Addrobj)", ":TYPE"])
+        self._addrobj_root = self._create_csv(
+            "addrobj_root.csv",
+            [":START_ID(Addrobj)", ":END_ID(Root)", ":TYPE"])
+        self._house_parent = self._create_csv(
+            "house_parent.csv",
+            [":START_ID(House)", ":END_ID(Addrobj)", ":TYPE"])
+        self._house_int_parent = self._create_csv(
+            "houseint_parent.csv",
+            [":START_ID(HouseInt)", ":END_ID(Addrobj)", ":TYPE"])
+        self._house_num = 0
+        with io.open(os.path.join(directory, "indexes.cypher"), "w",
+                     encoding="utf8") as output_file:
+            output_file.writelines(s + ";\n" for s in INDEX_STATEMENTS)
+
+    def _create_csv(self, filename, header):
+        output_file = io.open(os.path.join(self.directory, filename), "w",
+                              encoding="utf8", newline="")
+        self._files.append(output_file)
+        writer = csv.writer(output_file)
+        writer.writerow(header)
+        return writer
+
+    def add_node(self, node):
+        label = node["label"]
+        if label == ADDROBJ_LABEL:
+            self._addrobj.writerow([
+                node["aoguid"], node["parentguid"] or "", node["offname"],
+                node["socrname"], node["postalcode"] or "",
+                node["biggestword"], label])
+            if node["parentguid"]:
+                self._addrobj_parent.writerow(
+                    [node["aoguid"], node["parentguid"], PARENT_REL])
+            else:
+                self._addrobj_root.writerow(
+                    [node["aoguid"], "root", PARENT_REL])
+            return
+
+        self._house_num += 1
+        if label == HOUSE_LABEL:
+            self._house.writerow([
+                self._house_num, node["complexnum"],
+                node["postalcode"] or "",
+                "" if node["housenum"] is None else node["housenum"],
+                node["building"], node["letter"], node["structure"], label])
+            self._house_parent.writerow(
+                [self._house_num, node["parentguid"], PARENT_REL])
+        elif label == HOUSE_INT_LABEL:
+            self._house_int.writerow([
+                self._house_num, node["intstart"], node["intend"],
+                node["postalcode"] or "", label])
+            self._house_int_parent.writerow(
+                [self._house_num, node["parentguid"], PARENT_REL])
+        else:
+            raise ValueError("Unknown node label: {0}".format(label))
+
+    def finish_label(self, label):
+        pass
+
+    def close(self):
+        for output_file in self._files:
+            output_file.close()
+
+    def admin_import_args(self):
+        """Get the arguments of neo4j-admin import for the written files
+        """
+        def path(filename):
+            return os.path.join(self.directory, filename)
+        args = ["neo4j-admin", "import", "--ignore-missing-nodes=true"]
+        for filename in ("root.csv", "addrobj.csv", "house.csv",
+                         "houseint.csv"):
+            args.append("--nodes={0}".format(path(filename)))
+        for filename in ("addrobj_parent.csv", "addrobj_root.csv",
+                         "house_parent.csv", "houseint_parent.csv"):
+            args.append("--relationships={0}".format(path(filename)))
+        return args
+
+
+_ADDROBJ_QUERY = """\
+UNWIND $rows AS row
+MERGE (a:Addrobj {aoguid: row.aoguid})
+SET a.parentguid = row.parentguid, a.offname = row.offname,
+\ta.socrname = row.socrname, a.postalcode = row.postalcode,
+\ta.biggestword = row.biggestword"""
+
+_ROOT_QUERY = "MERGE (r:Root)"
+
+_ADDROBJ_RANGE_QUERY = """\
+MATCH (a:Addrobj) WHERE a.aoguid > $after
+RETURN a.aoguid AS Aoguid ORDER BY Aoguid LIMIT $limit"""
+
+_LINK_ADDROBJ_QUERIES = [
+    """\
+UNWIND $batch AS aoguid
+MATCH (a:Addrobj {{aoguid: aoguid}}) WHERE a.parentguid IS NULL
+MATCH (r:Root)
+MERGE (a)-[:{0}]->(r)""".format(PARENT_REL),
+    """\
+UNWIND $batch AS aoguid
+MATCH (a:Addrobj {{aoguid: aoguid}}) WHERE a.parentguid IS NOT NULL
+MATCH (p:Addrobj {{aoguid: a.parentguid}})
+MERGE (a)-[:{0}]->(p)""".format(PARENT_REL)]
+
+_HOUSE_QUERY = """\
+UNWIND $rows AS row
+MATCH (a:Addrobj {{aoguid: row.parentguid}})
+CREATE (h:House {{complexnum: row.complexnum, postalcode: row.postalcode,
+\thousenum: row.housenum, building: row.building, letter: row.letter,
+\tstructure: row.structure}})
+\t-[:{0}]->(a)""".format(PARENT_REL)
+
+_HOUSE_INT_QUERY = """\
+UNWIND $rows AS row
+MATCH (a:Addrobj {{aoguid: row.parentguid}})
+CREATE (hi:HouseInt {{intstart: row.intstart, intend: row.intend,
+\tpostalcode: row.postalcode}})-[:{0}]->(a)""".format(PARENT_REL)
+
+
+class CypherImportWriter(object):
+    """Insert the nodes by batched UNWIND queries
+
+    The indexes are created before the import. Address objects are linked
+    to their parents when all of them are inserted, in batches of
+    the aoguid ranges.
+    """
+    def __init__(self, executor, batch_size=1000):
+        """Create CypherImportWriter
+
+        Args:
+            executor: QueryExecutor
+            batch_size: int, a number of nodes in one query
+        """
+        assert batch_size > 0
+        self.executor = executor
+        self.batch_size = batch_size
+        self._queries = {
+            ADDROBJ_LABEL: _ADDROBJ_QUERY,
+            HOUSE_LABEL: _HOUSE_QUERY,
+            HOUSE_INT_LABEL: _HOUSE_INT_QUERY}
+        self._rows = dict((label, []) for label in self._queries)
+        create_indexes(executor)
+
+    def add_node(self, node):
+        rows = self._rows[node["label"]]
+        rows.append(node)
+        if len(rows) >= self.batch_size:
+            self._flush(node["label"])
+
+    def _flush(self, label):
+        rows = self._rows[label]
+        if rows:
+            self.executor.execute_query(self._queries[label], {"rows": rows})
+            self._rows[label] = []
+
+    def finish_label(self, label):
+        self._flush(label)
+        if label == ADDROBJ_LABEL:
+            self._link_addrobjs()
+
+    def _link_addrobjs(self):
+        self.executor.execute_query(_ROOT_QUERY, {})
+        after = ""
+        while True:
+            records = self.executor.execute_query(
+                _ADDROBJ_RANGE_QUERY,
+                {"after": after, "limit": self.batch_size})
+            if not records:
+                break
+            batch = [record["Aoguid"] for record in records]
+            for query in _LINK_ADDROBJ_QUERIES:
+                self.executor.execute_query(query, {"batch": batch})
+            after = batch[-1]
+
+    def close(self):
+        for label in self._rows:
+            self._flush(label)
+
+
+def create_indexes(executor):
+    """Create the indexes used by the converter queries
+    """
+    for statement in INDEX_STATEMENTS:
+        executor.execute_query(statement, {})
+
+
+def _is_actual_addrobj(record):
+    return record.get("ACTSTATUS", "1") == "1"
+
+
+def _is_actual(record, today):
+    enddate = record.get("ENDDATE")
+    today = today or datetime.date.today().isoformat()
+    return not enddate or enddate[:10] >= today
+
+
+def _to_str(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Import the FIAS database into the graph')
+    parser.add_argument('--addrobj', nargs='*', default=[],
+                        help='AS_ADDROBJ XML or ADDROB DBF files')
+    parser.add_argument('--house', nargs='*', default=[],
+                        help='AS_HOUSE XML or HOUSE DBF files')
+    parser.add_argument('--houseint', nargs='*', default=[],
+                        help='AS_HOUSEINT XML or HOUSEINT DBF files')
+    parser.add_argument('--all', default=0, choices=[0, 1], type=int,
+                        help='import the historical records too, '
+                        'an address object keeps its actual record',
+                        dest='import_all')
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--csv', default=None,
+                        help='the directory of the neo4j-admin import files')
+    output.add_argument('--jsonl', default=None,
+                        help='the json lines file for MemoryGraph')
+    output.add_argument('--server', default=0, choices=[0, 1], type=int,
+                        help='insert into the server from config.ini')
+    parser.add_argument('--batchsize', default=1000, type=int,
+                        dest='batch_size')
+    args = parser.parse_args()
+
+    executor = None
+    if args.csv:
+        writer = CsvImportWriter(args.csv)
+    elif args.jsonl:
+        writer = JsonLinesWriter(args.jsonl)
+    else:
+        from .config import config
+        from .neo4j_query_creator import QueryExecutor
+        executor = QueryExecutor(
+            config.NEO4J_SERVER_ADDRESS,
+            config.NEO4J_SERVER_LOGIN,
+            config.NEO4J_SERVER_PASSWORD).__enter__()
+        writer = CypherImportWriter(executor, args.batch_size)
+    try:
+        counts = import_fias(
+            writer,
+            args.addrobj,
+            args.house,
+            args.houseint,
+            actual_only=not args.import_all,
+            reporter=ThroughputReporter())
+    finally:
+        if executor is not None:
+            executor.close()
+    sys.stderr.write("imported: {0}\n".format(", ".join(
+        "{0} {1}".format(label, count) for label, count in counts.items())))
+    if args.csv:
+        sys.stderr.write("run: {0}\n".format(" ".join(
+            writer.admin_import_args())))
+
+
+if __name__ == "__main__":
+    main()
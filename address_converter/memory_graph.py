@@ -0,0 +1,463 @@
+from .neo4j_query_creator import (
+    _offname,
+    _aoguid,
+    _socrname,
+    _postcode,
+    _index,
+    _score)
+from .parser import calc_biggest_word, normalize_house_num
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import islice
+import io
+import json
+import re
+import sys
+
+
+ADDROBJ_LABEL = "Addrobj"
+HOUSE_LABEL = "House"
+HOUSE_INT_LABEL = "HouseInt"
+
+_ROOT = -1
+_node_pattern = re.compile(r"\(a\d+:Addrobj\)")
+_limit_pattern = re.compile(r"\nLIMIT (\d+)$")
+_order_by_score_pattern = re.compile(r"\nORDER BY Score DESC\n")
+
+
+class MemoryGraph(object):
+    """In-process FIAS graph, a replacement of QueryExecutor
+
+    It answers the parametrized queries created by create_query
+    (parametrized=True) and create_batch_query with the same matching
+    semantics and returns records accepted by convert_to_addr_objects.
+    Values are taken from the query parameters, the number of nodes,
+    the limit and the order by the score from the query text. Records
+    ordered by the score are all found and sorted before the limit.
+
+    If the parameter "roots" is given, only the address objects under
+    these top level objects are found, see prefilter.RootIndex.
+    If the parameter "excluded_socrnames" is given, the last address
+    object must not have these types.
+
+    Address objects are kept in parallel arrays with parent pointers.
+    biggestword is mapped to the node ids by an inverted index, houses
+    are kept in per-parent dicts by the house number, house intervals
+    in per-parent lists.
+    """
+    # Converter uses the parametrized queries with this executor
+    requires_params = True
+
+    def __init__(self, node_max_num=2, output_limit=100):
+        """Create an empty MemoryGraph
+
+        Args:
+            node_max_num: int, a number of nodes if the query has no nodes
+            output_limit: int, a number of return values if the query
+                            has no limit
+        """
+        self.node_max_num = node_max_num
+        self.output_limit = output_limit
+        self._ids = {}
+        self._aoguid = []
+        self._offname = []
+        self._socrname = []
+        self._postalcode = []
+        self._parentguid = []
+        self._parent = array("i")
+        self._depth = array("i")
+        self._biggestword = []
+        self._words = {}
+        self._houses = {}
+        self._house_ints = {}
+        self._house_ints_starts = {}
+        self._is_linked = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def load(filename, **kwargs):
+        """Load the graph from a json lines file
+
+        Each line is an object with the key "label" (Addrobj, House
+        or HouseInt) and the node properties, plus "parentguid".
+        """
+        graph = MemoryGraph(**kwargs)
+        with io.open(filename, "r", encoding="utf8") as input_file:
+            for line in input_file:
+                if line.strip():
+                    graph.add_node(json.loads(line))
+        return graph
+
+    def add_node(self, node):
+        label = node.get("label", ADDROBJ_LABEL)
+        if label == ADDROBJ_LABEL:
+            self.add_addrobj(
+                node["aoguid"],
+                node.get("parentguid"),
+                node.get("offname"),
+                node.get("socrname"),
+                node.get("postalcode"),
+                node.get("biggestword"))
+        elif label == HOUSE_LABEL:
+            self.add_house(
+                node["parentguid"],
+                node.get("complexnum"),
+                node.get("postalcode"),
+                node.get("housenum"),
+                node.get("building"),
+                node.get("letter"),
+                node.get("structure"))
+        elif label == HOUSE_INT_LABEL:
+            self.add_house_int(
+                node["parentguid"],
+                int(node["intstart"]),
+                int(node["intend"]),
+                node.get("postalcode"))
+        else:
+            raise ValueError("Unknown node label: {0}".format(label))
+
+    def add_addrobj(self,
+                    aoguid,
+                    parentguid,
+                    offname,
+                    socrname,
+                    postalcode,
+                    biggestword=None):
+        """Add an address object, parentguid is None for the top level
+
+        The object with the same aoguid is replaced.
+        """
+        if biggestword is None:
+            biggestword = calc_biggest_word(offname or "")
+        if aoguid in self._ids:
+            self._unindex(self._ids[aoguid])
+        node_id = len(self._aoguid)
+        self._ids[aoguid] = node_id
+        self._aoguid.append(aoguid)
+        self._offname.append(offname)
+        self._socrname.append(socrname)
+        self._postalcode.append(postalcode)
+        self._parentguid.append(parentguid)
+        self._parent.append(_ROOT)
+        self._depth.append(0)
+        self._biggestword.append(sys.intern(biggestword))
+        self._words.setdefault(biggestword, array("i")).append(node_id)
+        self._is_linked = False
+
+    def add_house(self,
+                  parentguid,
+                  complexnum,
+                  postalcode,
+                  housenum=None,
+                  building=None,
+                  letter=None,
+                  structure=None):
+        """Add a house, the number fields are taken from complexnum
+        if they are not given
+        """
+        if housenum is None:
+            house_num = normalize_house_num(complexnum or "")
+            housenum, building, letter, structure = \
+                house_num or (None, 0, "", 0)
+        houses = self._houses.setdefault(parentguid, {})
+        houses.setdefault(housenum, []).append({
+            "complexnum": complexnum,
+            "postalcode": postalcode,
+            "housenum": housenum,
+            "building": building or 0,
+            "letter": letter or "",
+            "structure": structure or 0})
+
+    def add_house_int(self, parentguid, intstart, intend, postalcode):
+        intervals = self._house_ints.setdefault(parentguid, [])
+        intervals.append((intstart, intend, postalcode))
+        intervals.sort(key=lambda i: i[0])
+        self._house_ints_starts[parentguid] = [i[0] for i in intervals]
+
+    def remove_addrobjs(self, aoguids):
+        """Remove the address objects and their descendants with all
+        their houses and house intervals
+
+        The descendants are dropped as DETACH DELETE leaves them
+        unreachable in the server graph.
+
+        Results:
+            int, a number of the removed address objects
+        """
+        if not self._is_linked:
+            self._link()
+        removed = set(self._ids[aoguid] for aoguid in aoguids
+                      if aoguid in self._ids)
+        if not removed:
+            return 0
+        for node_id in list(self._ids.values()):
+            parent = self._parent[node_id]
+            while parent != _ROOT and parent not in removed:
+                parent = self._parent[parent]
+            if parent != _ROOT:
+                removed.add(node_id)
+        for node_id in removed:
+            aoguid = self._aoguid[node_id]
+            del self._ids[aoguid]
+            self._unindex(node_id)
+            self._houses.pop(aoguid, None)
+            self._house_ints.pop(aoguid, None)
+            self._house_ints_starts.pop(aoguid, None)
+        self._is_linked = False
+        return len(removed)
+
+    def remove_house(self, parentguid, complexnum):
+        house_num = normalize_house_num(complexnum or "")
+        houses = self._houses.get(parentguid, {}).get(
+            house_num.number if house_num else None, [])
+        for house in houses:
+            if house["complexnum"] == complexnum:
+                houses.remove(house)
+                return True
+        return False
+
+    def remove_house_int(self, parentguid, intstart, intend):
+        intervals = self._house_ints.get(parentguid, [])
+        self._house_ints[parentguid] = [
+            i for i in intervals if (i[0], i[1]) != (intstart, intend)]
+        self._house_ints_starts[parentguid] = [
+            i[0] for i in self._house_ints[parentguid]]
+        return len(self._house_ints[parentguid]) != len(intervals)
+
+    def _unindex(self, node_id):
+        """Remove the node from the word index, its arrays stay unused
+        """
+        self._words[self._biggestword[node_id]].remove(node_id)
+
+    def get_addrobj(self, aoguid):
+        """Get the address object as a dict in the format of load, or None
+        """
+        node_id = self._ids.get(aoguid)
+        return self._node_dict(node_id) if node_id is not None else None
+
+    def find_root(self, aoguid):
+        """Get the aoguid of the top level object above the address object
+        """
+        if not self._is_linked:
+            self._link()
+        node_id = self._ids.get(aoguid)
+        return self._aoguid[self._top(node_id)] \
+            if node_id is not None else None
+
+    def iter_addrobjs(self):
+        """Yield the address objects as dicts in the format of load
+        """
+        for node_id, aoguid in enumerate(self._aoguid):
+            if self._ids.get(aoguid) == node_id:
+                yield self._node_dict(node_id)
+
+    def _node_dict(self, node_id):
+        return {"label": ADDROBJ_LABEL,
+                "aoguid": self._aoguid[node_id],
+                "parentguid": self._parentguid[node_id],
+                "offname": self._offname[node_id],
+                "socrname": self._socrname[node_id],
+                "postalcode": self._postalcode[node_id],
+                "biggestword": self._biggestword[node_id]}
+
+    def _link(self):
+        """Resolve the parent pointers and depths of the address objects
+        """
+        for node_id, parentguid in enumerate(self._parentguid):
+            self._parent[node_id] = self._ids.get(parentguid, _ROOT)
+        for node_id in range(len(self._parent)):
+            depth = 1
+            parent = self._parent[node_id]
+            while parent != _ROOT:
+                depth += 1
+                parent = self._parent[parent]
+            self._depth[node_id] = depth
+        self._is_linked = True
+
+    def execute_query(self, query, params=None):
+        return list(self.stream_query(query, params))
+
+    def stream_query(self, query, params=None):
+        """Find the records lazily, one by one
+        """
+        if params is None:
+            raise ValueError("MemoryGraph answers parametrized queries only")
+        if not self._is_linked:
+            self._link()
+        node_max_num = len(_node_pattern.findall(query)) or self.node_max_num
+        if "batch" in params:
+            return iter(self._execute_batch(params, node_max_num))
+
+        limit = _limit_pattern.search(query)
+        limit = int(limit.group(1)) if limit else self.output_limit
+        words = params.get("words")
+        if words is None:
+            words = [params[key] for key in sorted(
+                [k for k in params if k.startswith("word")],
+                key=lambda k: int(k[4:]))]
+        records = self._find(words, params, node_max_num)
+        if _order_by_score_pattern.search(query):
+            records = list(records)
+            for record in records:
+                record[_score] = self._calc_score(record, params)
+            records.sort(key=lambda record: record[_score], reverse=True)
+        return islice(records, limit)
+
+    def _calc_score(self, record, params):
+        """Calculate the score of the record as the query created
+        with order_by_score
+        """
+        words = set(params.get("score_words") or ())
+        score = sum(
+            1 for aoguid in record[_aoguid]
+            if self._biggestword[self._ids[aoguid]] in words)
+        if "score_postcodes" in params:
+            score += int(record[_postcode][-1] in params["score_postcodes"])
+        if params.get("houses") or params.get("house_ints"):
+            score += int(record["Houses"] is not None
+                         or record["HousesInt"] is not None)
+        return score
+
+    def _execute_batch(self, params, node_max_num):
+        result = []
+        for item in params["batch"]:
+            records = self._find(item["words"], item, node_max_num)
+            for record in islice(records, params["limit"]):
+                record[_index] = item["index"]
+                result.append(record)
+        return result
+
+    def _find(self, words, params, node_max_num):
+        """Find the matching address objects and their houses
+
+        Yields:
+            records in the format of the query result
+        """
+        words = Counter(words)
+        postcode_re = _compile(params.get("postcode_re"))
+        roots = params.get("roots")
+        if roots is not None:
+            roots = set(self._ids[r] for r in roots if r in self._ids)
+        excluded_socrnames = set(params.get("excluded_socrnames") or ())
+        for last in self._find_last_nodes(words, node_max_num):
+            if postcode_re is not None and not _match(
+                    postcode_re, self._postalcode[last]):
+                continue
+            if self._socrname[last] in excluded_socrnames:
+                continue
+            if roots is not None and self._top(last) not in roots:
+                continue
+            for house, house_int in self._find_houses(last, params):
+                yield self._create_record(last, house, house_int)
+
+    def _find_last_nodes(self, words, node_max_num):
+        """Find the last nodes of the address object chains
+
+        The chain starts at the depth 1 or 2, each next node is
+        a descendant of the previous one at the distance 1 or 2, and
+        the nodes take different words.
+        """
+        candidates = []
+        for word in words:
+            candidates.extend(self._words.get(word, ()))
+        for node_id in candidates:
+            for _ in self._match_chain(
+                    node_id, node_max_num - 1, Counter(words)):
+                yield node_id
+
+    def _match_chain(self, node_id, level, words):
+        word = self._biggestword[node_id]
+        if words[word] <= 0:
+            return
+        words[word] -= 1
+        if level == 0:
+            if self._depth[node_id] <= 2:
+                yield node_id
+        else:
+            parent = self._parent[node_id]
+            for _ in range(2):
+                if parent == _ROOT:
+                    break
+                for match in self._match_chain(parent, level - 1, words):
+                    yield match
+                parent = self._parent[parent]
+        words[word] += 1
+
+    def _top(self, node_id):
+        while self._parent[node_id] != _ROOT:
+            node_id = self._parent[node_id]
+        return node_id
+
+    def _find_houses(self, node_id, params):
+        house_keys = params.get("houses") or []
+        house_ints = params.get("house_ints") or []
+        if not any(house_keys) and not any(house_ints):
+            return [(None, None)]
+
+        aoguid = self._aoguid[node_id]
+        postcode_re = _compile(params.get("house_postcode_re"))
+        houses_by_number = self._houses.get(aoguid, {})
+        houses = [
+            house
+            for number in sorted(set(key[0] for key in house_keys))
+            for house in houses_by_number.get(number, ())
+            if _match_house(house, house_keys)
+            and (postcode_re is None
+                 or _match(postcode_re, house["postalcode"]))]
+
+        intervals = self._house_ints.get(aoguid, ())
+        starts = self._house_ints_starts.get(aoguid, ())
+        house_int_ids = set()
+        for num in house_ints:
+            for i in range(bisect_right(starts, num)):
+                if (num <= intervals[i][1]
+                        and (postcode_re is None
+                             or _match(postcode_re, intervals[i][2]))):
+                    house_int_ids.add(i)
+        house_ints = [
+            {"intstart": intervals[i][0],
+             "intend": intervals[i][1],
+             "postalcode": intervals[i][2]}
+            for i in sorted(house_int_ids)]
+        return [(house, house_int)
+                for house in houses or [None]
+                for house_int in house_ints or [None]]
+
+    def _create_record(self, node_id, house, house_int):
+        path = []
+        while node_id != _ROOT:
+            path.append(node_id)
+            node_id = self._parent[node_id]
+        path.reverse()
+        return {
+            _offname: [self._offname[i] for i in path],
+            _aoguid: [self._aoguid[i] for i in path],
+            _socrname: [self._socrname[i] for i in path],
+            _postcode: [self._postalcode[i] for i in path],
+            "Houses": house,
+            "HousesInt": house_int}
+
+
+def _match_house(house, house_keys):
+    return any(house["housenum"] == number
+               and (not building or house["building"] == building)
+               and (not letter or house["letter"] == letter)
+               and (not structure or house["structure"] == structure)
+               for number, building, letter, structure in house_keys)
+
+
+def _compile(pattern):
+    return re.compile(pattern) if pattern is not None else None
+
+
+def _match(pattern, value):
+    return value is not None and pattern.fullmatch(value) is not None
@@ -0,0 +1,267 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+
+PARSE_STAGE = "parse"
+SPELLCHECK_STAGE = "spellcheck"
+BUILD_QUERY_STAGE = "build_query"
+EXECUTE_STAGE = "execute"
+MATERIALIZE_STAGE = "materialize"
+STAGES = [PARSE_STAGE,
+          SPELLCHECK_STAGE,
+          BUILD_QUERY_STAGE,
+          EXECUTE_STAGE,
+          MATERIALIZE_STAGE]
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05,
+                   0.1, 0.5, 1.0, 5.0, 10.0)
+QUERY_SIZE_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+RECORDS_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+slow_query_logger = logging.getLogger("address_converter.slow_query")
+slow_query_logger.setLevel(logging.WARNING)
+
+
+class Histogram(object):
+    """Thread-safe histogram with fixed bucket bounds
+    """
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Estimate the quantile as the upper bound of its bucket
+
+        The maximal value is returned for the last, unbounded bucket.
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            total = 0
+            for bound, count in zip(self.buckets, self.counts):
+                total += count
+                if total >= rank:
+                    return min(bound, self.max)
+            return self.max
+
+
+class ConvertStats(object):
+    """Measurements of one conversion, they are passed to the hooks
+
+    Attributes:
+        address: str, the converted address
+        stages: dict, the stage name to its duration in seconds
+        query: str, the query text
+        records: int, a number of records returned by the query
+        errors: the list of stages failed with an error
+        cached: bool, the result was taken from the result cache
+    """
+    def __init__(self, address):
+        self.address = address
+        self.stages = {}
+        self.query = None
+        self.records = 0
+        self.errors = []
+        self.cached = False
+
+    @contextmanager
+    def measure(self, stage):
+        """Add the duration of the block to the stage
+
+        An exception raised in the block is counted as the stage error.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors.append(stage)
+            raise
+        finally:
+            self.stages[stage] = \
+                self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def add_error(self, stage):
+        self.errors.append(stage)
+
+
+class _NullStats(object):
+    """ConvertStats that measures nothing, used without metrics
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        return False
+
+    def measure(self, stage):
+        return self
+
+    def add_error(self, stage):
+        pass
+
+
+NULL_STATS = _NullStats()
+
+
+class ConverterMetrics(object):
+    """Collect per-stage latency of the conversions
+
+    Pass it to Converter as the argument metrics. Each conversion is
+    measured into ConvertStats, which updates the histograms and is
+    passed to the hooks.
+    """
+    def __init__(self, slow_query_threshold=None, hooks=None):
+        """Create ConverterMetrics
+
+        Args:
+            slow_query_threshold: float, queries executed longer than
+                            this number of seconds are logged with their
+                            text, None disables the log
+            hooks: the list of functions called with ConvertStats
+                            after each conversion
+        """
+        self.slow_query_threshold = slow_query_threshold
+        self.hooks = list(hooks or [])
+        self.stages = dict(
+            (stage, Histogram(LATENCY_BUCKETS)) for stage in STAGES)
+        self.query_size = Histogram(QUERY_SIZE_BUCKETS)
+        self.records = Histogram(RECORDS_BUCKETS)
+        self.errors = dict((stage, 0) for stage in STAGES)
+        self.conversions = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def start(self, address):
+        return ConvertStats(address)
+
+    def record(self, stats):
+        """Add the measurements of the finished conversion
+        """
+        for stage, seconds in stats.stages.items():
+            self.stages[stage].observe(seconds)
+        if stats.query is not None:
+            self.query_size.observe(len(stats.query))
+            self.records.observe(stats.records)
+        with self._lock:
+            self.conversions += 1
+            self.cache_hits += int(stats.cached)
+            for stage in stats.errors:
+                self.errors[stage] += 1
+
+        execute_time = stats.stages.get(EXECUTE_STAGE)
+        if (self.slow_query_threshold is not None
+                and execute_time is not None
+                and execute_time >= self.slow_query_threshold):
+            slow_query_logger.warning(
+                'Slow query, {0:.3f} s, {1} records, address: {2}\n{3}'
+                .format(execute_time, stats.records,
+                        stats.address.strip(), stats.query))
+
+        for hook in self.hooks:
+            hook(stats)
+
+    def summary(self):
+        """Get the text table of the stage latencies
+
+        Results:
+            str
+        """
+        lines = ["{0:<12} {1:>8} {2:>10} {3:>10} {4:>10} {5:>10}".format(
+            "stage", "count", "mean, ms", "p50, ms", "p95, ms", "max, ms")]
+        for stage in STAGES:
+            histogram = self.stages[stage]
+            lines.append(
+                "{0:<12} {1:>8} {2:>10.3f} {3:>10.3f} {4:>10.3f} {5:>10.3f}"
+                .format(stage,
+                        histogram.count,
+                        1000 * histogram.mean(),
+                        1000 * histogram.quantile(0.5),
+                        1000 * histogram.quantile(0.95),
+                        1000 * (histogram.max or 0.0)))
+        lines.append("conversions: {0}, cache hits: {1}".format(
+            self.conversions, self.cache_hits))
+        lines.append("query size, mean: {0:.0f}, max: {1}".format(
+            self.query_size.mean(), self.query_size.max or 0))
+        lines.append("records, mean: {0:.1f}, max: {1}".format(
+            self.records.mean(), self.records.max or 0))
+        lines.append("errors: {0}".format(", ".join(
+            "{0} {1}".format(stage, self.errors[stage])
+            for stage in STAGES)))
+        return "\n".join(lines) + "\n"
+
+    def to_prometheus(self, prefix="address_converter"):
+        """Dump the metrics in the Prometheus text format
+
+        Results:
+            str
+        """
+        lines = []
+        _write_histogram(
+            lines, prefix + "_stage_seconds",
+            "Duration of the conversion stages in seconds",
+            [('stage="{0}"'.format(stage), self.stages[stage])
+             for stage in STAGES])
+        _write_histogram(
+            lines, prefix + "_query_size_chars",
+            "Length of the query text",
+            [("", self.query_size)])
+        _write_histogram(
+            lines, prefix + "_query_records",
+            "Number of records returned by the query",
+            [("", self.records)])
+        name = prefix + "_errors_total"
+        lines.append("# HELP {0} Number of errors by stage".format(name))
+        lines.append("# TYPE {0} counter".format(name))
+        for stage in STAGES:
+            lines.append('{0}{{stage="{1}"}} {2}'.format(
+                name, stage, self.errors[stage]))
+        for name, help_text, value in (
+                ("_conversions_total", "Number of conversions",
+                 self.conversions),
+                ("_cache_hits_total", "Number of results from the cache",
+                 self.cache_hits)):
+            lines.append("# HELP {0}{1} {2}".format(prefix, name, help_text))
+            lines.append("# TYPE {0}{1} counter".format(prefix, name))
+            lines.append("{0}{1} {2}".format(prefix, name, value))
+        return "\n".join(lines) + "\n"
+
+
+def _write_histogram(lines, name, help_text, labeled_histograms):
+    lines.append("# HELP {0} {1}".format(name, help_text))
+    lines.append("# TYPE {0} histogram".format(name))
+    for labels, histogram in labeled_histograms:
+        sep = "," if labels else ""
+        total = 0
+        for bound, count in zip(
+                histogram.buckets + ("+Inf",), histogram.counts):
+            total += count
+            lines.append('{0}_bucket{{{1}{2}le="{3}"}} {4}'.format(
+                name, labels, sep, bound, total))
+        labels = "{{{0}}}".format(labels) if labels else ""
+        lines.append("{0}_sum{1} {2}".format(name, labels, histogram.sum))
+        lines.append("{0}_count{1} {2}".format(
+            name, labels, histogram.count))
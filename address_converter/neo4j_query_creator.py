@@ -1,36 +1,138 @@
 from neo4j.v1 import GraphDatabase, basic_auth
+from neo4j.exceptions import (
+    CypherError,
+    ProtocolError,
+    SecurityError,
+    ServiceUnavailable,
+    TransientError)
 import re
+import threading
+import time
 from .address_objects import Address, AddrObject
+from .parser import normalize_house_num
+
+
+class QueryError(Exception):
+    """An error of a query executor other than QueryExecutor
+    """
+
+
+# errors of the failed queries, the converter logs them and goes on
+QUERY_ERRORS = (QueryError,
+                CypherError,
+                ProtocolError,
+                SecurityError,
+                ServiceUnavailable,
+                OSError)
 
 
 class QueryExecutor(object):
-    def __init__(self, server_address, login, password):
+    """Execute queries on sessions taken from the driver connection pool
+
+    Each thread uses its own session, so the executor can be shared
+    between threads. A query failed with a transient error is retried
+    on a new session.
+    """
+    def __init__(self,
+                 server_address,
+                 login,
+                 password,
+                 max_pool_size=100,
+                 acquisition_timeout=60,
+                 max_retries=3,
+                 retry_delay=0.1):
+        """Create QueryExecutor
+
+        Args:
+            max_pool_size: int, the maximal number of connections
+            acquisition_timeout: float, seconds to wait for a free connection
+            max_retries: int, the number of retries on transient errors
+            retry_delay: float, seconds before the first retry,
+                            doubled for each next one
+        """
         self._server_address = server_address
         self._login = login
         self._password = password
+        self._max_pool_size = max_pool_size
+        self._acquisition_timeout = acquisition_timeout
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._local = threading.local()
+        self._sessions = set()
+        self._lock = threading.Lock()
 
     def __enter__(self):
         self._driver = GraphDatabase.driver(
             self._server_address,
-            auth=basic_auth(self._login, self._password))
-        self._session = self._driver.session()
+            auth=basic_auth(self._login, self._password),
+            max_connection_pool_size=self._max_pool_size,
+            connection_acquisition_timeout=self._acquisition_timeout)
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
         self.close()
 
-    def close(self):
-        self._session.close()
+    def stream_query(self, query, params=None):
+        """Execute the query yielding records as they arrive
+
+        The query runs on its own session from the pool; closing
+        the generator closes the session and discards the rest
+        of the result. The query is not retried.
+        """
+        assert hasattr(self, "_driver"), "At first create a driver"
+        session = self._driver.session()
+        try:
+            for record in session.run(query, params):
+                yield record
+        finally:
+            session.close()
 
-    def execute_query(self, query):
-        assert hasattr(self, "_session"), "At first create a session"
-        result = self._session.run(query)
-        return result
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, set()
+        for session in sessions:
+            session.close()
+        if hasattr(self, "_driver"):
+            self._driver.close()
+
+    def _get_session(self):
+        session = getattr(self._local, "session", None)
+        if session is None or session.closed():
+            session = self._driver.session()
+            self._local.session = session
+            with self._lock:
+                self._sessions.add(session)
+        return session
+
+    def _drop_session(self):
+        session = self._local.session
+        self._local.session = None
+        with self._lock:
+            self._sessions.discard(session)
+        try:
+            session.close()
+        except Exception:
+            pass
+
+    def execute_query(self, query, params=None):
+        assert hasattr(self, "_driver"), "At first create a driver"
+        for attempt in range(self._max_retries + 1):
+            session = self._get_session()
+            try:
+                return list(session.run(query, params))
+            except (ServiceUnavailable, TransientError):
+                self._drop_session()
+                if attempt == self._max_retries:
+                    raise
+                time.sleep(self._retry_delay * 2 ** attempt)
 
 
 _begin_pattern = r"^"
 _end_pattern = r"\\b.*"
 
+MIX_STRATEGY = "mix"
+SET_STRATEGY = "set"
+
 
 def _create_mix_addr_query(
         address_names,
@@ -38,8 +140,12 @@ def _create_mix_addr_query(
         level=0,
         node_name="a",
         param_name="biggestword",
-        is_show_tabs=False):
+        is_show_tabs=False,
+        is_quoted=True):
     """Create a part of the query for finding address objects.
+
+    If is_quoted is not set, the address names are inserted as is,
+    e.g. as the query parameters names.
     """
     if (not any(address_names)
             or (node_max_num - level) > len(address_names)):
@@ -59,7 +165,8 @@ def _create_mix_addr_query(
             node_num=level,
             param_name=param_name)
 
-        result += " '{query_val}'".format(query_val=addr)
+        result += (" '{query_val}'" if is_quoted else " {query_val}").format(
+            query_val=addr)
 
         if level < node_max_num - 1:
             sub_addr = list(address_names)
@@ -69,7 +176,8 @@ def _create_mix_addr_query(
                 node_max_num,
                 level + 1,
                 node_name,
-                param_name)
+                param_name,
+                is_quoted=is_quoted)
 
             result += "{next_row}{tabs}{white_space}AND {sub_query}".format(
                 next_row="\n" if is_show_tabs else "",
@@ -79,70 +187,177 @@ def _create_mix_addr_query(
     return "({0})".format(result)
 
 
-def _create_addr_postcodes_query(postcodes, node_max_num):
+def _create_set_addr_query(
+        words,
+        node_max_num,
+        node_name="a",
+        param_name="biggestword"):
+    """Create a part of the query for finding address objects by a set of words
+
+    Each node takes one of the words and different nodes take different
+    words, so the query size grows linearly with the number of words.
+
+    Args:
+        words: str, a list literal or a parameter name holding the words
+        node_max_num: int, a number of nodes used in the query
+    """
+    conditions = ["{0}{1}.{2} IN {3}".format(node_name, i, param_name, words)
+                  for i in range(node_max_num)]
+    for i in range(node_max_num):
+        for j in range(i + 1, node_max_num):
+            conditions.append("{0}{1}.{3} <> {0}{2}.{3}".format(
+                node_name, i, j, param_name))
+    return "({0})".format(" AND ".join(conditions))
+
+
+def _unique_words(words):
+    result = []
+    for word in words:
+        if word not in result:
+            result.append(word)
+    return result
+
+
+def _create_addr_postcodes_re(postcodes):
+    """Create a regex matching postal codes of the same postal area
+    """
+    pc_re = "|".join([p[:3] + "[0-9]{3,}" for p in postcodes if len(p) > 3])
+    return "{0}({1})$".format(_begin_pattern, pc_re)
+
+
+def _create_postcodes_re(postcodes):
+    """Create a regex matching exactly the given postal codes
+    """
+    pc_re = "|".join([p for p in postcodes])
+    return "{0}({1})$".format(_begin_pattern, pc_re)
+
+
+def _create_house_keys(house_nums):
+    """Normalize the house numbers into sorted
+    [number, building, letter, structure]
+    """
+    keys = set(normalize_house_num(num) for num in house_nums)
+    return [list(key) for key in sorted(keys - {None})]
+
+
+def _create_house_numbers(house_keys):
+    return sorted(set(key[0] for key in house_keys))
+
+
+def _create_house_condition(house_key, node="h"):
+    """Create the condition matching the house number, the building,
+    the letter and the structure are compared only if they are given
+    """
+    number, building, letter, structure = house_key
+    result = "{0}.housenum = {1}".format(node, number)
+    if building:
+        result += " AND {0}.building = {1}".format(node, building)
+    if letter:
+        result += " AND {0}.letter = '{1}'".format(node, letter)
+    if structure:
+        result += " AND {0}.structure = {1}".format(node, structure)
+    return result
+
+
+def _create_house_ints(house_nums):
+    house_nums = list(house_nums)
+    pattern = re.compile(r"(\d+)")
+    for i, num in enumerate(house_nums):
+        n = pattern.search(num)
+        if n is not None:
+            house_nums[i] = n.group()
+    return [int(x) for x in house_nums]
+
+
+def _create_value(value, name, params):
+    """Insert the value into the query text or into the query parameters
+    """
+    if params is None:
+        return "'{0}'".format(value)
+    params[name] = value
+    return "${0}".format(name)
+
+
+def _create_addr_postcodes_query(postcodes, node_max_num, params=None):
     if not any(postcodes):
         return ""
 
     postcodes.append("")
-    pc_re = "|".join([p[:3] + "[0-9]{3,}" for p in postcodes if len(p) > 3])
-    pc_re = "{0}({1})$".format(_begin_pattern, pc_re)
-    result = "\n\tAND a{0}.postalcode =~ '{1}'".format(
-        (node_max_num - 1), pc_re)
+    result = "\n\tAND a{0}.postalcode =~ {1}".format(
+        (node_max_num - 1),
+        _create_value(
+            _create_addr_postcodes_re(postcodes), "postcode_re", params))
     return result
 
 
-def _create_house_query(house_nums, postcodes, node_max_num):
+def _create_socrnames_query(excluded_socrnames, node_max_num, params=None):
+    if not excluded_socrnames:
+        return ""
+
+    excluded_socrnames = sorted(set(excluded_socrnames))
+    if params is not None:
+        params["excluded_socrnames"] = excluded_socrnames
+        values = "$excluded_socrnames"
+    else:
+        values = "[{0}]".format(", ".join(
+            ["'{0}'".format(name) for name in excluded_socrnames]))
+    return "\n\tAND NOT a{0}.socrname IN {1}".format(
+        node_max_num - 1, values)
+
+
+def _create_house_query(house_nums, postcodes, node_max_num, params=None):
     if not any(house_nums):
         return ""
 
     if any(postcodes):
-        pc_re = "|".join([p for p in postcodes])
-        pc_re = "{0}({1})$".format(_begin_pattern, pc_re)
+        pc_re = _create_value(
+            _create_postcodes_re(postcodes), "house_postcode_re", params)
 
-    house_nums = list(house_nums)
-    pattern_num = re.compile("[0-9]")
-    house_nums_re = []
-    for num in house_nums:
-        se = pattern_num.search(num)
-        if se:
-            house_nums_re.append(se.group(0))
-
-    nums_re_str = "|".join([qr for qr in house_nums_re])
-    nums_re_str = r"{0}({1})([^0-9]|$)".format(_begin_pattern, nums_re_str)
+    house_keys = _create_house_keys(house_nums)
     result = "\nOPTIONAL MATCH (a{0})<-[*1]-(h:House)".format(node_max_num - 1)
     result += "\nWHERE"
-    result += "\n\th.complexnum =~ '{0}'".format(nums_re_str)
+    # the equality on the indexed number selects the houses,
+    # the building, the letter and the structure are checked on them
+    if params is not None:
+        params["house_numbers"] = _create_house_numbers(house_keys)
+        params["houses"] = house_keys
+        result += "\n\th.housenum IN $house_numbers"
+        result += "\n\tAND ANY(n IN $houses WHERE h.housenum = n[0]"
+        result += "\n\t\tAND (n[1] = 0 OR h.building = n[1])"
+        result += "\n\t\tAND (size(n[2]) = 0 OR h.letter = n[2])"
+        result += "\n\t\tAND (n[3] = 0 OR h.structure = n[3]))"
+    else:
+        result += "\n\th.housenum IN [{0}]".format(", ".join(
+            str(number) for number in _create_house_numbers(house_keys)))
+        if any(key[1] or key[2] or key[3] for key in house_keys):
+            result += "\n\tAND ({0})".format("\n\t OR ".join(
+                _create_house_condition(key) for key in house_keys))
     if any(postcodes):
-        result += "\n\tAND h.postalcode =~ '{0}'".format(pc_re)
+        result += "\n\tAND h.postalcode =~ {0}".format(pc_re)
     return result
 
 
-def _create_house_int_query(house_nums, postcodes, node_max_num):
+def _create_house_int_query(house_nums, postcodes, node_max_num, params=None):
     if not any(house_nums):
         return ""
 
     if any(postcodes):
-        pc_re = "|".join([p for p in postcodes])
-        pc_re = "{0}({1})$".format(_begin_pattern, pc_re)
-
-    house_nums = list(house_nums)
-    pattern = re.compile(r"(\d+)")
-    for i, num in enumerate(house_nums):
-        n = pattern.search(num)
-        if n is not None:
-            house_nums[i] = n.group()
+        pc_re = _create_value(
+            _create_postcodes_re(postcodes), "house_postcode_re", params)
 
     result = "\nOPTIONAL MATCH (a{0})<-[*1]-(hi:HouseInt)".format(
         node_max_num - 1)
     result += "\nWHERE"
-    for i, num in enumerate([int(x) for x in house_nums]):
-        result += "\n\t"
-        if i > 0:
-            result += "OR "
-        result += "(hi.intstart <= {0}".format(num)
-        result += " AND {0} <= hi.intend)".format(num)
+    if params is not None:
+        params["house_ints"] = _create_house_ints(house_nums)
+        result += "\n\tANY(num IN $house_ints"
+        result += " WHERE hi.intstart <= num AND num <= hi.intend)"
+    else:
+        result += "\n\tANY(num IN [{0}]".format(", ".join(
+            str(num) for num in _create_house_ints(house_nums)))
+        result += " WHERE hi.intstart <= num AND num <= hi.intend)"
     if any(postcodes):
-        result += "\n\tAND hi.postalcode =~ '{0}'".format(pc_re)
+        result += "\n\tAND hi.postalcode =~ {0}".format(pc_re)
     return result
 
 
@@ -151,43 +366,139 @@ def create_query(
         house_nums,
         postcodes,
         node_max_num=2,
-        output_limit=100):
+        output_limit=100,
+        parametrized=False,
+        match_strategy=MIX_STRATEGY,
+        roots=None,
+        order_by_score=False,
+        excluded_socrnames=None):
     """Create neo4j query for finding address objects
 
+    In the parametrized mode all values are passed as the query parameters,
+    so the query text depends only on the number of words and nodes
+    and on the presence of house numbers and postal codes.
+
+    The match strategy MIX_STRATEGY lists every ordered choice of words
+    for the nodes. SET_STRATEGY checks that each node matches one of the
+    words, so the query size grows linearly with the number of words.
+
+    If roots are given, the search starts at these top level address
+    objects instead of the Root node, see prefilter.RootIndex.
+
+    If order_by_score is set, the rows are sorted by the score column:
+    the number of the path nodes matching the words, plus one if the last
+    node has one of the postal codes, plus one if a house is found.
+    So the limit keeps the best rows, see ranking.Ranker.
+
+    If excluded_socrnames are given, the last address object must not
+    have these types, see recognizer.AddressRecognizer.
+
     Args:
         addr_obj_name: a list of addresses names
         house_nums: a list of house numbers
         postcodes: a list of postal codes
         node_max_num: int, a number of nodes used in the query
         output_limit: int, a number of requests return values
+        parametrized: bool, pass the values as the query parameters
+        match_strategy: MIX_STRATEGY or SET_STRATEGY
+        roots: a list of aoguids of the top level address objects
+        order_by_score: bool, sort the rows by the score
+        excluded_socrnames: a list of the address object types
     Results:
-        Query text
+        Query text, or query text and the query parameters
+        if parametrized is set
     """
+    params = {} if parametrized else None
+    result_query = _create_query(
+        addr_obj_name,
+        house_nums,
+        postcodes,
+        node_max_num,
+        output_limit,
+        params,
+        match_strategy,
+        roots,
+        order_by_score,
+        excluded_socrnames)
+    if parametrized:
+        return result_query, params if any(result_query) else {}
+    return result_query
+
+
+def _create_query(
+        addr_obj_name,
+        house_nums,
+        postcodes,
+        node_max_num,
+        output_limit,
+        params,
+        match_strategy,
+        roots=None,
+        order_by_score=False,
+        excluded_socrnames=None):
     if not any(addr_obj_name):
         return ""
 
     # MATCH
-    result_query = "MATCH (r:Root)"
+    if roots:
+        result_query = "MATCH (s:Addrobj)"
+    else:
+        result_query = "MATCH (r:Root)"
     for i in range(node_max_num):
         result_query += ", (a{}:Addrobj)".format(i)
     # relations
-    result_query += ", rel = (r)"
-    for i in range(node_max_num):
+    if roots:
+        # the root is the first node of the path or the parent of it
+        result_query += ", rel = (s)<-[*0..1]-(a0)"
+    else:
+        result_query += ", rel = (r)<-[*..2]-(a0)"
+    for i in range(1, node_max_num):
         result_query += "<-[*..2]-(a{})".format(i)
     # WHERE
     result_query += "\nWHERE"
-    addr_query = _create_mix_addr_query(
-        addr_obj_name,
-        node_max_num)
+    if roots:
+        if params is not None:
+            roots = _create_value(list(roots), "roots", params)
+        else:
+            roots = "[{0}]".format(
+                ", ".join(["'{0}'".format(root) for root in roots]))
+        result_query += " s.aoguid IN {0}\n\tAND ".format(roots)
+    if match_strategy == SET_STRATEGY:
+        words = _unique_words(addr_obj_name)
+        if len(words) < node_max_num:
+            return ""
+        if params is not None:
+            words = _create_value(words, "words", params)
+        else:
+            words = "[{0}]".format(
+                ", ".join(["'{0}'".format(word) for word in words]))
+        addr_query = _create_set_addr_query(words, node_max_num)
+    elif params is not None:
+        addr_names = []
+        for i, name in enumerate(addr_obj_name):
+            addr_names.append(_create_value(name, "word{}".format(i), params))
+        addr_query = _create_mix_addr_query(
+            addr_names,
+            node_max_num,
+            is_quoted=False)
+    else:
+        addr_query = _create_mix_addr_query(
+            addr_obj_name,
+            node_max_num)
     if not any(addr_query):
         return ""
 
     result_query += addr_query
-    result_query += _create_addr_postcodes_query(postcodes, node_max_num)
+    result_query += _create_addr_postcodes_query(
+        postcodes, node_max_num, params)
+    result_query += _create_socrnames_query(
+        excluded_socrnames, node_max_num, params)
     result_query += "\nWITH rel, a{}".format(node_max_num - 1)
 
-    result_query += _create_house_query(house_nums, postcodes, node_max_num)
-    result_query += _create_house_int_query(house_nums, postcodes, node_max_num)
+    result_query += _create_house_query(
+        house_nums, postcodes, node_max_num, params)
+    result_query += _create_house_int_query(
+        house_nums, postcodes, node_max_num, params)
 
     result_query += "\nRETURN"
     result_query += "\n\t[n in nodes(rel) where n:Addrobj | n.offname] as {0},".format(_offname)
@@ -199,36 +510,209 @@ def create_query(
         result_query += ", h as Houses"
         result_query += ", hi as HousesInt"
 
+    if order_by_score:
+        result_query += _create_score_query(
+            addr_obj_name, house_nums, postcodes, node_max_num, params)
     result_query += "\nLIMIT {}".format(output_limit)
     return result_query
 
+
+def _create_list_value(values, name, params):
+    if params is None:
+        return "[{0}]".format(
+            ", ".join(["'{0}'".format(value) for value in values]))
+    return _create_value(list(values), name, params)
+
+
+def _create_score_query(
+        addr_obj_name, house_nums, postcodes, node_max_num, params=None):
+    words = _create_list_value(
+        _unique_words(addr_obj_name), "score_words", params)
+    result = ",\n\tsize([n in nodes(rel) where n:Addrobj"
+    result += " AND n.biggestword IN {0}])".format(words)
+    if any(postcodes):
+        result += "\n\t+ CASE WHEN a{0}.postalcode IN {1}".format(
+            node_max_num - 1,
+            _create_list_value(
+                [p for p in postcodes if any(p)], "score_postcodes", params))
+        result += " THEN 1 ELSE 0 END"
+    if any(house_nums):
+        result += "\n\t+ CASE WHEN h IS NULL AND hi IS NULL"
+        result += " THEN 0 ELSE 1 END"
+    result += " as {0}".format(_score)
+    result += "\nORDER BY {0} DESC".format(_score)
+    return result
+
+
+def create_batch_item(index,
+                      addr_obj_name,
+                      house_nums,
+                      postcodes,
+                      excluded_socrnames=None):
+    """Create a batch item for the function create_batch_query
+
+    Args:
+        index: int, an index of the input address in the batch
+        addr_obj_name: a list of addresses names
+        house_nums: a list of house numbers
+        postcodes: a list of postal codes
+        excluded_socrnames: a list of the types that the last address
+                        object must not have
+    Results:
+        dict with the query parameters of the address
+    """
+    postcodes = list(postcodes)
+    item = {
+        "index": index,
+        "words": _unique_words(addr_obj_name),
+        "postcode_re": None,
+        "house_postcode_re": None,
+        "house_numbers": [],
+        "houses": [],
+        "house_ints": [],
+        "excluded_socrnames": sorted(set(excluded_socrnames))
+        if excluded_socrnames else None}
+    if any(postcodes):
+        item["postcode_re"] = _create_addr_postcodes_re(postcodes)
+        item["house_postcode_re"] = _create_postcodes_re(postcodes + [""])
+    if any(house_nums):
+        item["houses"] = _create_house_keys(house_nums)
+        item["house_numbers"] = _create_house_numbers(item["houses"])
+        item["house_ints"] = _create_house_ints(house_nums)
+    return item
+
+
+def create_batch_query(
+        batch,
+        node_max_num=2,
+        output_limit=100):
+    """Create one neo4j query for a batch of addresses
+
+    The addresses are passed as the parameter "batch" and unwound
+    on the server, so the query text does not depend on the addresses.
+    Address objects are matched by the set of words of the item:
+    each node takes a different word, as in the function create_query.
+
+    Args:
+        batch: a list of items created by the function create_batch_item
+        node_max_num: int, a number of nodes used in the query
+        output_limit: int, a number of return values per address
+    Results:
+        Query text and the query parameters
+    """
+    batch = [item for item in batch if len(item["words"]) >= node_max_num]
+    if not any(batch):
+        return "", {}
+
+    last_node = "a{}".format(node_max_num - 1)
+    # MATCH
+    result_query = "UNWIND $batch AS item"
+    result_query += "\nMATCH (r:Root)"
+    for i in range(node_max_num):
+        result_query += ", (a{}:Addrobj)".format(i)
+    # relations
+    result_query += ", rel = (r)"
+    for i in range(node_max_num):
+        result_query += "<-[*..2]-(a{})".format(i)
+    # WHERE
+    result_query += "\nWHERE"
+    result_query += _create_set_addr_query("item.words", node_max_num)
+    result_query += "\n\tAND (item.postcode_re IS NULL"
+    result_query += " OR {0}.postalcode =~ item.postcode_re)".format(last_node)
+    result_query += "\n\tAND (item.excluded_socrnames IS NULL"
+    result_query += " OR NOT {0}.socrname IN item.excluded_socrnames)".format(
+        last_node)
+    result_query += "\nWITH item, rel, {0}".format(last_node)
+
+    result_query += "\nOPTIONAL MATCH ({0})<-[*1]-(h:House)".format(last_node)
+    result_query += "\nWHERE"
+    result_query += "\n\th.housenum IN item.house_numbers"
+    result_query += "\n\tAND ANY(n IN item.houses WHERE h.housenum = n[0]"
+    result_query += "\n\t\tAND (n[1] = 0 OR h.building = n[1])"
+    result_query += "\n\t\tAND (size(n[2]) = 0 OR h.letter = n[2])"
+    result_query += "\n\t\tAND (n[3] = 0 OR h.structure = n[3]))"
+    result_query += "\n\tAND (item.house_postcode_re IS NULL"
+    result_query += " OR h.postalcode =~ item.house_postcode_re)"
+    result_query += "\nOPTIONAL MATCH ({0})<-[*1]-(hi:HouseInt)".format(
+        last_node)
+    result_query += "\nWHERE"
+    result_query += "\n\tANY(num IN item.house_ints"
+    result_query += " WHERE hi.intstart <= num AND num <= hi.intend)"
+    result_query += "\n\tAND (item.house_postcode_re IS NULL"
+    result_query += " OR hi.postalcode =~ item.house_postcode_re)"
+
+    result_query += "\nWITH item, collect(["
+    result_query += "\n\t[n in nodes(rel) where n:Addrobj | n.offname],"
+    result_query += "\n\t[n in nodes(rel) where n:Addrobj | n.aoguid],"
+    result_query += "\n\t[n in nodes(rel) where n:Addrobj | n.socrname],"
+    result_query += "\n\t[n in nodes(rel) where n:Addrobj | n.postalcode],"
+    result_query += "\n\th, hi])[..$limit] AS rows"
+    result_query += "\nUNWIND rows AS row"
+
+    result_query += "\nRETURN"
+    result_query += "\n\titem.index as {0},".format(_index)
+    result_query += "\n\trow[0] as {0},".format(_offname)
+    result_query += "\n\trow[1] as {0},".format(_aoguid)
+    result_query += "\n\trow[2] as {0},".format(_socrname)
+    result_query += "\n\trow[3] as {0},".format(_postcode)
+    result_query += "\n\trow[4] as Houses, row[5] as HousesInt"
+    return result_query, {"batch": batch, "limit": output_limit}
+
 _offname = 'AddrobjOffname'
 _aoguid = 'AddrobjAoguid'
 _socrname = 'AddrobjSocrname'
 _postcode = 'AddrobjPostalcode'
+_index = 'InputIndex'
+_score = 'Score'
 
 
 def convert_to_addr_objects(query_result):
     """Convert the query result into the list of Address objects
     """
-    result = []
+    result = list(iter_addr_objects(query_result))
+    assert not any(result) or isinstance(result[0], Address)
+    return result
+
+
+def iter_addr_objects(query_result):
+    """Convert the query result into Address objects one by one
+    """
+    if not hasattr(query_result, '__iter__'):
+        return
+    for record in query_result:
+        yield _convert_record(record)
+
+
+def convert_to_grouped_addr_objects(query_result, groups_num):
+    """Convert the batch query result into lists of Address objects
+
+    Records are grouped by the input index column.
+
+    Args:
+        query_result: the result of the query created by create_batch_query
+        groups_num: int, a number of addresses in the batch
+    Results:
+        the list of lists of Address objects, one per input address
+    """
+    result = [[] for _ in range(groups_num)]
     if not hasattr(query_result, '__iter__'):
         return result
     for record in query_result:
-        address = Address()
-        offnames = record[_offname]
-        ids = record[_aoguid]
-        type_names = record[_socrname]
-        postalcodes = record[_postcode]
-
-        addr_path = []
-        for arg in zip(offnames, ids, type_names, postalcodes):
-            addr_path.append(AddrObject(
-                name=arg[0],
-                aoguid=arg[1],
-                type_obj=arg[2],
-                postalcode=arg[3]))
-        address.addr_path = addr_path
-        result.append(address)
-    assert not any(result) or isinstance(result[0], Address)
+        result[record[_index]].append(_convert_record(record))
     return result
+
+
+def _convert_record(record):
+    offnames = record[_offname]
+    ids = record[_aoguid]
+    type_names = record[_socrname]
+    postalcodes = record[_postcode]
+
+    addr_path = []
+    for arg in zip(offnames, ids, type_names, postalcodes):
+        addr_path.append(AddrObject.intern(
+            name=arg[0],
+            aoguid=arg[1],
+            type_obj=arg[2],
+            postalcode=arg[3]))
+    return Address(addr_path)
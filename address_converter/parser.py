@@ -1,17 +1,83 @@
+from collections import namedtuple
 import re
 import io
 import json
 
 
+_words_pattern = re.compile(
+    r"([а-яА-ЯёЁa-zA-Z]+|[\d]+|[^а-яА-ЯёЁa-zA-Z0-9 ]+)")
+_digit_pattern = re.compile(r"[0-9]")
+_postcode_len = 6
+
+_main_number = r"[0-9]{1,3}"
+_add_number = r"[\/\\\-:]+[0-9]{1,3}"
+_add_symb = r"[ \/\\\-:]?[a-zA-Zа-яА-ЯёЁ]"
+_house_nums_patterns = [
+    re.compile(r"\b(" + _main_number + _add_number + _add_number + r")\b"),
+    re.compile(r"\b(" + _main_number + _add_number + _add_symb + r")\b"),
+    re.compile(r"\b(" + _main_number + _add_symb + _add_number + r")\b"),
+    re.compile(r"\b(" + _main_number + _add_number + r")\b"),
+    re.compile(r"\b(" + _main_number + _add_symb + r")\b"),
+    re.compile(r"\b(" + _main_number + r")\b")]
+
+
+ParsedAddress = namedtuple(
+    "ParsedAddress", ["names", "house_nums", "postcodes"])
+
+HouseNum = namedtuple(
+    "HouseNum", ["number", "building", "letter", "structure"])
+
+_house_num_tokens_pattern = re.compile(r"[0-9]+|[a-zа-яё]+")
+_building_markers = frozenset(["к", "корп", "корпус"])
+_structure_markers = frozenset(["с", "стр", "строение"])
+_house_part_markers = _building_markers | _structure_markers
+
+
+def tokenize_address(text, min_word_len=3, with_house_nums=True):
+    """Split the address text into names, house numbers and postal codes
+
+    Names and postal codes are taken from one scan of the text,
+    house numbers are searched only if the text has digits.
+
+    Args:
+        text: str, the address text
+        min_word_len: int, names of this length or shorter are skipped
+        with_house_nums: bool, search house numbers
+    Results:
+        ParsedAddress
+    """
+    assert isinstance(text, str)
+    names = []
+    postcodes = []
+    for word in _words_pattern.findall(text):
+        if len(word) > min_word_len:
+            names.append(word)
+        if len(word) >= _postcode_len and word.isdigit():
+            postcodes.extend(
+                word[i:i + _postcode_len]
+                for i in range(0, len(word) - _postcode_len + 1,
+                               _postcode_len))
+    house_nums = _parse_house_nums(text) if with_house_nums else set()
+    return ParsedAddress(names, house_nums, postcodes)
+
+
 def parse_address_names(text, min_word_len=3):
     assert isinstance(text, str)
-    splited_text = re.findall(
-        r"([а-яА-ЯёЁa-zA-Z]+|[\d]+|[^а-яА-ЯёЁa-zA-Z0-9 ]+)",
-        text)
-    return [word for word in splited_text
+    return [word for word in _words_pattern.findall(text)
             if len(word) > min_word_len]
 
 
+def calc_biggest_word(name):
+    """Get the longest word of the address object name in lower case
+
+    The name is split into words as in the function parse_address_names.
+    """
+    assert isinstance(name, str)
+    words = [word for word in parse_address_names(name.lower(), 0)
+             if word.isalpha()]
+    return max(words, key=len) if any(words) else ""
+
+
 def parse_house_nums(text):
     """Find matching house numbers
 
@@ -28,38 +94,96 @@ def parse_house_nums(text):
         nums: the set of matched house numbers
     """
     assert isinstance(text, str)
-    text = text.lower()
-    main_number = r"[0-9]{1,3}"
-    add_number = r"[\/\\\-:]+[0-9]{1,3}"
-    add_symb = r"[ \/\\\-:]?[a-zA-Zа-яА-ЯёЁ]"
-    patterns_list = [
-        re.compile(r"\b(" + main_number + add_number + add_number + r")\b"),
-        re.compile(r"\b(" + main_number + add_number + add_symb + r")\b"),
-        re.compile(r"\b(" + main_number + add_symb + add_number + r")\b"),
-        re.compile(r"\b(" + main_number + add_number + r")\b"),
-        re.compile(r"\b(" + main_number + add_symb + r")\b"),
-        re.compile(r"\b(" + main_number + r")\b")]
+    return _parse_house_nums(text)
+
+
+def _parse_house_nums(text):
+    if _digit_pattern.search(text) is None:
+        return set()
 
+    # patterns are applied by priority, each match is cut out of the text
+    text = text.lower()
     nums = set()
-    for pattern in patterns_list:
-        digits_list = pattern.findall(text)
-        nums |= set(digits_list)
-        text = re.sub(pattern, " ", text)
+
+    def cut_out(match):
+        nums.add(match.group(1))
+        return " "
+
+    for pattern in _house_nums_patterns:
+        text = pattern.sub(cut_out, text)
     return nums
 
 
+def normalize_house_num(text):
+    """Split the house number into the number, the building, the letter
+    and the structure
+
+    The building is the second number, after a separator or a marker
+    ("к", "корп"), the structure is the number after a marker ("с",
+    "стр"), the letter is a single letter after the number. The numbers
+    without a building, a letter or a structure have 0 and "", so they
+    can be compared by equality.
+        12      - (12, 0, "", 0);
+        12а     - (12, 0, "а", 0);
+        12/1    - (12, 1, "", 0), the same as 12-1 and 12к1;
+        12а/1   - (12, 1, "а", 0), the same as 12ак1;
+        12с2    - (12, 0, "", 2), the same as 12стр2;
+        12к1с2  - (12, 1, "", 2).
+
+    Results:
+        HouseNum, None if the text has no number
+    """
+    assert isinstance(text, str)
+    tokens = _house_num_tokens_pattern.findall(text.lower())
+    number = None
+    building = 0
+    letter = ""
+    structure = 0
+    marker = None
+    for i, token in enumerate(tokens):
+        if token.isdigit():
+            if number is None:
+                number = int(token)
+            elif marker in _structure_markers:
+                structure = structure or int(token)
+            elif building == 0:
+                building = int(token)
+            marker = None
+            continue
+        if number is None:
+            continue
+        if i + 1 < len(tokens) and tokens[i + 1].isdigit():
+            # the marker of the next number, maybe after the letter: 12ак1
+            if token in _house_part_markers:
+                marker = token
+                continue
+            if token[1:] in _house_part_markers:
+                marker = token[1:]
+                token = token[0]
+        if len(token) == 1 and not letter:
+            letter = token
+    if number is None:
+        return None
+    return HouseNum(number, building, letter, structure)
+
+
 def parse_postcode(text):
     assert isinstance(text, str)
-    postcodes = re.findall(r"(\d{6})", text)
-    return postcodes
+    return tokenize_address(text, with_house_nums=False).postcodes
 
 
 def clean_address_names_list(addr_objects, stop_words):
-    stop_words = stop_words
+    """Remove stop words, stop_words should be a set for fast lookups
+    """
     return [word for word in addr_objects if word not in stop_words]
 
 
 def create_stop_words_list(stop_words_list_filename):
+    """Load stop words from the json list
+
+    Results:
+        frozenset of stop words
+    """
     assert isinstance(stop_words_list_filename, str)
     with io.open(stop_words_list_filename, "r") as input_file:
-        return json.load(input_file)
+        return frozenset(json.load(input_file))
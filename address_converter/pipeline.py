@@ -0,0 +1,81 @@
+from .converter import Converter
+from collections import deque
+import multiprocessing
+import multiprocessing.util
+
+
+_converter = None
+
+
+def _init_worker(converter_kwargs):
+    global _converter
+    _converter = Converter(**converter_kwargs)
+    _converter.__enter__()
+    multiprocessing.util.Finalize(None, _converter.close, exitpriority=10)
+
+
+def _convert_chunk(addresses, convert_kwargs):
+    return [_converter.convert(address, **convert_kwargs)
+            for address in addresses]
+
+
+def convert_parallel(addresses,
+                     workers,
+                     converter_kwargs=None,
+                     convert_kwargs=None,
+                     chunk_size=64,
+                     max_pending_chunks=None):
+    """Convert addresses in a pool of processes
+
+    Each worker process owns its own Converter with its own query session
+    and spellchecker. Results are returned in the input order; at most
+    max_pending_chunks chunks are in flight, so the memory use does not
+    depend on the input size.
+
+    Args:
+        addresses: an iterable of address strings
+        workers: int, a number of worker processes
+        converter_kwargs: dict, arguments of Converter in the workers
+        convert_kwargs: dict, arguments of Converter.convert
+        chunk_size: int, a number of addresses sent to a worker at once
+        max_pending_chunks: int, the size of the reorder buffer,
+                            4 chunks per worker by default
+    Yields:
+        pairs of the address and the list of Address objects
+    """
+    assert workers > 0 and chunk_size > 0
+    convert_kwargs = convert_kwargs or {}
+    max_pending_chunks = max_pending_chunks or 4 * workers
+
+    pool = multiprocessing.Pool(
+        workers, _init_worker, (converter_kwargs or {},))
+    try:
+        pending = deque()
+        chunk = []
+        for address in addresses:
+            chunk.append(address)
+            if len(chunk) < chunk_size:
+                continue
+            pending.append((chunk, pool.apply_async(
+                _convert_chunk, (chunk, convert_kwargs))))
+            chunk = []
+            if len(pending) >= max_pending_chunks:
+                for result in _pop_chunk(pending):
+                    yield result
+        if chunk:
+            pending.append((chunk, pool.apply_async(
+                _convert_chunk, (chunk, convert_kwargs))))
+        while pending:
+            for result in _pop_chunk(pending):
+                yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def _pop_chunk(pending):
+    chunk, async_result = pending.popleft()
+    return zip(chunk, async_result.get())
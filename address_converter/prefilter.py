@@ -0,0 +1,162 @@
+from .parser import calc_biggest_word
+import io
+import json
+import os
+
+
+CITY_SOCRNAMES = ("г",)
+
+_postcode_area_len = 3
+
+_POSTCODE_AREAS_QUERY = """\
+MATCH (:Root)<-[*1]-(s:Addrobj)<-[*0..]-(a:Addrobj)
+WHERE a.postalcode IS NOT NULL AND a.postalcode <> ''
+RETURN DISTINCT substring(a.postalcode, 0, {0}) AS PostcodeArea,
+\ts.aoguid AS RootAoguid""".format(_postcode_area_len)
+
+_TOKENS_QUERY = """\
+MATCH (:Root)<-[*1]-(s:Addrobj)<-[*0..1]-(a:Addrobj)
+WHERE a = s OR a.socrname IN $socrnames
+RETURN DISTINCT a.biggestword AS Word, s.aoguid AS RootAoguid"""
+
+
+class RootIndex(object):
+    """Map postal codes and region and city names to the top level
+    address objects (regions)
+
+    The query created with the found roots searches only in their
+    subtrees instead of the whole graph. Postal codes are mapped by
+    the postal area (the first three digits), as the postal code
+    condition of create_query, so the roots found by postal codes
+    keep the query result. The names of regions and cities are used
+    only if the address has no known postal code. They can exclude
+    the right root when a street is named as a region, e.g.
+    "ул Московская", so Converter repeats an empty query narrowed
+    by the names without the roots.
+    """
+    def __init__(self, postcode_areas=None, tokens=None):
+        """Create RootIndex
+
+        Args:
+            postcode_areas: dict, the postal area to the list of root aoguids
+            tokens: dict, the lower case name to the list of root aoguids
+        """
+        self.postcode_areas = postcode_areas or {}
+        self.tokens = tokens or {}
+
+    @staticmethod
+    def build(executor, city_socrnames=CITY_SOCRNAMES):
+        """Build the index by the queries to the FIAS graph
+
+        Args:
+            executor: QueryExecutor
+            city_socrnames: type names of the address objects whose names
+                            are the index tokens, besides the regions
+        """
+        index = RootIndex()
+        for record in executor.execute_query(_POSTCODE_AREAS_QUERY, {}):
+            index._add(index.postcode_areas,
+                       record["PostcodeArea"], record["RootAoguid"])
+        for record in executor.execute_query(
+                _TOKENS_QUERY, {"socrnames": list(city_socrnames)}):
+            if record["Word"]:
+                index._add(index.tokens, record["Word"], record["RootAoguid"])
+        return index
+
+    @staticmethod
+    def from_nodes(nodes, city_socrnames=CITY_SOCRNAMES):
+        """Build the index from address objects
+
+        Args:
+            nodes: an iterable of dicts with the keys aoguid, parentguid,
+                            offname, socrname, postalcode, as the lines
+                            of the MemoryGraph file
+        """
+        nodes = [node for node in nodes
+                 if node.get("label", "Addrobj") == "Addrobj"]
+        parents = dict((node["aoguid"], node.get("parentguid"))
+                       for node in nodes)
+
+        def find_root(aoguid):
+            while parents.get(aoguid) is not None:
+                aoguid = parents[aoguid]
+            return aoguid
+
+        index = RootIndex()
+        for node in nodes:
+            index.add_node(node, find_root(node["aoguid"]), city_socrnames)
+        return index
+
+    def add_node(self, node, root, city_socrnames=CITY_SOCRNAMES):
+        """Add the address object under the root, e.g. from the FIAS delta
+
+        Args:
+            node: dict, the address object as in from_nodes
+            root: str, the aoguid of its top level object
+        """
+        postalcode = node.get("postalcode")
+        if postalcode:
+            self._add(self.postcode_areas,
+                      postalcode[:_postcode_area_len], root)
+        is_region = node["aoguid"] == root
+        is_city = (node.get("parentguid") == root
+                   and node.get("socrname") in city_socrnames)
+        if is_region or is_city:
+            word = node.get("biggestword") \
+                or calc_biggest_word(node.get("offname") or "")
+            if word:
+                self._add(self.tokens, word, root)
+
+    @staticmethod
+    def load(filename):
+        with io.open(filename, "r", encoding="utf8") as input_file:
+            data = json.load(input_file)
+        return RootIndex(data["postcode_areas"], data["tokens"])
+
+    @staticmethod
+    def load_or_build(filename, executor, **kwargs):
+        """Load the index from the local file, build and save it if
+        the file is absent
+
+        Args:
+            executor: QueryExecutor, or MemoryGraph whose address
+                            objects are indexed without the queries
+        """
+        if os.path.exists(filename):
+            return RootIndex.load(filename)
+        if hasattr(executor, "iter_addrobjs"):
+            index = RootIndex.from_nodes(executor.iter_addrobjs(), **kwargs)
+        else:
+            index = RootIndex.build(executor, **kwargs)
+        index.save(filename)
+        return index
+
+    def save(self, filename):
+        with io.open(filename, "w", encoding="utf8") as output_file:
+            json.dump({"postcode_areas": self.postcode_areas,
+                       "tokens": self.tokens},
+                      output_file, ensure_ascii=False)
+
+    def find_roots(self, words, postcodes):
+        """Find the candidate roots of the address
+
+        Args:
+            words: a list of address names
+            postcodes: a list of postal codes
+        Results:
+            the sorted list of root aoguids, or None if the address
+            can not be narrowed
+        """
+        roots = set()
+        for postcode in postcodes:
+            roots.update(self.postcode_areas.get(
+                postcode[:_postcode_area_len], ()))
+        if not any(roots):
+            for word in words:
+                roots.update(self.tokens.get(word.lower(), ()))
+        return sorted(roots) if any(roots) else None
+
+    def _add(self, index, key, root):
+        roots = index.setdefault(key, [])
+        if root not in roots:
+            roots.append(root)
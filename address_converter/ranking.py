@@ -0,0 +1,99 @@
+from .neo4j_query_creator import _offname, _postcode
+from .parser import calc_biggest_word
+
+
+COVERAGE_WEIGHT = 1.0
+FREQUENCY_WEIGHT = 0.1
+POSTCODE_WEIGHT = 1.0
+HOUSE_WEIGHT = 0.5
+
+_postcode_area_len = 3
+
+
+class Ranker(object):
+    """Score the query records of the candidate addresses
+
+    The score is a weighted sum of:
+        coverage  - the part of the address words found in the names
+                    of the address objects;
+        frequency - the frequency of the found words in counted_dict,
+                    f / (f + frequency_scale);
+        postcode  - 1 if the last address object has one of the postal
+                    codes, 0.5 if it has the same postal area;
+        house     - 1 if a house or a house interval is found.
+    """
+    def __init__(self,
+                 counted_dict=None,
+                 coverage_weight=COVERAGE_WEIGHT,
+                 frequency_weight=FREQUENCY_WEIGHT,
+                 postcode_weight=POSTCODE_WEIGHT,
+                 house_weight=HOUSE_WEIGHT,
+                 frequency_scale=1000):
+        """Create Ranker
+
+        Args:
+            counted_dict: the words frequency, e.g. SpellChecker.counted_dict
+        """
+        self.counted_dict = counted_dict if counted_dict is not None else {}
+        self.coverage_weight = coverage_weight
+        self.frequency_weight = frequency_weight
+        self.postcode_weight = postcode_weight
+        self.house_weight = house_weight
+        self.frequency_scale = frequency_scale
+
+    def score(self, record, words, house_nums=(), postcodes=()):
+        """Score the record of the query created by create_query
+
+        Args:
+            record: the query record
+            words: a list of the address names
+            house_nums: a list of the house numbers
+            postcodes: a list of the postal codes
+        Results:
+            float
+        """
+        words = set(word.lower() for word in words)
+        names = set(calc_biggest_word(name or "")
+                    for name in record[_offname])
+        found = words & names
+        result = 0.0
+        if any(words):
+            result += self.coverage_weight * len(found) / len(words)
+        if any(found):
+            frequency = sum(
+                max(int(self.counted_dict.get(word, 0)), 0)
+                for word in found) / float(len(found))
+            result += self.frequency_weight * frequency \
+                / (frequency + self.frequency_scale)
+
+        postalcode = record[_postcode][-1] if any(record[_postcode]) else None
+        if postalcode and any(postcodes):
+            if postalcode in postcodes:
+                result += self.postcode_weight
+            elif postalcode[:_postcode_area_len] in set(
+                    p[:_postcode_area_len] for p in postcodes):
+                result += self.postcode_weight / 2
+
+        if any(house_nums) and (_get(record, "Houses") is not None
+                                or _get(record, "HousesInt") is not None):
+            result += self.house_weight
+        return result
+
+    def rank(self, records, words, house_nums=(), postcodes=(), top_k=None):
+        """Sort the records by the score, keep the order of equal ones
+
+        Results:
+            the list of the top_k best records, all if top_k is None
+        """
+        postcodes = [p for p in postcodes if any(p)]
+        scored = [(self.score(record, words, house_nums, postcodes), i, record)
+                  for i, record in enumerate(records or [])]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [record for _, _, record in scored[:top_k]]
+
+
+def _get(record, key):
+    try:
+        return record[key]
+    except (KeyError, IndexError):
+        return None
@@ -0,0 +1,255 @@
+from .parser import _words_pattern, _parse_house_nums, _postcode_len
+from collections import namedtuple
+
+
+TYPE_TAG = "type"
+NAME_TAG = "name"
+HOUSE_TAG = "house"
+POSTCODE_TAG = "postcode"
+STOP_TAG = "stop"
+
+# FIAS SOCRBASE: the level, the short name (socrname of the graph)
+# and its spellings
+SOCRBASE_TYPES = [
+    ("1", "Респ", ["респ", "республика"]),
+    ("1", "край", ["край"]),
+    ("1", "обл", ["обл", "область"]),
+    ("1", "АО", ["ао", "автономный округ"]),
+    ("1", "г", ["г", "гор", "город"]),
+    ("3", "р-н", ["р-н", "район"]),
+    ("4", "г", ["г", "гор", "город"]),
+    ("4", "пгт", ["пгт", "поселок городского типа"]),
+    ("6", "пгт", ["пгт", "поселок городского типа"]),
+    ("6", "п", ["п", "пос", "поселок"]),
+    ("6", "с", ["с", "село"]),
+    ("6", "д", ["д", "дер", "деревня"]),
+    ("6", "х", ["х", "хутор"]),
+    ("6", "снт", ["снт"]),
+    ("7", "мкр", ["мкр", "микрорайон"]),
+    ("7", "ул", ["ул", "улица"]),
+    ("7", "пр-кт", ["пр-кт", "пр", "просп", "проспект"]),
+    ("7", "проезд", ["проезд", "пр-д"]),
+    ("7", "пер", ["пер", "переулок"]),
+    ("7", "пл", ["пл", "площадь"]),
+    ("7", "б-р", ["б-р", "бульв", "бульвар"]),
+    ("7", "ш", ["ш", "шоссе"]),
+    ("7", "наб", ["наб", "набережная"]),
+    ("7", "туп", ["туп", "тупик"]),
+    ("7", "тер", ["тер", "территория"])]
+
+HOUSE_MARKERS = frozenset([
+    "д", "дом", "к", "корп", "корпус", "с", "стр", "строение",
+    "лит", "литера", "вл", "влд", "владение", "кв", "квартира"])
+
+RecognizedAddress = namedtuple(
+    "RecognizedAddress", ["names", "house_nums", "postcodes", "socrnames"])
+
+Token = namedtuple("Token", ["tag", "text", "value"])
+
+_value_key = ""
+
+
+class AddressRecognizer(object):
+    """Tag the address tokens as types, names, house numbers, postal
+    codes or stop words in one pass
+
+    The types and the stop words are kept in a trie over the words
+    of their spellings, so "р-н" or "поселок городского типа" are
+    matched as one phrase, the longest one is taken. Types are tagged
+    with the FIAS short name (socrname).
+
+    The found types exclude the other types of the same levels, e.g.
+    "переулок" excludes "ул" and "пр-кт", but not "г". The query skips
+    the paths whose last address object has an excluded type, see
+    create_query.
+
+    A house marker ("д", "корп", "с") followed by a number and a letter
+    right after a number (5 д) are not types.
+    """
+    def __init__(self,
+                 types=SOCRBASE_TYPES,
+                 stop_words=(),
+                 house_markers=HOUSE_MARKERS,
+                 min_word_len=3):
+        """Create AddressRecognizer
+
+        Args:
+            types: a list of the levels, socrnames and the lists of their
+                            spellings
+            stop_words: words dropped from the names, the types have
+                            priority over them
+            house_markers: words before the house numbers
+            min_word_len: int, names of this length or shorter are skipped
+        """
+        self.house_markers = frozenset(house_markers)
+        self.min_word_len = min_word_len
+        self._trie = {}
+        self._levels = {}
+        self._level_types = {}
+        for word in stop_words:
+            self._add(word, STOP_TAG, None)
+        for level, socrname, phrases in types:
+            self._levels.setdefault(socrname, set()).add(level)
+            self._level_types.setdefault(level, set()).add(socrname)
+            for phrase in phrases:
+                self._add(phrase, TYPE_TAG, socrname)
+
+    @staticmethod
+    def from_socrbase(filename, **kwargs):
+        """Create the recognizer from the AS_SOCRBASE XML or SOCRBASE DBF
+
+        Args:
+            kwargs: the other arguments of AddressRecognizer
+        """
+        from .importer import iter_records
+        types = []
+        for record in iter_records(filename, "AddressObjectType"):
+            socrname = record.get("SCNAME")
+            if socrname:
+                types.append((
+                    record.get("LEVEL"),
+                    socrname,
+                    [socrname, record.get("SOCRNAME") or socrname]))
+        return AddressRecognizer(types, **kwargs)
+
+    def _add(self, phrase, tag, value):
+        words = _words_pattern.findall(phrase.lower())
+        if not any(words):
+            return
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        node[_value_key] = (tag, value)
+
+    def _match(self, words, start):
+        """Find the longest phrase of the trie at the start
+
+        Results:
+            the end of the phrase and its (tag, value), or None
+        """
+        node = self._trie
+        result = None
+        for i in range(start, len(words)):
+            node = node.get(words[i])
+            if node is None:
+                break
+            if _value_key in node:
+                result = (i + 1, node[_value_key])
+        return result
+
+    def tag(self, text):
+        """Split the text into tokens
+
+        Results:
+            the list of Token, the value is the socrname for types
+        """
+        assert isinstance(text, str)
+        tokens = _words_pattern.findall(text)
+        words = [token.lower() for token in tokens]
+        result = []
+        i = 0
+        while i < len(tokens):
+            word = words[i]
+            if word.isdigit():
+                tag = POSTCODE_TAG if len(word) >= _postcode_len \
+                    else HOUSE_TAG
+                result.append(Token(tag, tokens[i], None))
+                i += 1
+                continue
+            if not word.isalpha():
+                i += 1
+                continue
+
+            match = self._match(words, i)
+            if word in self.house_markers and _is_number_next(words, i + 1):
+                result.append(Token(STOP_TAG, tokens[i], None))
+                i += 1
+            elif (match is not None and match[0] == i + 1 and len(word) == 1
+                    and i > 0 and words[i - 1].isdigit()
+                    and len(words[i - 1]) < _postcode_len):
+                # a letter of the house number
+                result.append(Token(HOUSE_TAG, tokens[i], None))
+                i += 1
+            elif match is not None:
+                end, (tag, value) = match
+                result.append(Token(tag, " ".join(tokens[i:end]), value))
+                i = end
+            elif word in self.house_markers:
+                result.append(Token(STOP_TAG, tokens[i], None))
+                i += 1
+            else:
+                result.append(Token(NAME_TAG, tokens[i], None))
+                i += 1
+        return result
+
+    def recognize(self, text, with_house_nums=True):
+        """Split the address text as parser.tokenize_address and find
+        the address object types
+
+        Results:
+            RecognizedAddress, socrnames is the sorted list
+        """
+        names = []
+        postcodes = []
+        socrnames = set()
+        for token in self.tag(text):
+            if token.tag == NAME_TAG:
+                if len(token.text) > self.min_word_len:
+                    names.append(token.text)
+            elif token.tag == TYPE_TAG:
+                socrnames.add(token.value)
+            elif token.tag == POSTCODE_TAG:
+                postcodes.extend(
+                    token.text[i:i + _postcode_len]
+                    for i in range(0, len(token.text) - _postcode_len + 1,
+                                   _postcode_len))
+        house_nums = _parse_house_nums(text) if with_house_nums else set()
+        return RecognizedAddress(
+            names, house_nums, postcodes, sorted(socrnames))
+
+    def exclude_types(self, socrnames):
+        """Find the types of the same levels as the socrnames, but not
+        the socrnames
+
+        A type of several levels, e.g. "г", is excluded only if all its
+        levels are found.
+
+        Results:
+            the sorted list of socrnames
+        """
+        levels = set()
+        for socrname in socrnames:
+            levels.update(self._levels.get(socrname, ()))
+        result = set()
+        for level in levels:
+            result.update(
+                socrname for socrname in self._level_types[level]
+                if self._levels[socrname] <= levels)
+        return sorted(result - set(socrnames))
+
+    def split_types(self, words):
+        """Separate the single word types, e.g. after the spellchecker
+
+        Results:
+            the list of the other words and the list of socrnames
+        """
+        names = []
+        socrnames = []
+        for word in words:
+            match = self._trie.get(word.lower(), {}).get(_value_key)
+            if match is not None and match[0] == TYPE_TAG:
+                socrnames.append(match[1])
+            else:
+                names.append(word)
+        return names, socrnames
+
+
+def _is_number_next(words, start):
+    """Check that the next word, after punctuation, is a number
+    """
+    for word in words[start:]:
+        if word.isdigit():
+            return True
+        if word.isalpha():
+            return False
+    return False
@@ -0,0 +1,182 @@
+"""Persistent worker: a warm Converter serving line-delimited json
+
+Each request is a json object on one line:
+    {"id": 1, "address": "...", "check_grammar": true, "top_k": 3,
+     "addrobj_only": false}
+Only "address" is required, the other keys default to the arguments
+of ConverterServer. Each response is a json object on one line with
+the id of its request:
+    {"id": 1, "results": [{"address": "...", "aoguid_path": [...],
+                           "postcode": "..."}]}
+    {"id": 1, "error": "..."}
+
+Requests are converted concurrently, so the responses are written
+as soon as they are ready, not in the order of the requests.
+"""
+from .writers import ADDRESS_COLUMN, AOGUID_PATH_COLUMN, POSTCODE_COLUMN
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import os
+import socketserver
+import stat
+import threading
+
+
+ID_KEY = "id"
+ADDRESS_KEY = "address"
+RESULTS_KEY = "results"
+ERROR_KEY = "error"
+ADDROBJ_ONLY_KEY = "addrobj_only"
+CHECK_GRAMMAR_KEY = "check_grammar"
+TOP_K_KEY = "top_k"
+
+
+class ConverterServer(object):
+    """Convert the requests of line-delimited json streams on a pool
+    of threads sharing one Converter
+
+    The converter is created once, so the dictionaries, the spellchecker
+    and the driver connections stay warm between the requests.
+    At most max_pending requests of a stream are in flight, reading
+    the stream waits for free slots.
+    """
+    def __init__(self,
+                 converter,
+                 max_workers=8,
+                 max_pending=None,
+                 addrobj_only=True,
+                 is_check_grammar=False,
+                 top_k=None):
+        """Create ConverterServer
+
+        Args:
+            converter: Converter, it is used from several threads
+            max_workers: int, a number of threads
+            max_pending: int, the maximal number of requests in flight
+                            per stream, 4 per thread by default
+            addrobj_only: bool, the default of the requests
+            is_check_grammar: bool, the default of the requests
+            top_k: int, the default of the requests
+        """
+        assert max_workers > 0
+        self.converter = converter
+        self.max_workers = max_workers
+        self.max_pending = max_pending or 4 * max_workers
+        self.addrobj_only = addrobj_only
+        self.is_check_grammar = is_check_grammar
+        self.top_k = top_k
+        self._pool = None
+
+    def __enter__(self):
+        self._pool = ThreadPoolExecutor(self.max_workers)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def handle_request(self, line):
+        """Convert one request line
+
+        Results:
+            the response dict
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a json object")
+            request_id = request.get(ID_KEY)
+            address = request[ADDRESS_KEY]
+            if not isinstance(address, str):
+                raise ValueError("address must be a string")
+            top_k = request.get(TOP_K_KEY, self.top_k)
+            if top_k is not None and (
+                    not isinstance(top_k, int) or isinstance(top_k, bool)
+                    or top_k <= 0):
+                raise ValueError("top_k must be a positive integer or null")
+            address_list = self.converter.convert(
+                address,
+                addrobj_only=request.get(
+                    ADDROBJ_ONLY_KEY, self.addrobj_only),
+                is_check_grammar=request.get(
+                    CHECK_GRAMMAR_KEY, self.is_check_grammar),
+                top_k=top_k)
+        except Exception as e:
+            return {ID_KEY: request_id,
+                    ERROR_KEY: "{0}: {1}".format(type(e).__name__, e)}
+        return {ID_KEY: request_id,
+                RESULTS_KEY: [_address_to_dict(a) for a in address_list]}
+
+    def serve(self, infile, outfile):
+        """Read the requests until the end of infile and write
+        the responses into outfile
+
+        Args:
+            infile: a text file of requests
+            outfile: a text file, it is flushed after each response
+        """
+        assert self._pool is not None, "At first start the server"
+        write_lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.max_pending)
+        futures = set()
+
+        def respond(line):
+            try:
+                response = self.handle_request(line)
+                with write_lock:
+                    outfile.write(
+                        json.dumps(response, ensure_ascii=False) + "\n")
+                    outfile.flush()
+            finally:
+                slots.release()
+
+        for line in infile:
+            if not line.strip():
+                continue
+            slots.acquire()
+            futures = set(f for f in futures if not f.done())
+            futures.add(self._pool.submit(respond, line))
+        for future in futures:
+            future.result()
+
+    def create_unix_server(self, path):
+        """Create the server of a Unix socket, each connection
+        is a stream of requests
+
+        A stale socket file at path is removed.
+
+        Results:
+            socketserver.UnixStreamServer, call its serve_forever
+        """
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+        server = _UnixServer(path, _StreamHandler)
+        server.converter_server = self
+        return server
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _StreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        infile = io.TextIOWrapper(self.rfile, encoding="utf8")
+        outfile = io.TextIOWrapper(self.wfile, encoding="utf8")
+        try:
+            self.server.converter_server.serve(infile, outfile)
+        finally:
+            infile.detach()
+            outfile.detach()
+
+
+def _address_to_dict(address):
+    return {ADDRESS_COLUMN: address.calc_address_string(),
+            AOGUID_PATH_COLUMN: [a.aoguid for a in address.addr_path],
+            POSTCODE_COLUMN: address.postalcode}
@@ -0,0 +1,256 @@
+"""Binary snapshot of the spellchecker dictionaries
+
+The snapshot keeps the words of the PWL and counted dictionaries
+with their frequencies and the SymSpell deletes index in sorted string
+tables. It is opened with mmap, so the loading takes no time and
+forked processes share the memory pages.
+
+Build a snapshot:
+    python -m address_converter.snapshot <pwl file> <counted json> <output>
+"""
+from collections.abc import Mapping
+from .suggester import SymSpellSuggester
+import argparse
+import io
+import json
+import mmap
+import struct
+
+
+_MAGIC = b"ACSNAP01"
+_HEADER = struct.Struct("<8s10Q")
+_ALIGN = 8
+
+
+class _StringTable(object):
+    """Sorted strings stored as an offsets array and a bytes blob
+    """
+    def __init__(self, buf, offsets_pos, blob_pos, count):
+        self._buf = buf
+        self._offsets = buf[offsets_pos:offsets_pos + 4 * (count + 1)] \
+            .cast("I")
+        self._blob_pos = blob_pos
+        self.count = count
+
+    def item(self, index):
+        return self._get(index).decode("utf8")
+
+    def find(self, key):
+        """Find the index of the string, or -1
+        """
+        key = key.encode("utf8")
+        index = self._lower_bound(key)
+        if index < self.count and self._get(index) == key:
+            return index
+        return -1
+
+    def has_prefix(self, prefix):
+        """Check that some string starts with the prefix
+        """
+        prefix = prefix.encode("utf8")
+        index = self._lower_bound(prefix)
+        return index < self.count and self._get(index).startswith(prefix)
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._get(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _get(self, index):
+        return bytes(self._buf[
+            self._blob_pos + self._offsets[index]:
+            self._blob_pos + self._offsets[index + 1]])
+
+
+class SnapshotDict(Mapping):
+    """Read-only counted dictionary backed by the snapshot
+    """
+    def __init__(self, words, freqs, size):
+        self._words = words
+        self._freqs = freqs
+        self._size = size
+
+    def __getitem__(self, word):
+        if not isinstance(word, str):
+            raise KeyError(word)
+        index = self._words.find(word)
+        if index < 0 or self._freqs[index] < 0:
+            raise KeyError(word)
+        return self._freqs[index]
+
+    def __iter__(self):
+        for index in range(self._words.count):
+            if self._freqs[index] >= 0:
+                yield self._words.item(index)
+
+    def __len__(self):
+        return self._size
+
+    def has_prefix(self, prefix):
+        """Check that a word of the snapshot starts with the prefix
+
+        The words of the PWL dictionary are checked too.
+        """
+        return self._words.has_prefix(prefix)
+
+    def max_count(self):
+        """Get the maximal frequency of the counted words
+        """
+        return max(self._freqs, default=0)
+
+    def all_words(self):
+        """Iterate over the words of both dictionaries
+        """
+        for index in range(self._words.count):
+            yield self._words.item(index)
+
+
+class _SnapshotDeletes(object):
+    """SymSpell deletes index backed by the snapshot
+    """
+    def __init__(self, deletes, postings_offsets, postings, words):
+        self._deletes = deletes
+        self._postings_offsets = postings_offsets
+        self._postings = postings
+        self._words = words
+
+    def get(self, delete, default=None):
+        index = self._deletes.find(delete)
+        if index < 0:
+            return default
+        return [self._words.item(word_id) for word_id in self._postings[
+            self._postings_offsets[index]:self._postings_offsets[index + 1]]]
+
+
+class Snapshot(object):
+    def __init__(self, filename):
+        """Open the snapshot file
+
+        Args:
+            filename: str, the file created by the function build_snapshot
+        """
+        self._file = io.open(filename, "rb")
+        self._mmap = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        (magic, words_count, counted_count, words_offsets, words_blob,
+         freqs, deletes_count, deletes_offsets, deletes_blob,
+         postings_offsets, postings) = _HEADER.unpack_from(buf)
+        if magic != _MAGIC:
+            raise ValueError("Wrong snapshot file: {0}".format(filename))
+        self.max_distance, self.prefix_length = struct.unpack_from(
+            "<II", buf, _HEADER.size)
+
+        words = _StringTable(buf, words_offsets, words_blob, words_count)
+        self.counted_dict = SnapshotDict(
+            words,
+            buf[freqs:freqs + 8 * words_count].cast("q"),
+            counted_count)
+        postings_offsets = buf[
+            postings_offsets:postings_offsets + 4 * (deletes_count + 1)] \
+            .cast("I")
+        self.deletes = _SnapshotDeletes(
+            _StringTable(buf, deletes_offsets, deletes_blob, deletes_count),
+            postings_offsets,
+            buf[postings:postings + 4 * postings_offsets[-1]].cast("I"),
+            words)
+
+    def create_suggester(self):
+        return SymSpellSuggester(
+            self.counted_dict,
+            self.max_distance,
+            self.prefix_length,
+            deletes=self.deletes)
+
+
+def _pack_strings(strings):
+    offsets = [0]
+    blob = bytearray()
+    for s in strings:
+        blob += s
+        offsets.append(len(blob))
+    return struct.pack("<{0}I".format(len(offsets)), *offsets), bytes(blob)
+
+
+def _align(output):
+    output.write(b"\0" * (-output.tell() % _ALIGN))
+    return output.tell()
+
+
+def build_snapshot(enchant_dict_filename,
+                   counted_dict_filename,
+                   snapshot_filename,
+                   max_distance=2,
+                   prefix_length=7):
+    """Compile the spellchecker dictionaries into one snapshot file
+
+    Args:
+        enchant_dict_filename: str, the PWL file, a word per line
+        counted_dict_filename: str, the json file with word frequencies
+        snapshot_filename: str, the output file
+    """
+    with io.open(counted_dict_filename, "r") as input_file:
+        counted_dict = json.load(input_file)
+    words = set(counted_dict)
+    with io.open(enchant_dict_filename, "r") as input_file:
+        words.update(line.strip() for line in input_file if line.strip())
+
+    words = sorted(words, key=lambda w: w.encode("utf8"))
+    word_ids = {word: i for i, word in enumerate(words)}
+    suggester = SymSpellSuggester(
+        {}, max_distance=max_distance, prefix_length=prefix_length)
+    for word in words:
+        suggester.add_word(word)
+    deletes = sorted(suggester.deletes, key=lambda d: d.encode("utf8"))
+
+    words_offsets, words_blob = _pack_strings(w.encode("utf8") for w in words)
+    deletes_offsets, deletes_blob = _pack_strings(
+        d.encode("utf8") for d in deletes)
+    postings = []
+    postings_offsets = [0]
+    for delete in deletes:
+        postings.extend(word_ids[w] for w in suggester.deletes[delete])
+        postings_offsets.append(len(postings))
+
+    with io.open(snapshot_filename, "wb") as output:
+        output.write(b"\0" * (_HEADER.size + 8))
+        sections = []
+        for data in (words_offsets,
+                     words_blob,
+                     struct.pack("<{0}q".format(len(words)),
+                                 *[counted_dict.get(w, -1) for w in words]),
+                     deletes_offsets,
+                     deletes_blob,
+                     struct.pack("<{0}I".format(len(postings_offsets)),
+                                 *postings_offsets),
+                     struct.pack("<{0}I".format(len(postings)), *postings)):
+            sections.append(_align(output))
+            output.write(data)
+        output.seek(0)
+        output.write(_HEADER.pack(
+            _MAGIC, len(words), len(counted_dict),
+            sections[0], sections[1], sections[2],
+            len(deletes), sections[3], sections[4], sections[5], sections[6]))
+        output.write(struct.pack("<II", max_distance, prefix_length))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build the spellchecker dictionaries snapshot')
+    parser.add_argument('enchant_dict_filename')
+    parser.add_argument('counted_dict_filename')
+    parser.add_argument('snapshot_filename')
+    args = parser.parse_args()
+    build_snapshot(
+        args.enchant_dict_filename,
+        args.counted_dict_filename,
+        args.snapshot_filename)
+
+
+if __name__ == "__main__":
+    main()
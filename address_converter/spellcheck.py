@@ -1,7 +1,15 @@
-import enchant
+from .cache import LRUCache
+from .snapshot import Snapshot
+from .suggester import SymSpellSuggester
+from collections.abc import Mapping
 import re
 import io
 import json
+import time
+
+
+ENCHANT_BACKEND = "enchant"
+SYMSPELL_BACKEND = "symspell"
 
 
 class CheckStatus(object):
@@ -74,53 +82,178 @@ class SpellChecker(object):
 
     It splits the text into words and check each of them.
     """
-    def __init__(self, enchant_dict, counted_dict):
+    def __init__(self,
+                 enchant_dict,
+                 counted_dict,
+                 cache_size=0,
+                 max_operations=None,
+                 time_budget=None,
+                 prefix_index=True):
         """Create SpellChecker
 
         Args:
-            enchant_dict: an instance of enchant.Dict. Need for check spelling
+            enchant_dict: an instance of enchant.Dict or SymSpellSuggester.
+                            Need for check spelling
             counted_dict: an instance of a simple Dictionary. It contains all words
                             and the frequency of their occurrence in the addresses.
+            cache_size: int, the maximal number of cached results of
+                            the word check. Zero disables the cache.
+            max_operations: int, the maximal number of word checks in one
+                            call of check_words, None for no limit
+            time_budget: float, the maximal number of seconds of one call
+                            of check_words, None for no limit
+            prefix_index: bool, build the set of the word prefixes of
+                            counted_dict on the first use and skip
+                            the splits whose first part is not a word.
+                            A snapshot dictionary answers the prefixes
+                            from its sorted words, no set is built.
         """
-        assert isinstance(enchant_dict, enchant.Dict)
-        assert isinstance(counted_dict, dict)
+        assert hasattr(enchant_dict, 'suggest')
+        assert isinstance(counted_dict, Mapping)
         self.enchant_dict = enchant_dict
         self.counted_dict = counted_dict
+        self.cache = LRUCache(cache_size) if cache_size > 0 else None
+        self.max_operations = max_operations
+        self.time_budget = time_budget
+        self.prefix_index = prefix_index
+        self._prefixes = None
+        self._max_dict_score = None
         self._pattern_not_symbol = re.compile(r"[^a-zA-Zа-яА-ЯёЁ]")
 
 
     @staticmethod
-    def create(enchant_dict_filename=None, counted_dict_filename=None):
-        enchant_dict = enchant.request_pwl_dict(enchant_dict_filename)
+    def create(enchant_dict_filename=None,
+               counted_dict_filename=None,
+               cache_size=0,
+               backend=ENCHANT_BACKEND,
+               **kwargs):
+        """Create SpellChecker from the dictionary files
+
+        Args:
+            backend: ENCHANT_BACKEND uses enchant with the PWL file
+                        enchant_dict_filename, SYMSPELL_BACKEND uses
+                        SymSpellSuggester built over the counted dictionary
+            kwargs: the other arguments of SpellChecker
+        """
         with io.open(counted_dict_filename, "r") as input_file:
             counted_dict = json.load(input_file)
-        return SpellChecker(enchant_dict, counted_dict)
+        if backend == SYMSPELL_BACKEND:
+            suggester = SymSpellSuggester(counted_dict)
+        elif backend == ENCHANT_BACKEND:
+            import enchant
+            suggester = enchant.request_pwl_dict(enchant_dict_filename)
+        else:
+            raise ValueError(
+                "Unknown spellchecker backend: {0}".format(backend))
+        return SpellChecker(suggester, counted_dict, cache_size, **kwargs)
+
+
+    @staticmethod
+    def load_snapshot(snapshot_filename, cache_size=0, **kwargs):
+        """Create SpellChecker from the dictionaries snapshot
+
+        The snapshot is built by address_converter.snapshot.build_snapshot
+        and memory-mapped, the SymSpell backend is used for suggestions.
+        """
+        snapshot = Snapshot(snapshot_filename)
+        return SpellChecker(
+            snapshot.create_suggester(),
+            snapshot.counted_dict,
+            cache_size,
+            **kwargs)
 
 
-    def check_words(self, words_list):
+    def cache_info(self):
+        """Get hits, misses and evictions of the word check cache
+        """
+        return self.cache.info() if self.cache is not None else None
+
+
+    def reset_index(self):
+        """Drop the prefix index, call it after counted_dict is changed
+        """
+        self._prefixes = None
+        self._max_dict_score = None
+
+
+    def update_words(self, changed, added=(), removed=()):
+        """Update the suggester, the index and the cache after the
+        frequencies of counted_dict are changed
+
+        Only the cached results of the changed words and the misspelled
+        words, whose suggestions can change, are dropped.
+
+        Args:
+            changed: the set of the words with changed frequencies
+            added: the words added to counted_dict
+            removed: the words removed from counted_dict
+        """
+        changed = set(changed) | set(added) | set(removed)
+        for word in added:
+            if hasattr(self.enchant_dict, "add_word"):
+                self.enchant_dict.add_word(word)
+            elif hasattr(self.enchant_dict, "add_to_session"):
+                self.enchant_dict.add_to_session(word)
+        for word in removed:
+            if hasattr(self.enchant_dict, "remove_word"):
+                self.enchant_dict.remove_word(word)
+            elif hasattr(self.enchant_dict, "remove_from_session"):
+                self.enchant_dict.remove_from_session(word)
+
+        # extra prefixes and the stale maximum only disable the shortcuts
+        if self._prefixes is not None:
+            if isinstance(self._prefixes, set):
+                for word in added:
+                    self._prefixes.update(
+                        word[:i] for i in range(1, len(word) + 1))
+            self._max_dict_score = max(
+                [self._max_dict_score] + [
+                    int(self.counted_dict.get(word, 0)) for word in changed])
+
+        if self.cache is not None and any(changed):
+            self.cache.invalidate_items_if(
+                lambda key, result: key[0] in changed
+                or result.word_result in changed
+                or not result.is_good())
+
+
+    def check_words(self, words_list, max_operations=None, time_budget=None):
         """Take a list of words and check them
 
+        When the budget is spent, the rest of the words are only checked
+        one by one, without joining and splitting.
+
         Args:
             words_list: the list of words on the check
+            max_operations: int, overrides SpellChecker.max_operations
+            time_budget: float, overrides SpellChecker.time_budget
         Returns:
             result_list: the list of correct words
         """
+        budget = _Budget.create(
+            max_operations if max_operations is not None
+            else self.max_operations,
+            time_budget if time_budget is not None else self.time_budget)
         result_list = []
         len_splited_text_iter = iter(range(len(words_list)))
         for i in len_splited_text_iter:
             word_1 = words_list[i]
             cw_1 = self.check_word(words_list[i])
 
+            if budget is not None and not budget.spend():
+                if cw_1.is_good() or cw_1.is_misspell():
+                    result_list.append(cw_1.word_result)
+                continue
             if len(words_list) - 1 > i:
                 cw_2 = self.check_word(words_list[i + 1], True)
-                tmp_list = self._check_two_words(cw_1, cw_2)
+                tmp_list = self._check_two_words(cw_1, cw_2, budget)
                 if any(tmp_list):
                     result_list.extend(tmp_list)
                     next(len_splited_text_iter)
                     continue
             if not cw_1.is_good() and cw_1.is_word():
                 cw_remix_list, cw_remix_list_score = \
-                    self._shuffle_symbols(word_1)
+                    self._shuffle_symbols(word_1, budget=budget)
                 if (cw_remix_list is not None
                         and cw_remix_list_score >= cw_1.score):
                     result_list.extend([cw.word_result
@@ -131,7 +264,7 @@ class SpellChecker(object):
         return result_list
 
 
-    def _check_two_words(self, cw_1, cw_2):
+    def _check_two_words(self, cw_1, cw_2, budget=None):
         result_list = []
         if not cw_1.is_word() or not cw_2.is_word():
             return result_list
@@ -145,7 +278,8 @@ class SpellChecker(object):
 
         elif not cw_1.is_good() or not cw_2.is_word():
             cw_remix_list, cw_remix_list_score = \
-                self._shuffle_symbols(cw_1.word_orig, cw_2.word_orig)
+                self._shuffle_symbols(
+                    cw_1.word_orig, cw_2.word_orig, budget)
             if (cw_remix_list is not None
                     and cw_remix_list_score > cw_max_score):
                 result_list.extend([cw.word_result
@@ -153,12 +287,14 @@ class SpellChecker(object):
         return result_list
 
 
-    def _shuffle_symbols(self, word_1, word_2=None):
+    def _shuffle_symbols(self, word_1, word_2=None, budget=None):
         """Shuffle the letters and looking for the correct words
 
         One by one rearranges the letters from the second word
         into the first, looking for the pair of the correct words
-        with a maximum score.
+        with a maximum score. The search stops when the first part
+        is not a prefix of any word, when no pair can have a greater
+        score or when the budget is spent.
 
         Returns:
             result_pair: the list of two correct words
@@ -168,12 +304,20 @@ class SpellChecker(object):
         result_pair = None
         combined_word = word_1 + word_2
         result_score = 0
-        splits = [[combined_word[:i], combined_word[i:]]
-                  for i in range(1, len(combined_word))]
-        for item in splits:
-            cw_0 = self.check_word(item[0], True)
-            cw_1 = self.check_word(item[1], True)
-            if cw_0.is_good() and cw_1.is_good():
+        prefixes, max_dict_score = self._get_index()
+        for i in range(1, len(combined_word)):
+            if max_dict_score is not None and result_score >= max_dict_score:
+                break
+            head = combined_word[:i]
+            if prefixes is not None and head not in prefixes:
+                break
+            if budget is not None and not budget.spend():
+                break
+            cw_0 = self.check_word(head, True)
+            if not cw_0.is_good():
+                continue
+            cw_1 = self.check_word(combined_word[i:], True)
+            if cw_1.is_good():
                 score = _max_score([cw_0, cw_1])
                 if score > result_score:
                     result_pair = [cw_0, cw_1]
@@ -181,6 +325,26 @@ class SpellChecker(object):
         return result_pair, result_score
 
 
+    def _get_index(self):
+        """Get the prefix set and the maximal score of counted_dict
+        """
+        if not self.prefix_index:
+            return None, None
+        if self._prefixes is None and hasattr(self.counted_dict, "has_prefix"):
+            # the snapshot pages are shared by the forked processes
+            self._prefixes = _DictPrefixes(self.counted_dict)
+            self._max_dict_score = self.counted_dict.max_count()
+        elif self._prefixes is None:
+            prefixes = set()
+            max_dict_score = 0
+            for word, score in self.counted_dict.items():
+                prefixes.update(word[:i] for i in range(1, len(word) + 1))
+                max_dict_score = max(max_dict_score, int(score))
+            self._max_dict_score = max_dict_score
+            self._prefixes = prefixes
+        return self._prefixes, self._max_dict_score
+
+
     def check_word(self, word, with_suggestions=False, min_len=2):
         """Check a single word
 
@@ -191,6 +355,18 @@ class SpellChecker(object):
         Returns:
             CheckResult class instance
         """
+        if self.cache is None:
+            return self._check_word(word, with_suggestions, min_len)
+
+        key = (word, with_suggestions, min_len)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._check_word(word, with_suggestions, min_len)
+            self.cache.put(key, result)
+        return result
+
+
+    def _check_word(self, word, with_suggestions, min_len):
         if (word is None
                 or self._pattern_not_symbol.search(word) is not None):
             return CheckResult.new_not_word(word)
@@ -214,6 +390,42 @@ class SpellChecker(object):
         return CheckResult(result_status, result_word, word, result_score)
 
 
+class _DictPrefixes(object):
+    """Prefixes of the dictionary words checked with has_prefix
+    """
+    __slots__ = ("_dict",)
+
+    def __init__(self, words_dict):
+        self._dict = words_dict
+
+    def __contains__(self, prefix):
+        return self._dict.has_prefix(prefix)
+
+
+class _Budget(object):
+    """Operation and time limits of one call of check_words
+    """
+    def __init__(self, max_operations, time_budget):
+        self.operations = max_operations
+        self.deadline = None if time_budget is None \
+            else time.monotonic() + time_budget
+
+    @staticmethod
+    def create(max_operations, time_budget):
+        if max_operations is None and time_budget is None:
+            return None
+        return _Budget(max_operations, time_budget)
+
+    def spend(self):
+        """Spend one operation, return False if the budget is exhausted
+        """
+        if self.operations is not None:
+            if self.operations <= 0:
+                return False
+            self.operations -= 1
+        return self.deadline is None or time.monotonic() < self.deadline
+
+
 def _max_score(check_result):
     """Take a list of CheckResult and calculates the average of scores
     """
@@ -0,0 +1,121 @@
+class SymSpellSuggester(object):
+    """Suggest words by the symmetric delete algorithm
+
+    Every dictionary word is indexed by the strings produced by deleting
+    up to max_distance letters from its prefix. The word to check
+    generates its own deletes, so candidates are found by dictionary
+    lookups instead of a scan over the whole dictionary.
+    It can be used by SpellChecker instead of enchant.Dict.
+    """
+    def __init__(self,
+                 counted_dict,
+                 max_distance=2,
+                 prefix_length=7,
+                 deletes=None):
+        """Create SymSpellSuggester
+
+        Args:
+            counted_dict: dict, words and the frequency of their occurrence
+            max_distance: int, the maximal edit distance of suggestions
+            prefix_length: int, the length of the indexed word prefix
+            deletes: a prebuilt deletes index, e.g. from the snapshot.
+                        If it is None, the index is built over counted_dict
+        """
+        assert max_distance > 0
+        assert prefix_length > max_distance
+        self.counted_dict = counted_dict
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.deletes = deletes
+        if deletes is None:
+            self.deletes = {}
+            for word in counted_dict:
+                self.add_word(word)
+
+    def add_word(self, word):
+        for delete in self._create_deletes(word[:self.prefix_length]):
+            words = self.deletes.get(delete)
+            if words is None:
+                self.deletes[delete] = [word]
+            elif word not in words:
+                words.append(word)
+
+    def remove_word(self, word):
+        for delete in self._create_deletes(word[:self.prefix_length]):
+            words = self.deletes.get(delete)
+            if words is not None and word in words:
+                words.remove(word)
+                if not any(words):
+                    del self.deletes[delete]
+
+    def _create_deletes(self, word):
+        result = {word}
+        edits = {word}
+        for _ in range(self.max_distance):
+            next_edits = set()
+            for edit in edits:
+                for i in range(len(edit)):
+                    next_edits.add(edit[:i] + edit[i + 1:])
+            result |= next_edits
+            edits = next_edits
+        return result
+
+    def suggest(self, word):
+        """Find the nearest dictionary words
+
+        Returns:
+            the list of words with the minimal edit distance to the word,
+            sorted by frequency
+        """
+        if not word:
+            return []
+        candidates = set()
+        for delete in self._create_deletes(word[:self.prefix_length]):
+            candidates.update(self.deletes.get(delete, ()))
+
+        result = []
+        min_distance = self.max_distance
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) > min_distance:
+                continue
+            distance = edit_distance(word, candidate, min_distance)
+            if distance > min_distance:
+                continue
+            if distance < min_distance:
+                result = []
+                min_distance = distance
+            result.append(candidate)
+        result.sort(key=lambda s: (-self.counted_dict.get(s, 0), s))
+        return result
+
+
+def edit_distance(word_1, word_2, max_distance=None):
+    """Calculate the Damerau-Levenshtein distance (optimal string alignment)
+
+    Args:
+        max_distance: int, stop if the distance exceeds this value
+    Returns:
+        int, the distance, or max_distance + 1 if it is exceeded
+    """
+    if max_distance is None:
+        max_distance = max(len(word_1), len(word_2))
+    if abs(len(word_1) - len(word_2)) > max_distance:
+        return max_distance + 1
+
+    prev_row = None
+    row = list(range(len(word_2) + 1))
+    for i in range(1, len(word_1) + 1):
+        prev_prev_row, prev_row = prev_row, row
+        row = [i] + [0] * len(word_2)
+        for j in range(1, len(word_2) + 1):
+            cost = 0 if word_1[i - 1] == word_2[j - 1] else 1
+            row[j] = min(prev_row[j] + 1,
+                         row[j - 1] + 1,
+                         prev_row[j - 1] + cost)
+            if (i > 1 and j > 1
+                    and word_1[i - 1] == word_2[j - 2]
+                    and word_1[i - 2] == word_2[j - 1]):
+                row[j] = min(row[j], prev_prev_row[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+    return min(row[-1], max_distance + 1)
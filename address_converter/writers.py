@@ -0,0 +1,231 @@
+import csv
+import json
+import threading
+import time
+
+
+SEMICOLON_FORMAT = "semicolon"
+CSV_FORMAT = "csv"
+JSONL_FORMAT = "jsonl"
+PARQUET_FORMAT = "parquet"
+FORMATS = [SEMICOLON_FORMAT, CSV_FORMAT, JSONL_FORMAT, PARQUET_FORMAT]
+
+INPUT_COLUMN = "input"
+ADDRESS_COLUMN = "address"
+AOGUID_PATH_COLUMN = "aoguid_path"
+POSTCODE_COLUMN = "postcode"
+COLUMNS = [INPUT_COLUMN, ADDRESS_COLUMN, AOGUID_PATH_COLUMN, POSTCODE_COLUMN]
+
+
+class ResultWriter(object):
+    """Buffered writer of the conversion results
+
+    One row is written per Address. Rows are collected into columns
+    and written as a batch when the batch is full or when flush_interval
+    seconds have passed since the last flush. The interval is checked
+    by write, so on a stalled input the rows wait for the next write
+    unless background_flush is set: then a thread writes the rows
+    buffered for flush_interval.
+    """
+    def __init__(self,
+                 outfile,
+                 show_input=False,
+                 show_address=False,
+                 batch_size=1000,
+                 flush_interval=1.0,
+                 timer=time.monotonic,
+                 background_flush=False):
+        """Create ResultWriter
+
+        Args:
+            outfile: the output file
+            show_input: bool, write the input text
+            show_address: bool, write the formatted address
+                            (the other formats than semicolon always have
+                            all the columns)
+            batch_size: int, the maximal number of buffered rows
+            flush_interval: float, the maximal number of seconds
+                            between flushes, 0 flushes after each input
+            timer: function returning the current time in seconds
+            background_flush: bool, flush the buffered rows from
+                            a thread every flush_interval seconds
+        """
+        assert batch_size > 0
+        self.outfile = outfile
+        self.show_input = show_input
+        self.show_address = show_address
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._timer = timer
+        self._last_flush = timer()
+        self._columns = _create_columns()
+        self._size = 0
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._flush_thread = None
+        if background_flush and flush_interval > 0:
+            self._flush_thread = threading.Thread(
+                target=self._flush_periodically, daemon=True)
+            self._flush_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def write(self, input_str, address_list):
+        """Add the rows of the converted address
+
+        Args:
+            input_str: str, the input line
+            address_list: the list of Address objects
+        """
+        with self._lock:
+            self._add_rows(input_str, address_list)
+
+    def _add_rows(self, input_str, address_list):
+        for address in address_list:
+            self._columns[INPUT_COLUMN].append(input_str)
+            self._columns[ADDRESS_COLUMN].append(
+                address.calc_address_string()
+                if self._with_address() else None)
+            self._columns[AOGUID_PATH_COLUMN].append(
+                [addrobj.aoguid for addrobj in address.addr_path])
+            self._columns[POSTCODE_COLUMN].append(address.postalcode)
+            self._size += 1
+        if (self._size >= self.batch_size
+                or self._timer() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._size > 0:
+                self._write_batch(self._columns, self._size)
+                self._columns = _create_columns()
+                self._size = 0
+            self.outfile.flush()
+            self._last_flush = self._timer()
+
+    def close(self):
+        self._closed.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._size > 0:
+                    self.flush()
+
+    def _with_address(self):
+        return True
+
+    def _write_batch(self, columns, size):
+        raise NotImplementedError()
+
+
+class SemicolonWriter(ResultWriter):
+    """[<input text>];[<resulting formatted address>];<ID address objects>...
+    """
+    def _with_address(self):
+        return self.show_address
+
+    def _write_batch(self, columns, size):
+        lines = []
+        for i in range(size):
+            result = []
+            if self.show_input:
+                result.append(columns[INPUT_COLUMN][i][:-1])
+            if self.show_address:
+                result.append(columns[ADDRESS_COLUMN][i])
+            result.extend(columns[AOGUID_PATH_COLUMN][i])
+            lines.append(';'.join(result) + '\n')
+        self.outfile.write("".join(lines))
+
+
+class CsvWriter(ResultWriter):
+    """CSV with the header and the columns input, address, aoguid_path
+    and postcode; the aoguids of the path are separated by semicolons
+    """
+    def __init__(self, outfile, **kwargs):
+        super(CsvWriter, self).__init__(outfile, **kwargs)
+        self._writer = csv.writer(outfile, lineterminator='\n')
+        self._writer.writerow(COLUMNS)
+
+    def _write_batch(self, columns, size):
+        self._writer.writerows(zip(
+            [text.rstrip("\n") for text in columns[INPUT_COLUMN]],
+            columns[ADDRESS_COLUMN],
+            [";".join(path) for path in columns[AOGUID_PATH_COLUMN]],
+            columns[POSTCODE_COLUMN]))
+
+
+class JsonLinesWriter(ResultWriter):
+    """One json object per row with the keys input, address, aoguid_path
+    and postcode
+    """
+    def _write_batch(self, columns, size):
+        lines = []
+        for i in range(size):
+            row = dict((name, columns[name][i]) for name in COLUMNS)
+            row[INPUT_COLUMN] = row[INPUT_COLUMN].rstrip("\n")
+            lines.append(json.dumps(row, ensure_ascii=False) + '\n')
+        self.outfile.write("".join(lines))
+
+
+class ParquetWriter(ResultWriter):
+    """Parquet file with the columns input, address, aoguid_path (a list)
+    and postcode, each batch is a row group. It needs pyarrow.
+    """
+    def __init__(self, outfile, **kwargs):
+        import pyarrow
+        import pyarrow.parquet
+        super(ParquetWriter, self).__init__(outfile, **kwargs)
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([
+            (INPUT_COLUMN, pyarrow.string()),
+            (ADDRESS_COLUMN, pyarrow.string()),
+            (AOGUID_PATH_COLUMN, pyarrow.list_(pyarrow.string())),
+            (POSTCODE_COLUMN, pyarrow.string())])
+        # text files are written through their binary buffer
+        self._writer = pyarrow.parquet.ParquetWriter(
+            getattr(outfile, "buffer", outfile), self._schema)
+
+    def _write_batch(self, columns, size):
+        columns = dict(columns)
+        columns[INPUT_COLUMN] = [
+            text.rstrip("\n") for text in columns[INPUT_COLUMN]]
+        self._writer.write_table(self._pyarrow.Table.from_pydict(
+            columns, schema=self._schema))
+
+    def close(self):
+        super(ParquetWriter, self).close()
+        self._writer.close()
+        self.outfile.flush()
+
+
+_writers = {
+    SEMICOLON_FORMAT: SemicolonWriter,
+    CSV_FORMAT: CsvWriter,
+    JSONL_FORMAT: JsonLinesWriter,
+    PARQUET_FORMAT: ParquetWriter}
+
+
+def create_writer(output_format, outfile, **kwargs):
+    """Create the writer of the output format
+
+    Args:
+        output_format: one of FORMATS
+        outfile: the output file
+        kwargs: arguments of ResultWriter
+    """
+    if output_format not in _writers:
+        raise ValueError("Unknown output format: {0}".format(output_format))
+    return _writers[output_format](outfile, **kwargs)
+
+
+def _create_columns():
+    return dict((name, []) for name in COLUMNS)
@@ -0,0 +1,73 @@
+"""Run the benchmarks and write the results as json
+
+The output has the run parameters, the environment and the list of
+results, so the files of two runs can be compared.
+
+Usage:
+    python -m benchmarks [--count 1000] [--only parser spellcheck]
+                         [--output results.json]
+"""
+from .generator import generate_addresses, create_counted_dict
+from .suite import (
+    bench_parser,
+    bench_spellcheck,
+    bench_query_creator,
+    bench_converter)
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+
+
+BENCHMARKS = ["parser", "spellcheck", "query_creator", "converter"]
+
+
+def run(names, count, seed, repeat):
+    addresses = generate_addresses(count, seed)
+    counted_dict = create_counted_dict()
+    results = []
+    if "parser" in names:
+        results.extend(bench_parser(addresses, repeat))
+    if "spellcheck" in names:
+        results.extend(bench_spellcheck(addresses, counted_dict, repeat))
+    if "query_creator" in names:
+        results.extend(bench_query_creator(repeat=repeat))
+    if "converter" in names:
+        results.extend(bench_converter(
+            addresses, counted_dict, repeat=repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', default=1000, type=int,
+                        help='a number of synthetic addresses')
+    parser.add_argument('--seed', default=0, type=int)
+    parser.add_argument('--repeat', default=3, type=int)
+    parser.add_argument('--only', nargs='+', default=BENCHMARKS,
+                        choices=BENCHMARKS)
+    parser.add_argument('--output', default=None,
+                        help='the json file, stdout by default')
+    args = parser.parse_args()
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "count": args.count,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": run(args.only, args.count, args.seed, args.repeat)}
+
+    if args.output:
+        with io.open(args.output, "w", encoding="utf8") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Synthetic addresses built on the patterns of tests/address_list.txt
+
+Each address of the list is split by commas into parts, the parts are
+grouped by their kind (postal code, house, name). A synthetic address
+takes a random pattern and replaces each part by a random part of
+the same kind, some words get a typo.
+"""
+from address_converter.parser import parse_address_names
+from collections import Counter
+import io
+import os
+import random
+import re
+
+
+ADDRESS_LIST_FILENAME = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tests", "address_list.txt")
+
+POSTCODE = "postcode"
+HOUSE = "house"
+NAME = "name"
+
+_postcode_pattern = re.compile(r"^\d{6}$")
+_house_pattern = re.compile(r"\d")
+
+
+def part_kind(part):
+    if _postcode_pattern.match(part) is not None:
+        return POSTCODE
+    if _house_pattern.search(part) is not None:
+        return HOUSE
+    return NAME
+
+
+def load_patterns(filename=ADDRESS_LIST_FILENAME):
+    """Load the address patterns
+
+    Results:
+        patterns: the list of the address part kinds lists
+        parts: dict, the kind to the list of parts
+    """
+    patterns = []
+    parts = {POSTCODE: [], HOUSE: [], NAME: []}
+    with io.open(filename, "r", encoding="utf8") as input_file:
+        for line in input_file:
+            line_parts = [p.strip() for p in line.split(",") if p.strip()]
+            if not any(line_parts):
+                continue
+            kinds = []
+            for part in line_parts:
+                kind = part_kind(part)
+                kinds.append(kind)
+                parts[kind].append(part)
+            patterns.append(kinds)
+    return patterns, parts
+
+
+def add_typo(word, rnd):
+    """Swap, drop or double a letter of the word
+    """
+    if len(word) < 4:
+        return word
+    i = rnd.randrange(1, len(word) - 1)
+    typo = rnd.randrange(3)
+    if typo == 0:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if typo == 1:
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i] + word[i:]
+
+
+def generate_addresses(count,
+                       seed=0,
+                       typo_rate=0.1,
+                       filename=ADDRESS_LIST_FILENAME):
+    """Generate synthetic addresses
+
+    Args:
+        count: int, a number of addresses
+        seed: int, the seed of the random generator
+        typo_rate: float, the probability of a typo in a word
+    Results:
+        the list of address strings
+    """
+    rnd = random.Random(seed)
+    patterns, parts = load_patterns(filename)
+    addresses = []
+    for _ in range(count):
+        result = []
+        for kind in rnd.choice(patterns):
+            part = rnd.choice(parts[kind])
+            if kind == NAME and typo_rate > 0:
+                part = " ".join(
+                    add_typo(word, rnd) if rnd.random() < typo_rate
+                    else word for word in part.split(" "))
+            result.append(part)
+        addresses.append(", ".join(result))
+    return addresses
+
+
+def create_counted_dict(filename=ADDRESS_LIST_FILENAME):
+    """Count the lower case words of the address list
+    """
+    counted = Counter()
+    with io.open(filename, "r", encoding="utf8") as input_file:
+        for line in input_file:
+            counted.update(
+                word for word in parse_address_names(line.lower(), 0)
+                if word.isalpha())
+    return dict(counted)
@@ -0,0 +1,84 @@
+"""Measure the memory used by the converted addresses
+
+Converts synthetic query records with repeated regions and cities into
+Address objects and reports the memory allocated according to
+tracemalloc, compared with plain objects that keep a __dict__.
+
+Usage:
+    python -m benchmarks.memory [--records 100000]
+"""
+from address_converter.neo4j_query_creator import convert_to_addr_objects
+import argparse
+import gc
+import tracemalloc
+
+
+class DictAddrObject(object):
+    def __init__(self, aoguid, name, type_obj, postalcode):
+        self.aoguid = aoguid
+        self.name = name
+        self.type_obj = type_obj
+        self.postalcode = postalcode
+
+
+class DictAddress(object):
+    def __init__(self, addr_path):
+        self.addr_path = tuple(addr_path)
+        self.house_num = 0
+        self.house_num_liter = ""
+
+
+def convert_to_dict_objects(records):
+    return [DictAddress([DictAddrObject(*arg) for arg in zip(
+        record["AddrobjAoguid"],
+        record["AddrobjOffname"],
+        record["AddrobjSocrname"],
+        record["AddrobjPostalcode"])])
+        for record in records]
+
+
+def create_records(records_num, regions_num=80, cities_num=20):
+    """Create records region - city - street; streets are unique
+    """
+    records = []
+    for i in range(records_num):
+        region = i % regions_num
+        city = "{0}-{1}".format(region, i % cities_num)
+        records.append({
+            "AddrobjAoguid": ["region-{0}".format(region),
+                              "city-{0}".format(city),
+                              "street-{0}".format(i)],
+            "AddrobjOffname": ["Регион {0}".format(region),
+                               "Город {0}".format(city),
+                               "Улица {0}".format(i)],
+            "AddrobjSocrname": ["обл", "г", "ул"],
+            "AddrobjPostalcode": ["", "", "{0:06d}".format(i)]})
+    return records
+
+
+def measure(convert, records):
+    gc.collect()
+    tracemalloc.start()
+    result = convert(records)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', default=100000, type=int)
+    args = parser.parse_args()
+
+    records = create_records(args.records)
+    print("{0:>12} {1:>14} {2:>14}".format("objects", "size, KiB", "peak, KiB"))
+    for name, convert in (("dict", convert_to_dict_objects),
+                          ("slots", convert_to_addr_objects)):
+        size, peak = measure(convert, records)
+        print("{0:>12} {1:>14.0f} {2:>14.0f}".format(
+            name, size / 1024.0, peak / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare the match strategies of create_query
+
+Prints the query length and the creation time for each number of words
+and nodes. If a server address is given, it also measures the time
+the server needs to plan the query (EXPLAIN).
+
+Usage:
+    python -m benchmarks.query_creator [--server bolt://localhost:7687]
+"""
+from address_converter.neo4j_query_creator import (
+    MIX_STRATEGY,
+    SET_STRATEGY,
+    create_query)
+import argparse
+import timeit
+
+
+WORDS = ["москва", "ленинградская", "виноградный", "маршала", "жукова",
+         "набережная", "комсомольская", "челябинск", "троицкий", "тракт"]
+
+
+def measure_creation(words, node_max_num, strategy, repeat=3):
+    timer = timeit.Timer(lambda: create_query(
+        words, [], [], node_max_num=node_max_num, match_strategy=strategy))
+    return min(timer.repeat(repeat, 1)), len(create_query(
+        words, [], [], node_max_num=node_max_num, match_strategy=strategy))
+
+
+def measure_planning(session, words, node_max_num, strategy, repeat=3):
+    query = create_query(
+        words, [], [], node_max_num=node_max_num, match_strategy=strategy)
+    timer = timeit.Timer(lambda: session.run("EXPLAIN " + query).consume())
+    return min(timer.repeat(repeat, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', default=None,
+                        help='neo4j server address for planning time')
+    parser.add_argument('--login', default='neo4j')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--maxnodes', default=4, type=int, dest='max_nodes')
+    parser.add_argument('--maxwords', default=len(WORDS), type=int,
+                        dest='max_words')
+    args = parser.parse_args()
+
+    session = None
+    if args.server:
+        from neo4j.v1 import GraphDatabase, basic_auth
+        driver = GraphDatabase.driver(
+            args.server, auth=basic_auth(args.login, args.password))
+        session = driver.session()
+
+    print("{0:>5} {1:>5} {2:>4} {3:>10} {4:>12} {5:>12}".format(
+        "words", "nodes", "type", "length", "create, ms", "plan, ms"))
+    for node_max_num in range(1, args.max_nodes + 1):
+        for words_num in range(node_max_num, args.max_words + 1):
+            words = WORDS[:words_num]
+            for strategy in (MIX_STRATEGY, SET_STRATEGY):
+                create_time, length = measure_creation(
+                    words, node_max_num, strategy)
+                plan_time = ""
+                if session is not None:
+                    plan_time = "{0:.3f}".format(1000 * measure_planning(
+                        session, words, node_max_num, strategy))
+                print("{0:>5} {1:>5} {2:>4} {3:>10} {4:>12.3f} {5:>12}".format(
+                    words_num, node_max_num, strategy, length,
+                    1000 * create_time, plan_time))
+
+    if session is not None:
+        session.close()
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Throughput benchmarks of the parser, the spellchecker, the query
+creator and the converter
+
+Each benchmark returns a list of results, a result is a dict with
+the benchmark name, the number of operations, the best time of
+the repeats and the additional parameters.
+"""
+from address_converter.converter import Converter
+from address_converter.neo4j_query_creator import (
+    MIX_STRATEGY,
+    SET_STRATEGY)
+from address_converter.parser import (
+    parse_address_names,
+    parse_house_nums,
+    parse_postcode,
+    tokenize_address)
+from address_converter.spellcheck import SpellChecker
+from address_converter.suggester import SymSpellSuggester
+from .query_creator import WORDS, measure_creation
+import timeit
+
+
+class StubExecutor(object):
+    """Return the same records for each query
+    """
+    def __init__(self, records_num=10):
+        self.records = [{
+            "AddrobjOffname": ["Москва", "Ленинградский"],
+            "AddrobjAoguid": ["aoguid-1", "aoguid-{0}".format(i)],
+            "AddrobjSocrname": ["г", "пр-кт"],
+            "AddrobjPostalcode": ["", "125040"]}
+            for i in range(records_num)]
+
+    def __enter__(self):
+        return self
+
+    def close(self):
+        pass
+
+    def execute_query(self, query, params=None):
+        return self.records
+
+
+def measure(name, func, items, repeat=3, **params):
+    """Measure the best time of applying func to all items
+
+    Results:
+        dict with the keys name, ops, seconds, ops_per_second and params
+    """
+    timer = timeit.Timer(lambda: [func(item) for item in items])
+    seconds = min(timer.repeat(repeat, 1))
+    result = {
+        "name": name,
+        "ops": len(items),
+        "seconds": seconds,
+        "ops_per_second": len(items) / seconds if seconds else None}
+    result.update(params)
+    return result
+
+
+def bench_parser(addresses, repeat=3):
+    return [
+        measure("parser.parse_address_names", parse_address_names,
+                addresses, repeat),
+        measure("parser.parse_house_nums", parse_house_nums,
+                addresses, repeat),
+        measure("parser.parse_postcode", parse_postcode,
+                addresses, repeat),
+        measure("parser.tokenize_address", tokenize_address,
+                addresses, repeat)]
+
+
+def bench_spellcheck(addresses, counted_dict, repeat=3):
+    words_lists = [parse_address_names(address.lower())
+                   for address in addresses]
+    results = []
+    for cache_size in (0, 100000):
+        spellchecker = SpellChecker(
+            SymSpellSuggester(counted_dict), counted_dict, cache_size)
+        results.append(measure(
+            "spellcheck.check_words", spellchecker.check_words,
+            words_lists, repeat, cache_size=cache_size))
+    return results
+
+
+def bench_query_creator(max_nodes=3, max_words=6, repeat=3):
+    results = []
+    for node_max_num in range(1, max_nodes + 1):
+        for words_num in range(node_max_num, max_words + 1):
+            for strategy in (MIX_STRATEGY, SET_STRATEGY):
+                seconds, length = measure_creation(
+                    WORDS[:words_num], node_max_num, strategy, repeat)
+                results.append({
+                    "name": "neo4j_query_creator.create_query",
+                    "ops": 1,
+                    "seconds": seconds,
+                    "ops_per_second": 1 / seconds if seconds else None,
+                    "words": words_num,
+                    "node_max_num": node_max_num,
+                    "match_strategy": strategy,
+                    "query_length": length})
+    return results
+
+
+def bench_converter(addresses, counted_dict, records_num=10, repeat=3):
+    converter = Converter(
+        spellchecker=SpellChecker(
+            SymSpellSuggester(counted_dict), counted_dict, 100000),
+        queryExecutor=StubExecutor(records_num),
+        stop_words_list=["россия"])
+    results = []
+    for addrobj_only, is_check_grammar in (
+            (True, False), (False, False), (False, True)):
+        results.append(measure(
+            "converter.convert",
+            lambda address: converter.convert(
+                address, addrobj_only, is_check_grammar),
+            addresses, repeat,
+            addrobj_only=addrobj_only,
+            is_check_grammar=is_check_grammar,
+            records=records_num))
+    return results
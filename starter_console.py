@@ -1,4 +1,18 @@
+from address_converter.config import config
 from address_converter.converter import Converter
+from address_converter.memory_graph import MemoryGraph
+from address_converter.metrics import ConverterMetrics
+from address_converter.neo4j_query_creator import QueryExecutor
+from address_converter.parser import create_stop_words_list
+from address_converter.prefilter import RootIndex
+from address_converter.recognizer import AddressRecognizer
+from address_converter.server import ConverterServer
+from address_converter.writers import (
+    FORMATS,
+    PARQUET_FORMAT,
+    SEMICOLON_FORMAT,
+    create_writer)
+from address_converter.pipeline import convert_parallel
 import argparse
 import sys
 
@@ -27,23 +41,173 @@ Address string parser
     parser.add_argument('--errorlog', '--el', default=0, choices=[0, 1],
                         help='write the error log',
                         type=int, dest='write_error_log')
+    parser.add_argument('--workers', '--wr', default=1, type=int,
+                        help='a number of worker processes, '
+                             'threads in the server mode',
+                        dest='workers')
+    parser.add_argument('--stats', '--st', default=0, choices=[0, 1],
+                        help='print the stage timings to stderr, '
+                             'with one worker process only',
+                        type=int, dest='stats')
+    parser.add_argument('--prometheus', '--pr', default=None,
+                        help='write the metrics in the Prometheus text '
+                             'format into the file, with one worker '
+                             'process only',
+                        dest='prometheus_filename')
+    parser.add_argument('--prefilter', '--pf', default=None,
+                        help='the file of the regions index, '
+                             'it is built if the file is absent',
+                        dest='prefilter_filename')
+    parser.add_argument('--graph', '--gf', default=None,
+                        help='the json lines file of MemoryGraph, '
+                             'convert without the database',
+                        dest='graph_filename')
+    parser.add_argument('--topk', '--tk', default=0, type=int,
+                        help='return only this number of the best '
+                             'addresses, 0 for all',
+                        dest='top_k')
+    parser.add_argument('--types', '--tp', default=0, choices=[0, 1],
+                        help='recognize the address object types and '
+                             'skip the objects of the other types',
+                        type=int, dest='types')
+    parser.add_argument('--format', '--fm', default=SEMICOLON_FORMAT,
+                        choices=FORMATS,
+                        help='the output format, parquet needs pyarrow',
+                        dest='output_format')
+    parser.add_argument('--flushinterval', '--fi', default=1.0, type=float,
+                        help='seconds between the output flushes, '
+                             'also on a stalled input except parquet',
+                        dest='flush_interval')
+    parser.add_argument('--serve', '--sv', default=0, choices=[0, 1],
+                        help='keep the converter warm and answer '
+                             'json requests, one per line',
+                        type=int, dest='serve')
+    parser.add_argument('--socket', '--so', default=None,
+                        help='serve on the Unix socket instead of '
+                             'stdin and stdout',
+                        dest='socket_path')
     args = parser.parse_args()
+    top_k = args.top_k or None
+    if (args.workers > 1 and not args.serve
+            and (args.stats or args.prometheus_filename)):
+        parser.error('--stats and --prometheus need one worker process')
+    if args.serve:
+        serve(args, top_k)
+        return
+    if args.output_format == PARQUET_FORMAT and args.outfile.isatty():
+        parser.error('parquet output needs an output file')
 
-    with Converter(write_error_log=args.write_error_log) as converter:
+    with create_writer(args.output_format,
+                       args.outfile,
+                       show_input=args.show_input,
+                       show_address=args.show_address,
+                       flush_interval=args.flush_interval,
+                       background_flush=(
+                           args.output_format != PARQUET_FORMAT)) as writer:
+        convert(args, top_k, writer)
+
+
+def convert(args, top_k, writer):
+    if args.workers > 1:
+        converter_kwargs = {'write_error_log': args.write_error_log}
+        if args.types:
+            converter_kwargs['recognizer'] = create_recognizer()
+        graph = load_graph(args)
+        if graph is not None:
+            converter_kwargs['queryExecutor'] = graph
+        if args.prefilter_filename:
+            converter_kwargs['prefilter'] = create_prefilter(args, graph)
+        results = convert_parallel(
+            args.infile,
+            args.workers,
+            converter_kwargs=converter_kwargs,
+            convert_kwargs={'is_check_grammar': args.check_grammar,
+                            'top_k': top_k})
+        for input_str, address_list in results:
+            writer.write(input_str, address_list)
+        return
+
+    metrics = create_metrics(args)
+    with Converter(queryExecutor=load_graph(args),
+                   write_error_log=args.write_error_log,
+                   metrics=metrics) as converter:
+        set_up_converter(args, converter)
         for input_str in args.infile:
             address_list = converter.convert(
                 address=input_str,
-                is_check_grammar=args.check_grammar)
-            for address in address_list:
-                result = []
-                if args.show_input:
-                    result.append(input_str[:-1])
-                if args.show_address:
-                    result.append(address.calc_address_string())
-                result.extend([addrobj.aoguid for addrobj
-                               in address.addr_path])
-                args.outfile.write(';'.join(result) + '\n')
-                args.outfile.flush()
+                is_check_grammar=args.check_grammar,
+                top_k=top_k)
+            writer.write(input_str, address_list)
+    write_metrics(args, metrics)
+
+
+def serve(args, top_k):
+    metrics = create_metrics(args)
+    with Converter(queryExecutor=load_graph(args),
+                   write_error_log=args.write_error_log,
+                   metrics=metrics) as converter:
+        set_up_converter(args, converter)
+        with ConverterServer(converter,
+                             max_workers=args.workers,
+                             is_check_grammar=bool(args.check_grammar),
+                             top_k=top_k) as server:
+            serve_requests(args, server)
+    write_metrics(args, metrics)
+
+
+def serve_requests(args, server):
+    if args.socket_path:
+        unix_server = server.create_unix_server(args.socket_path)
+        try:
+            unix_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            unix_server.server_close()
+    else:
+        server.serve(args.infile, args.outfile)
+
+
+def create_metrics(args):
+    if args.stats or args.prometheus_filename:
+        return ConverterMetrics(config.SLOW_QUERY_THRESHOLD)
+    return None
+
+
+def write_metrics(args, metrics):
+    if args.stats:
+        sys.stderr.write(metrics.summary())
+    if args.prometheus_filename:
+        with open(args.prometheus_filename, 'w') as output_file:
+            output_file.write(metrics.to_prometheus())
+
+
+def load_graph(args):
+    if args.graph_filename:
+        return MemoryGraph.load(args.graph_filename)
+    return None
+
+
+def create_prefilter(args, graph=None):
+    if graph is not None:
+        return RootIndex.load_or_build(args.prefilter_filename, graph)
+    with QueryExecutor(config.NEO4J_SERVER_ADDRESS,
+                       config.NEO4J_SERVER_LOGIN,
+                       config.NEO4J_SERVER_PASSWORD) as executor:
+        return RootIndex.load_or_build(args.prefilter_filename, executor)
+
+
+def set_up_converter(args, converter):
+    if args.prefilter_filename:
+        converter.prefilter = RootIndex.load_or_build(
+            args.prefilter_filename, converter.executor)
+    if args.types:
+        converter.recognizer = create_recognizer()
+
+
+def create_recognizer():
+    return AddressRecognizer(stop_words=create_stop_words_list(
+        config.STOP_WORDS_LIST_FILENAME))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+import asyncio
+from address_converter.converter import Converter
+from address_converter.memory_graph import MemoryGraph
+from address_converter.neo4j_query_creator import QueryError
+from address_converter.spellcheck import SpellChecker
+from address_converter.suggester import SymSpellSuggester
+
+
+FAIL_WORD = "fail"
+
+NODES = [
+    {"aoguid": "region", "parentguid": None, "offname": "Московская",
+     "socrname": "обл", "postalcode": None},
+    {"aoguid": "city", "parentguid": "region", "offname": "Химки",
+     "socrname": "г", "postalcode": "141400"},
+    {"aoguid": "street", "parentguid": "city", "offname": "Маршала Жукова",
+     "socrname": "ул", "postalcode": "141401"},
+    {"aoguid": "moscow", "parentguid": None, "offname": "Москва",
+     "socrname": "г", "postalcode": None},
+    {"aoguid": "district", "parentguid": "moscow", "offname": "Зеленоград",
+     "socrname": "г", "postalcode": None},
+    {"aoguid": "street_2", "parentguid": "district",
+     "offname": "Маршала Жукова", "socrname": "ул", "postalcode": "124460"},
+    {"label": "House", "parentguid": "street", "complexnum": "12",
+     "postalcode": "141401"},
+    {"label": "House", "parentguid": "street", "complexnum": "3а",
+     "postalcode": "141401"},
+    {"label": "HouseInt", "parentguid": "street", "intstart": 1,
+     "intend": 9, "postalcode": "141401"},
+]
+
+
+def aoguids(address_list):
+    return sorted([addrobj.aoguid for addrobj in address.addr_path]
+                  for address in address_list)
+
+
+def find_query_words(params):
+    """Get the address words of a parametrized query
+    """
+    if "words" in params:
+        return list(params["words"])
+    return [value for key, value in sorted(params.items())
+            if key.startswith("word")]
+
+
+def create_words_record(words):
+    words = sorted(set(words))
+    return {"AddrobjOffname": words,
+            "AddrobjAoguid": words,
+            "AddrobjSocrname": ["" for _ in words],
+            "AddrobjPostalcode": ["" for _ in words]}
+
+
+class WordsExecutor(object):
+    """Return one address object per word of the query parameters,
+    a query with the word "fail" raises an error
+    """
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def close(self):
+        pass
+
+    def execute_query(self, query, params=None):
+        self.queries.append(query)
+        if "batch" in params:
+            return [dict(create_words_record(item["words"]),
+                         InputIndex=item["index"])
+                    for item in params["batch"]]
+        words = find_query_words(params)
+        if FAIL_WORD in words:
+            raise QueryError("query failed")
+        return [create_words_record(words)]
+
+
+class AsyncWordsExecutor(WordsExecutor):
+    """WordsExecutor for AsyncConverter, it counts the queries in flight
+    """
+    def __init__(self):
+        super(AsyncWordsExecutor, self).__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def close(self):
+        pass
+
+    async def execute_query(self, query, params=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        return super(AsyncWordsExecutor, self).execute_query(query, params)
+
+
+def create_graph(nodes):
+    graph = MemoryGraph()
+    for node in nodes:
+        graph.add_node(node)
+    return graph
+
+
+def create_converter_kwargs(queryExecutor=None, **kwargs):
+    """Get the arguments of Converter with an empty spellchecker and
+    parametrized queries, on WordsExecutor by default
+    """
+    kwargs.setdefault("parametrized_queries", True)
+    return dict(
+        spellchecker=SpellChecker(SymSpellSuggester({}), {}),
+        queryExecutor=queryExecutor or WordsExecutor(),
+        stop_words_list=["stop"],
+        **kwargs)
+
+
+def create_converter(converter_class=Converter, **kwargs):
+    """Create the converter, see create_converter_kwargs
+    """
+    return converter_class(**create_converter_kwargs(**kwargs))
@@ -1,13 +1,15 @@
 import unittest
+import pickle
 import address_converter.address_objects as ao
 
 
-def create_addr_object(postfix):
+def create_addr_object(postfix, postalcode=None):
     return ao.AddrObject(
         aoguid='a_{0}'.format(postfix),
         name='n_{0}'.format(postfix),
         type_obj='t_{0}'.format(postfix),
-        postalcode='p_{0}'.format(postfix))
+        postalcode='p_{0}'.format(postfix) if postalcode is None
+        else postalcode)
 
 
 class TestAddress(unittest.TestCase):
@@ -16,28 +18,29 @@ class TestAddress(unittest.TestCase):
         addr_objects = []
         addr_objects.append(create_addr_object(1))
         addr_objects.append(create_addr_object(2))
-        address = ao.Address()
-        address.addr_path = addr_objects
+        address = ao.Address(addr_objects)
         self.assertEqual(address.postalcode, 'p_2')
+        self.assertEqual(ao.Address().postalcode, '')
 
     def test_calc_address_string(self):
         addr_objects = []
         addr_objects.append(create_addr_object(1))
         addr_objects.append(create_addr_object(2))
-        address = ao.Address()
-        address.addr_path = addr_objects
+        address = ao.Address(addr_objects)
         self.assertEqual(address.calc_address_string(),
                          't_1 n_1, t_2 n_2, p_2')
 
-        addr_objects[1].postalcode = None
+        addr_objects[1] = create_addr_object(2, postalcode='')
+        address = ao.Address(addr_objects)
         self.assertEqual(address.calc_address_string(),
                          't_1 n_1, t_2 n_2')
 
-        address.house_num = 123
+        address = ao.Address(addr_objects, house_num=123)
         self.assertEqual(address.calc_address_string(),
                          't_1 n_1, t_2 n_2, 123')
 
-        address.house_num_liter = 'abc'
+        address = ao.Address(
+            addr_objects, house_num=123, house_num_liter='abc')
         self.assertEqual(address.calc_address_string(),
                          't_1 n_1, t_2 n_2, 123 литера abc')
 
@@ -46,7 +49,33 @@ class TestAddress(unittest.TestCase):
         addr_objects.append(create_addr_object(1))
         addr_objects.append('wrong value')
         addr_objects.append(create_addr_object(2))
-        address = ao.Address()
-        address.addr_path = addr_objects
+        address = ao.Address(addr_objects)
         self.assertEqual(address.calc_address_string(),
                          't_1 n_1, t_2 n_2, p_2')
+
+    def test_immutable(self):
+        address = ao.Address([create_addr_object(1)])
+        with self.assertRaises(AttributeError):
+            address.house_num = 1
+        with self.assertRaises(AttributeError):
+            address.addr_path[0].postalcode = None
+        with self.assertRaises(AttributeError):
+            address.extra = None
+
+    def test_pickle(self):
+        address = ao.Address([create_addr_object(1)], 12, 'a')
+        copy = pickle.loads(pickle.dumps(address))
+        self.assertEqual(copy.addr_path, address.addr_path)
+        self.assertEqual(copy.calc_address_string(),
+                         address.calc_address_string())
+
+
+class TestAddrObjectIntern(unittest.TestCase):
+
+    def test_intern(self):
+        addrobj = ao.AddrObject.intern('guid', 'Москва', 'г', '')
+        self.assertIs(ao.AddrObject.intern('guid', 'Москва', 'г', ''), addrobj)
+        other = ao.AddrObject.intern('guid', 'Москва', 'г', '101000')
+        self.assertIsNot(other, addrobj)
+        self.assertIs(ao.AddrObject.intern('guid', 'Москва', 'г', '101000'),
+                      other)
@@ -0,0 +1,71 @@
+import unittest
+import asyncio
+from address_converter.async_converter import AsyncConverter
+from address_converter.cache import LRUCache
+from address_converter.metrics import ConverterMetrics
+from tests.helpers import AsyncWordsExecutor, create_converter
+
+
+async def iterate(items):
+    for item in items:
+        yield item
+
+
+class TestAsyncConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = AsyncWordsExecutor()
+        self.converter = create_converter(
+            AsyncConverter, queryExecutor=self.executor)
+
+    def test_convert(self):
+        async def convert():
+            async with self.converter as converter:
+                return await converter.convert("first, second")
+        result = asyncio.run(convert())
+        self.assertEqual(
+            [addrobj.aoguid for addrobj in result[0].addr_path],
+            ["first", "second"])
+
+    def test_convert_error(self):
+        result = asyncio.run(self.converter.convert("fail, second"))
+        self.assertEqual(result, [])
+
+    def test_aconvert_stream(self):
+        addresses = ["word{0} test{0}".format(s) for s in "abcdefghijkl"]
+
+        async def convert():
+            return [item async for item in self.converter.aconvert_stream(
+                iterate(addresses), concurrency=4)]
+        results = asyncio.run(convert())
+        self.assertEqual([address for address, _ in results], addresses)
+        self.assertEqual(self.executor.max_in_flight, 4)
+        for address, address_list in results:
+            self.assertEqual(
+                sorted(address.split()),
+                [addrobj.aoguid for addrobj in address_list[0].addr_path])
+
+    def test_converter_options(self):
+        cache = LRUCache(10)
+        metrics = ConverterMetrics()
+        converter = create_converter(
+            AsyncConverter,
+            queryExecutor=self.executor,
+            result_cache=cache,
+            metrics=metrics)
+
+        async def convert():
+            return [await converter.convert("first, second", top_k=1)
+                    for _ in range(2)]
+        first, second = asyncio.run(convert())
+        self.assertEqual(len(first), 1)
+        self.assertEqual(
+            [addrobj.aoguid for addrobj in second[0].addr_path],
+            ["first", "second"])
+        self.assertEqual(cache.info().hits, 1)
+        self.assertEqual(metrics.conversions, 2)
+        self.assertEqual(metrics.cache_hits, 1)
+
+    def test_no_sync_methods(self):
+        self.assertFalse(hasattr(self.converter, "convert_many"))
+        self.assertFalse(hasattr(self.converter, "iter_convert"))
@@ -0,0 +1,96 @@
+import unittest
+from address_converter.cache import CacheInfo, LRUCache, SqliteCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_put(self):
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("b", 0), 0)
+        self.assertEqual(cache.info(), CacheInfo(1, 2, 0, 2, 1))
+
+    def test_evict_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.info().evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl(self):
+        now = [0]
+        cache = LRUCache(2, ttl=10, timer=lambda: now[0])
+        cache.put("a", 1)
+        now[0] = 9
+        self.assertEqual(cache.get("a"), 1)
+        now[0] = 10
+        self.assertIsNone(cache.get("a"))
+        self.assertNotIn("a", cache)
+
+    def test_invalidate(self):
+        cache = LRUCache(3)
+        cache.put(("a", "b"), 1)
+        cache.put(("b", "c"), 2)
+        cache.put(("c", "d"), 3)
+        cache.invalidate(("c", "d"))
+        cache.invalidate_if(lambda key: "a" in key)
+        self.assertEqual(list(cache._data), [("b", "c")])
+        cache.put(("d", "e"), 4)
+        cache.invalidate_items_if(lambda key, value: value == 2)
+        self.assertEqual(list(cache._data), [("d", "e")])
+
+    def test_hit_rate(self):
+        cache = LRUCache(2)
+        self.assertEqual(cache.info().hit_rate, 0.0)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("b")
+        self.assertEqual(cache.info().hit_rate, 0.5)
+
+
+class TestSqliteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0]
+        self.cache = SqliteCache(
+            ":memory:", ttl=10, timer=lambda: self.now[0])
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_get_put(self):
+        self.cache.put(("a", 1), [1, 2])
+        self.assertEqual(self.cache.get(("a", 1)), [1, 2])
+        self.assertIsNone(self.cache.get(("b", 1)))
+        self.assertEqual(self.cache.info(), CacheInfo(1, 1, 0, None, 1))
+
+    def test_ttl(self):
+        self.cache.put("a", 1)
+        self.now[0] = 10
+        self.assertEqual(self.cache.get("a", 0), 0)
+        self.cache.purge_expired()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate(self):
+        self.cache.put(("a", "b"), 1)
+        self.cache.put(("b", "c"), 2)
+        self.cache.put(("c", "d"), 3)
+        self.cache.invalidate(("c", "d"))
+        self.cache.invalidate_if(lambda key: "a" in key)
+        self.assertEqual(self.cache.get(("b", "c")), 2)
+        self.assertEqual(len(self.cache), 1)
+        self.cache.invalidate_items_if(lambda key, value: value == 2)
+        self.assertEqual(len(self.cache), 0)
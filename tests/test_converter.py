@@ -0,0 +1,175 @@
+import unittest
+from address_converter.cache import LRUCache
+from address_converter.metrics import ConverterMetrics
+from address_converter.neo4j_query_creator import QueryError
+from tests.helpers import (
+    NODES,
+    WordsExecutor,
+    create_converter,
+    create_graph)
+
+
+def aoguids(address_list):
+    return [[addrobj.aoguid for addrobj in address.addr_path]
+            for address in address_list]
+
+
+class TestConverterResultCache(unittest.TestCase):
+
+    def test_cached_result(self):
+        converter = create_converter(result_cache=LRUCache(10))
+        first = converter.convert("first, second")
+        second = converter.convert("first,   second stop")
+        self.assertEqual(aoguids(first), [["first", "second"]])
+        self.assertEqual(aoguids(second), aoguids(first))
+        self.assertEqual(len(converter.executor.queries), 1)
+        self.assertEqual(converter.result_cache.info().hits, 1)
+
+    def test_key_flags(self):
+        converter = create_converter(result_cache=LRUCache(10))
+        converter.convert("first, second")
+        converter.convert("first, second", is_check_grammar=True)
+        self.assertEqual(len(converter.executor.queries), 2)
+
+    def test_errors_not_cached(self):
+        converter = create_converter(result_cache=LRUCache(10))
+        self.assertEqual(converter.convert("fail, second"), [])
+        self.assertEqual(converter.convert("fail, second"), [])
+        self.assertEqual(len(converter.executor.queries), 2)
+
+
+class QueryOnlyExecutor(object):
+    """Executor with the signature execute_query(query), it raises
+    the given error
+    """
+    def __init__(self, error=None):
+        self.queries = []
+        self.error = error
+
+    def close(self):
+        pass
+
+    def execute_query(self, query):
+        self.queries.append(query)
+        if self.error is not None:
+            raise self.error
+        return []
+
+
+class TestConverterExecuteQuery(unittest.TestCase):
+
+    def test_query_without_params(self):
+        executor = QueryOnlyExecutor()
+        converter = create_converter(
+            queryExecutor=executor, parametrized_queries=False)
+        self.assertEqual(converter.convert("first, second"), [])
+        self.assertEqual(len(executor.queries), 1)
+
+    def test_errors(self):
+        converter = create_converter(
+            queryExecutor=QueryOnlyExecutor(QueryError("failed")),
+            parametrized_queries=False)
+        self.assertEqual(converter.convert("first, second"), [])
+        converter = create_converter(
+            queryExecutor=QueryOnlyExecutor(KeyError("bug")),
+            parametrized_queries=False)
+        self.assertRaises(KeyError, converter.convert, "first, second")
+
+
+class StreamExecutor(WordsExecutor):
+    """Yield one record per word found in the query
+    """
+    def __init__(self):
+        super(StreamExecutor, self).__init__()
+        self.sent = 0
+        self.closed = False
+
+    def stream_query(self, query, params=None):
+        self.queries.append(query)
+        try:
+            for record in self.execute_query(query, params):
+                for aoguid in record["AddrobjAoguid"]:
+                    self.sent += 1
+                    yield {"AddrobjOffname": [aoguid],
+                           "AddrobjAoguid": [aoguid],
+                           "AddrobjSocrname": [""],
+                           "AddrobjPostalcode": [""]}
+        finally:
+            self.closed = True
+
+
+class TestConverterIterConvert(unittest.TestCase):
+
+    def test_iter_convert(self):
+        converter = create_converter()
+        converter.executor = StreamExecutor()
+        result = converter.iter_convert("first, second, third")
+        self.assertEqual(aoguids([next(result)]), [["first"]])
+        self.assertEqual(converter.executor.sent, 1)
+        result.close()
+        self.assertTrue(converter.executor.closed)
+
+    def test_first(self):
+        converter = create_converter()
+        result = list(converter.iter_convert("first, second", first=5))
+        self.assertEqual(aoguids(result), [["first", "second"]])
+        self.assertTrue(converter.executor.queries[-1].endswith("LIMIT 5"))
+
+    def test_error(self):
+        converter = create_converter()
+        self.assertEqual(list(converter.iter_convert("fail, second")), [])
+
+    def test_cached_result(self):
+        converter = create_converter(result_cache=LRUCache(10))
+        converter.convert("first, second")
+        self.assertEqual(
+            aoguids(converter.iter_convert("first, second", first=1)),
+            [["first", "second"]])
+        self.assertEqual(len(converter.executor.queries), 1)
+
+    def test_result_cache(self):
+        converter = create_converter(result_cache=LRUCache(10))
+        converter.executor = StreamExecutor()
+        # the result cut by first is not cached
+        list(converter.iter_convert("first, second", first=1))
+        self.assertEqual(len(converter.result_cache), 0)
+        self.assertEqual(
+            aoguids(converter.iter_convert("first, second")),
+            [["first"], ["second"]])
+        self.assertEqual(len(converter.result_cache), 1)
+        sent = converter.executor.sent
+        self.assertEqual(
+            aoguids(converter.convert("first, second")),
+            [["first"], ["second"]])
+        self.assertEqual(converter.executor.sent, sent)
+        self.assertEqual(converter.result_cache.info().hits, 1)
+
+
+class TestConverterConvertMany(unittest.TestCase):
+
+    def setUp(self):
+        self.converter = create_converter(
+            queryExecutor=create_graph(NODES),
+            result_cache=LRUCache(10),
+            metrics=ConverterMetrics())
+
+    def test_empty_trailing_batch(self):
+        results = list(self.converter.convert_many(
+            ["химки маршала", "", ""], batch_size=1))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(aoguids(results[0]), [["region", "city", "street"]])
+        self.assertEqual(results[1:], [[], []])
+
+    def test_result_cache(self):
+        addresses = ["химки маршала", "москва маршала"]
+        first = list(self.converter.convert_many(addresses))
+        second = list(self.converter.convert_many(addresses))
+        self.assertEqual([aoguids(r) for r in second],
+                         [aoguids(r) for r in first])
+        self.assertEqual(self.converter.result_cache.info().hits, 2)
+        self.assertEqual(self.converter.metrics.conversions, 4)
+        self.assertEqual(self.converter.metrics.cache_hits, 2)
+        self.assertEqual(
+            aoguids(self.converter.convert("химки маршала")),
+            [["region", "city", "street"]])
+        self.assertEqual(self.converter.result_cache.info().hits, 3)
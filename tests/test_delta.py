@@ -0,0 +1,263 @@
+import unittest
+from address_converter.cache import LRUCache
+from address_converter.converter import Converter
+from address_converter.delta import (
+    _FIND_ADDROBJS_QUERY,
+    _LINK_ADDROBJS_QUERIES,
+    _RETIRE_ADDROBJS_QUERY,
+    _UNLINK_ADDROBJS_QUERY,
+    CypherDeltaWriter,
+    FiasDelta,
+    MemoryGraphDeltaWriter,
+    apply_delta,
+    update_counted_dict)
+from address_converter.importer import _ADDROBJ_QUERY
+from address_converter.memory_graph import MemoryGraph
+from address_converter.parser import calc_biggest_word
+from address_converter.prefilter import RootIndex
+from address_converter.spellcheck import SpellChecker
+from address_converter.suggester import SymSpellSuggester
+from tests.helpers import NODES, aoguids
+
+
+COUNTED_DICT = {"московская": 10, "химки": 5, "маршала": 7, "жукова": 7,
+                "москва": 20, "зеленоград": 1}
+
+
+class FakeExecutor(object):
+    def __init__(self):
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append((query, params))
+        if "RETURN a.aoguid AS aoguid, a.parentguid" in query:
+            return [dict(node, biggestword=calc_biggest_word(node["offname"]))
+                    for node in NODES
+                    if node.get("aoguid") in params["aoguids"]]
+        return []
+
+
+class GraphExecutor(object):
+    """Keep the address objects, their relations and houses to answer
+    the queries of CypherDeltaWriter
+    """
+    def __init__(self, nodes):
+        self.addrobjs = {}
+        self.links = {}
+        self.houses = []
+        for node in nodes:
+            if node.get("label", "Addrobj") == "Addrobj":
+                self.addrobjs[node["aoguid"]] = dict(
+                    node, biggestword=calc_biggest_word(node["offname"]))
+                self.links[node["aoguid"]] = node["parentguid"] or "root"
+            else:
+                self.houses.append(node)
+
+    def execute_query(self, query, params=None):
+        if query == _FIND_ADDROBJS_QUERY:
+            return [self.addrobjs[aoguid] for aoguid in params["aoguids"]
+                    if aoguid in self.addrobjs]
+        rows = params["rows"]
+        if query == _ADDROBJ_QUERY:
+            self.addrobjs.update((row["aoguid"], row) for row in rows)
+        elif query == _UNLINK_ADDROBJS_QUERY:
+            for aoguid in rows:
+                self.links.pop(aoguid, None)
+        elif query in _LINK_ADDROBJS_QUERIES:
+            for aoguid in rows:
+                parentguid = self.addrobjs[aoguid]["parentguid"]
+                if parentguid is None or parentguid in self.addrobjs:
+                    self.links[aoguid] = parentguid or "root"
+        elif query == _RETIRE_ADDROBJS_QUERY:
+            # (d)-[:PARENT*0..]->(a) follows the relations
+            retired = set(rows)
+            for aoguid in list(self.addrobjs):
+                parent = aoguid
+                while parent in self.links and parent not in retired:
+                    parent = self.links[parent]
+                if parent in retired:
+                    del self.addrobjs[aoguid]
+                    self.links.pop(aoguid, None)
+            self.houses = [h for h in self.houses
+                           if h["parentguid"] in self.addrobjs]
+        else:
+            raise AssertionError("Unexpected query: {0}".format(query))
+        return []
+
+
+def create_delta():
+    delta = FiasDelta()
+    delta.add_addrobj_record({
+        "AOGUID": "street", "PARENTGUID": "city", "OFFNAME": "Жукова",
+        "SHORTNAME": "ул", "POSTALCODE": "141401", "ACTSTATUS": "0"})
+    delta.add_addrobj_record({
+        "AOGUID": "street", "PARENTGUID": "city", "OFFNAME": "Маршала Конева",
+        "SHORTNAME": "ул", "POSTALCODE": "141401", "ACTSTATUS": "1"})
+    delta.add_addrobj_record({
+        "AOGUID": "district", "PARENTGUID": "moscow", "OFFNAME": "Зеленоград",
+        "SHORTNAME": "г", "ACTSTATUS": "0"})
+    delta.add_addrobj_record({
+        "AOGUID": "city_2", "PARENTGUID": "region", "OFFNAME": "Дубна",
+        "SHORTNAME": "г", "POSTALCODE": "141980", "ACTSTATUS": "1"})
+    delta.add_house_record({
+        "AOGUID": "street", "HOUSENUM": "12", "ENDDATE": "2001-01-01"})
+    delta.add_house_record({
+        "AOGUID": "street", "HOUSENUM": "14", "ENDDATE": "2079-06-06"})
+    return delta
+
+
+class TestFiasDelta(unittest.TestCase):
+
+    def test_records(self):
+        delta = create_delta()
+        self.assertEqual(sorted(delta.addrobjs), ["city_2", "street"])
+        self.assertEqual(delta.addrobjs["street"]["biggestword"], "маршала")
+        self.assertEqual(delta.retired, {"district"})
+        self.assertEqual([h["complexnum"] for h in delta.houses], ["14"])
+        self.assertEqual(
+            [h["complexnum"] for h in delta.retired_houses], ["12"])
+
+    def test_update_counted_dict(self):
+        counted_dict = dict(COUNTED_DICT)
+        changes = update_counted_dict(
+            counted_dict,
+            [NODES[2], NODES[4]],
+            [{"offname": "Маршала Конева"}])
+        self.assertEqual(changes.changed, {"жукова"})
+        self.assertEqual(changes.added, {"конева"})
+        self.assertEqual(changes.removed, {"зеленоград"})
+        self.assertEqual(counted_dict["маршала"], 7)
+        self.assertEqual(counted_dict["жукова"], 6)
+        self.assertEqual(counted_dict["конева"], 1)
+
+        changes = update_counted_dict(
+            counted_dict, [{"offname": "Маршала Конева"}], [])
+        self.assertEqual(changes.removed, {"конева"})
+        self.assertNotIn("конева", counted_dict)
+
+
+class TestApplyDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = MemoryGraph()
+        for node in NODES:
+            self.graph.add_node(node)
+        self.counted_dict = dict(COUNTED_DICT)
+        self.converter = Converter(
+            spellchecker=SpellChecker(
+                SymSpellSuggester(self.counted_dict), self.counted_dict,
+                cache_size=10),
+            queryExecutor=self.graph,
+            stop_words_list=["stop"],
+            parametrized_queries=True,
+            result_cache=LRUCache(10),
+            prefilter=RootIndex.from_nodes(NODES))
+
+    def test_memory_graph(self):
+        convert = self.converter.convert
+        self.assertEqual(aoguids(convert("химки маршала")),
+                         [["region", "city", "street"]])
+        self.assertEqual(aoguids(convert("москва зеленоград")),
+                         [["moscow", "district"]])
+        self.assertEqual(aoguids(convert("московская химки")),
+                         [["region", "city"]])
+        self.assertEqual(convert("московская дубна"), [])
+        self.converter.spellchecker.check_word("химки")
+        self.converter.spellchecker.check_word("конева", True)
+
+        apply_delta(create_delta(), MemoryGraphDeltaWriter(self.graph),
+                    converter=self.converter)
+
+        # only the results with the changed objects are dropped
+        cache = self.converter.result_cache
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(aoguids(convert("московская химки")),
+                         [["region", "city"]])
+        self.assertEqual(cache.info().hits, 1)
+
+        result = convert("химки маршала")
+        self.assertEqual(result[0].addr_path[-1].name, "Маршала Конева")
+        self.assertEqual(convert("москва зеленоград"), [])
+        self.assertEqual(aoguids(convert("московская дубна 141980")),
+                         [["region", "city_2"]])
+        self.assertEqual(self.converter.prefilter.find_roots([], ["141980"]),
+                         ["region"])
+
+        self.assertEqual(self.counted_dict["конева"], 1)
+        self.assertNotIn("зеленоград", self.counted_dict)
+        spellchecker = self.converter.spellchecker
+        self.assertIn(("химки", False, 2), spellchecker.cache)
+        self.assertNotIn(("конева", True, 2), spellchecker.cache)
+        self.assertTrue(spellchecker.check_word("конева", True).is_good())
+
+        self.assertEqual(
+            sorted(h["complexnum"]
+                   for houses in self.graph._houses["street"].values()
+                   for h in houses),
+            ["14", "3а"])
+
+    def test_cypher(self):
+        executor = FakeExecutor()
+        counted_dict = dict(COUNTED_DICT)
+        delta = create_delta()
+        changes = apply_delta(
+            delta, CypherDeltaWriter(executor, batch_size=1), counted_dict)
+        self.assertEqual(changes.added, {"конева", "дубна"})
+        self.assertEqual(changes.removed, {"зеленоград"})
+
+        rows = {}
+        for query, params in executor.queries:
+            rows.setdefault(query, []).extend(
+                params.get("rows") or params.get("aoguids"))
+        queries = list(rows)
+        # the old objects are read first, the retired ones are deleted
+        # before the merge, houses are merged after their objects
+        self.assertIn("RETURN a.aoguid AS aoguid, a.parentguid", queries[0])
+        self.assertEqual(rows[queries[0]], ["city_2", "district", "street"])
+        self.assertTrue(queries[1].endswith("DETACH DELETE h"))
+        self.assertEqual(rows[queries[1]], delta.retired_houses)
+        self.assertIn("MERGE (a:Addrobj {aoguid: row.aoguid})", queries[2])
+        self.assertEqual(rows[queries[2]],
+                         [delta.addrobjs["city_2"], delta.addrobjs["street"]])
+        self.assertTrue(queries[3].endswith("DELETE r"))
+        self.assertEqual(rows[queries[4]], ["city_2", "street"])
+        # the retired objects are deleted after the relinking
+        self.assertTrue(queries[6].endswith("DETACH DELETE h, d"))
+        self.assertEqual(rows[queries[6]], ["district"])
+        self.assertIn("MERGE (h:House", queries[-1])
+        self.assertEqual(rows[queries[-1]], delta.houses)
+        self.assertEqual(len(executor.queries), 14)
+
+    def test_retired_descendants(self):
+        # Зеленоград is retired, one of its streets is moved to Москва
+        delta = FiasDelta()
+        delta.add_addrobj_record({
+            "AOGUID": "district", "PARENTGUID": "moscow",
+            "OFFNAME": "Зеленоград", "SHORTNAME": "г", "ACTSTATUS": "0"})
+        delta.add_addrobj_record({
+            "AOGUID": "city", "PARENTGUID": "region", "OFFNAME": "Химки",
+            "SHORTNAME": "г", "ACTSTATUS": "0"})
+        delta.add_addrobj_record({
+            "AOGUID": "street_3", "PARENTGUID": "district",
+            "OFFNAME": "Панфиловский", "SHORTNAME": "пр-кт",
+            "ACTSTATUS": "1"})
+        delta.add_addrobj_record({
+            "AOGUID": "street_2", "PARENTGUID": "moscow",
+            "OFFNAME": "Маршала Жукова", "SHORTNAME": "ул",
+            "ACTSTATUS": "1"})
+
+        executor = GraphExecutor(NODES)
+        apply_delta(delta, CypherDeltaWriter(executor, batch_size=1))
+        apply_delta(delta, MemoryGraphDeltaWriter(self.graph))
+
+        self.assertEqual(
+            sorted(n["aoguid"] for n in self.graph.iter_addrobjs()),
+            ["moscow", "region", "street_2"])
+        self.assertEqual(
+            sorted(n["aoguid"] for n in self.graph.iter_addrobjs()),
+            sorted(executor.addrobjs))
+        self.assertEqual(self.graph.find_root("street_2"), "moscow")
+        self.assertEqual(executor.links["street_2"], "moscow")
+        self.assertEqual(executor.houses, [])
+        self.assertEqual(self.graph._houses, {})
+        self.assertEqual(self.graph._house_ints, {})
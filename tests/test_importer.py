@@ -0,0 +1,220 @@
+import unittest
+import csv
+import io
+import os
+import shutil
+from address_converter.importer import (
+    CsvImportWriter,
+    CypherImportWriter,
+    JsonLinesWriter,
+    ThroughputReporter,
+    INDEX_STATEMENTS,
+    create_house_node,
+    import_fias,
+    iter_xml_records)
+from address_converter.memory_graph import MemoryGraph
+from address_converter.neo4j_query_creator import (
+    convert_to_addr_objects,
+    create_query)
+from tests.helpers import create_converter
+
+
+ADDROBJ_XML = """<?xml version="1.0" encoding="utf-8"?>
+<AddressObjects>
+<Object AOGUID="region" OFFNAME="Московская" SHORTNAME="обл" ACTSTATUS="1"/>
+<Object AOGUID="city" PARENTGUID="region" OFFNAME="Химки" SHORTNAME="г"
+ POSTALCODE="141400" ACTSTATUS="1"/>
+<Object AOGUID="street" PARENTGUID="city" OFFNAME="Маршала Жукова"
+ SHORTNAME="ул" POSTALCODE="141401" ACTSTATUS="1"/>
+<Object AOGUID="street" PARENTGUID="city" OFFNAME="Жукова"
+ SHORTNAME="ул" POSTALCODE="141401" ACTSTATUS="0"/>
+</AddressObjects>
+"""
+
+ADDROBJ_ALL_XML = """<?xml version="1.0" encoding="utf-8"?>
+<AddressObjects>
+<Object AOGUID="city" OFFNAME="Химки" SHORTNAME="г" ACTSTATUS="1"/>
+<Object AOGUID="street" PARENTGUID="city" OFFNAME="Жукова"
+ SHORTNAME="ул" ACTSTATUS="0"/>
+<Object AOGUID="street" PARENTGUID="city" OFFNAME="Маршала Жукова"
+ SHORTNAME="ул" ACTSTATUS="1"/>
+<Object AOGUID="old" PARENTGUID="city" OFFNAME="Ленина"
+ SHORTNAME="ул" ACTSTATUS="0"/>
+<Object AOGUID="old" PARENTGUID="city" OFFNAME="Ленина"
+ SHORTNAME="пер" ACTSTATUS="0"/>
+</AddressObjects>
+"""
+
+HOUSE_XML = """<?xml version="1.0" encoding="utf-8"?>
+<Houses>
+<House AOGUID="street" HOUSENUM="12" BUILDNUM="1" POSTALCODE="141401"
+ ENDDATE="2079-06-06"/>
+<House AOGUID="street" HOUSENUM="3А" POSTALCODE="141401"
+ ENDDATE="2079-06-06"/>
+<House AOGUID="street" HOUSENUM="5" POSTALCODE="141401"
+ ENDDATE="2001-01-01"/>
+</Houses>
+"""
+
+HOUSE_INT_XML = """<?xml version="1.0" encoding="utf-8"?>
+<HouseIntervals>
+<HouseInterval AOGUID="street" INTSTART="1" INTEND="9" POSTALCODE="141401"
+ ENDDATE="2079-06-06"/>
+</HouseIntervals>
+"""
+
+TEMP_DIRNAME = "importer_tmp"
+
+
+class FakeExecutor(object):
+    """Keep the aoguids of the inserted address objects to answer
+    the range queries
+    """
+    def __init__(self):
+        self.queries = []
+        self.aoguids = set()
+
+    def execute_query(self, query, params=None):
+        self.queries.append((query, params))
+        if "MERGE (a:Addrobj" in query:
+            self.aoguids.update(row["aoguid"] for row in params["rows"])
+        if "$after" in query:
+            return [{"Aoguid": aoguid} for aoguid in sorted(
+                a for a in self.aoguids if a > params["after"])][
+                    :params["limit"]]
+        return []
+
+
+class TestImporter(unittest.TestCase):
+
+    def setUp(self):
+        os.makedirs(TEMP_DIRNAME)
+        self.files = {}
+        for name, text in (("addrobj.xml", ADDROBJ_XML),
+                           ("house.xml", HOUSE_XML),
+                           ("houseint.xml", HOUSE_INT_XML)):
+            filename = os.path.join(TEMP_DIRNAME, name)
+            with io.open(filename, "w", encoding="utf8") as output_file:
+                output_file.write(text)
+            self.files[name] = filename
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_DIRNAME)
+
+    def import_fias(self, writer, **kwargs):
+        return import_fias(
+            writer,
+            [self.files["addrobj.xml"]],
+            [self.files["house.xml"]],
+            [self.files["houseint.xml"]],
+            **kwargs)
+
+    def test_iter_xml_records(self):
+        records = list(iter_xml_records(self.files["addrobj.xml"], "Object"))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[2]["OFFNAME"], "Маршала Жукова")
+
+    def test_create_house_node(self):
+        self.assertEqual(
+            create_house_node({"AOGUID": "a", "HOUSENUM": "12А",
+                               "BUILDNUM": "1", "STRUCNUM": "2"}),
+            {"label": "House", "parentguid": "a",
+             "complexnum": "12ак1с2", "postalcode": None,
+             "housenum": 12, "building": 1, "letter": "а",
+             "structure": 2})
+
+    def test_jsonl_memory_graph(self):
+        filename = os.path.join(TEMP_DIRNAME, "graph.jsonl")
+        counts = self.import_fias(JsonLinesWriter(filename))
+        self.assertEqual(counts, {"Addrobj": 3, "House": 2, "HouseInt": 1})
+
+        graph = MemoryGraph.load(filename)
+        query, params = create_query(
+            ["химки", "маршала"], ["3"], [], parametrized=True)
+        records = graph.execute_query(query, params)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["Houses"]["complexnum"], "3а")
+        self.assertEqual(
+            [a.aoguid for a in convert_to_addr_objects(records)[0].addr_path],
+            ["region", "city", "street"])
+
+    def test_csv(self):
+        directory = os.path.join(TEMP_DIRNAME, "csv")
+        writer = CsvImportWriter(directory)
+        self.import_fias(writer)
+        with io.open(os.path.join(directory, "addrobj.csv"),
+                     encoding="utf8") as input_file:
+            rows = list(csv.reader(input_file))
+        self.assertEqual(rows[0][0], "aoguid:ID(Addrobj)")
+        self.assertEqual(
+            rows[3],
+            ["street", "city", "Маршала Жукова", "ул", "141401", "маршала",
+             "Addrobj"])
+        with io.open(os.path.join(directory, "addrobj_root.csv"),
+                     encoding="utf8") as input_file:
+            self.assertEqual(list(csv.reader(input_file))[1],
+                             ["region", "root", "PARENT"])
+        self.assertIn("--nodes={0}".format(
+            os.path.join(directory, "house.csv")), writer.admin_import_args())
+
+    def test_cypher(self):
+        executor = FakeExecutor()
+        self.import_fias(CypherImportWriter(executor, batch_size=2))
+        queries = [query for query, _ in executor.queries]
+        self.assertEqual(queries[:len(INDEX_STATEMENTS)], INDEX_STATEMENTS)
+        batches = [params["rows"] for query, params in executor.queries
+                   if "rows" in params]
+        self.assertEqual([len(rows) for rows in batches], [2, 1, 2, 1])
+        self.assertEqual(batches[1][0]["biggestword"], "маршала")
+        # address objects are linked before the houses are inserted
+        link_index = [i for i, query in enumerate(queries)
+                      if "MERGE (r:Root)" in query][0]
+        self.assertLess(link_index, queries.index(
+            [q for q in queries if "House {" in q][0]))
+
+    def test_cypher_link_batches(self):
+        executor = FakeExecutor()
+        self.import_fias(CypherImportWriter(executor, batch_size=2))
+        link_batches = [params["batch"] for _, params in executor.queries
+                        if "batch" in params]
+        # each batch is linked to the roots and to the parents
+        self.assertEqual(link_batches, [["city", "region"],
+                                        ["city", "region"],
+                                        ["street"],
+                                        ["street"]])
+
+    def test_all_records(self):
+        addrobj_xml = os.path.join(TEMP_DIRNAME, "addrobj_all.xml")
+        with io.open(addrobj_xml, "w", encoding="utf8") as output_file:
+            output_file.write(ADDROBJ_ALL_XML)
+        directory = os.path.join(TEMP_DIRNAME, "csv")
+        counts = import_fias(CsvImportWriter(directory), [addrobj_xml],
+                             actual_only=False)
+        self.assertEqual(counts["Addrobj"], 3)
+        with io.open(os.path.join(directory, "addrobj.csv"),
+                     encoding="utf8") as input_file:
+            rows = list(csv.reader(input_file))[1:]
+        # neo4j-admin import fails on duplicate ids
+        self.assertEqual([(row[0], row[2]) for row in rows],
+                         [("city", "Химки"),
+                          ("street", "Маршала Жукова"),
+                          ("old", "Ленина")])
+
+    def test_capitalized_address(self):
+        filename = os.path.join(TEMP_DIRNAME, "graph.jsonl")
+        self.import_fias(JsonLinesWriter(filename))
+        converter = create_converter(
+            queryExecutor=MemoryGraph.load(filename))
+        self.assertEqual(
+            [[a.aoguid for a in address.addr_path]
+             for address in converter.convert("Химки, Маршала Жукова")],
+            [["region", "city", "street"]])
+
+    def test_reporter(self):
+        output = io.StringIO()
+        reporter = ThroughputReporter(output, interval=0)
+        self.import_fias(
+            JsonLinesWriter(os.path.join(TEMP_DIRNAME, "graph.jsonl")),
+            reporter=reporter)
+        self.assertIn("addrobj.xml: 4 records", output.getvalue())
+        self.assertIn("house.xml: 3 records", output.getvalue())
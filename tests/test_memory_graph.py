@@ -0,0 +1,166 @@
+import unittest
+import json
+import os
+from address_converter.converter import Converter
+from address_converter.memory_graph import MemoryGraph
+from address_converter.neo4j_query_creator import (
+    SET_STRATEGY,
+    convert_to_addr_objects,
+    create_query)
+from address_converter.spellcheck import SpellChecker
+from address_converter.suggester import SymSpellSuggester
+from tests.helpers import NODES, aoguids
+
+
+GRAPH_TEMP_FILENAME = "memory_graph_tmp.jsonl"
+
+class TestMemoryGraph(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(GRAPH_TEMP_FILENAME, "w") as outfile:
+            outfile.writelines(json.dumps(node) + "\n" for node in NODES)
+        cls.graph = MemoryGraph.load(GRAPH_TEMP_FILENAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(GRAPH_TEMP_FILENAME)
+
+    def execute(self, words, house_nums=(), postcodes=(), **kwargs):
+        query, params = create_query(
+            list(words), list(house_nums), list(postcodes),
+            parametrized=True, **kwargs)
+        return self.graph.execute_query(query, params)
+
+    def test_match_chain(self):
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(
+                self.execute(["химки", "маршала"]))),
+            [["region", "city", "street"]])
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(
+                self.execute(["москва", "маршала"]))),
+            [["moscow", "district", "street_2"]])
+
+    def test_match_depth(self):
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(
+                self.execute(["московская", "маршала"]))),
+            [["region", "city", "street"]])
+        self.assertEqual(self.execute(["маршала"], node_max_num=1), [])
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(
+                self.execute(["химки"], node_max_num=1))),
+            [["region", "city"]])
+
+    def test_set_strategy(self):
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(self.execute(
+                ["химки", "маршала", "химки"], match_strategy=SET_STRATEGY))),
+            [["region", "city", "street"]])
+
+    def test_postcode(self):
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(self.execute(
+                ["маршала", "москва", "химки"], postcodes=["124000"]))),
+            [["moscow", "district", "street_2"]])
+
+    def test_houses(self):
+        records = self.execute(["химки", "маршала"], house_nums=["3"])
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["Houses"]["complexnum"], "3а")
+        self.assertEqual(records[0]["HousesInt"]["intend"], 9)
+        records = self.execute(["химки", "маршала"], house_nums=["10"])
+        self.assertEqual(len(records), 1)
+        self.assertIsNone(records[0]["Houses"])
+        self.assertIsNone(records[0]["HousesInt"])
+
+    def test_house_numbers(self):
+        graph = MemoryGraph()
+        for node in NODES[:3]:
+            graph.add_node(node)
+        for complexnum in ["1", "1а", "117", "117к2"]:
+            graph.add_house("street", complexnum, None)
+        query, params = create_query(
+            ["химки", "маршала"], ["117"], [], parametrized=True)
+        self.assertEqual(
+            [r["Houses"]["complexnum"]
+             for r in graph.execute_query(query, params)],
+            ["117", "117к2"])
+        query, params = create_query(
+            ["химки", "маршала"], ["117/2", "1 а"], [], parametrized=True)
+        self.assertEqual(
+            [r["Houses"]["complexnum"]
+             for r in graph.execute_query(query, params)],
+            ["1а", "117к2"])
+
+    def test_house_structures(self):
+        graph = MemoryGraph()
+        for node in NODES[:3]:
+            graph.add_node(node)
+        for complexnum in ["12к2", "12с2", "12к1с2"]:
+            graph.add_house("street", complexnum, None)
+
+        def find(house_num):
+            query, params = create_query(
+                ["химки", "маршала"], [house_num], [], parametrized=True)
+            return sorted(r["Houses"]["complexnum"]
+                          for r in graph.execute_query(query, params))
+        self.assertEqual(find("12к2"), ["12к2"])
+        self.assertEqual(find("12 стр 2"), ["12к1с2", "12с2"])
+        self.assertEqual(find("12к1с2"), ["12к1с2"])
+
+    def test_order_by_score(self):
+        # the first found row has no house, the best row is found later
+        graph = MemoryGraph()
+        for node in NODES:
+            graph.add_node(node)
+        graph.add_house("street_2", "15", None)
+        query, params = create_query(
+            ["маршала", "москва", "химки"], ["15"], [], parametrized=True,
+            output_limit=1)
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(
+                graph.execute_query(query, params))),
+            [["region", "city", "street"]])
+        query, params = create_query(
+            ["маршала", "москва", "химки"], ["15"], [], parametrized=True,
+            output_limit=1, order_by_score=True)
+        records = graph.execute_query(query, params)
+        self.assertEqual(
+            aoguids(convert_to_addr_objects(records)),
+            [["moscow", "district", "street_2"]])
+        self.assertEqual(records[0]["Score"], 3)
+
+    def test_literal_query(self):
+        with self.assertRaises(ValueError):
+            self.graph.execute_query("MATCH (n) RETURN n")
+
+    def test_default_converter(self):
+        # MemoryGraph needs the parameters, the converter turns them on
+        converter = Converter(
+            spellchecker=SpellChecker(SymSpellSuggester({}), {}),
+            queryExecutor=self.graph,
+            stop_words_list=["stop"])
+        self.assertTrue(converter.parametrized_queries)
+        self.assertEqual(
+            aoguids(converter.convert("химки, маршала жукова")),
+            [["region", "city", "street"]])
+
+    def test_converter(self):
+        converter = Converter(
+            spellchecker=SpellChecker(SymSpellSuggester({}), {}),
+            queryExecutor=self.graph,
+            stop_words_list=["stop"],
+            parametrized_queries=True)
+        self.assertEqual(
+            aoguids(converter.convert("химки, маршала жукова")),
+            [["region", "city", "street"]])
+        self.assertEqual(
+            aoguids(converter.convert("Химки, Маршала Жукова")),
+            [["region", "city", "street"]])
+        self.assertEqual(
+            [aoguids(result) for result in converter.convert_many(
+                ["москва маршала", "нет", "химки маршала"], batch_size=2)],
+            [[["moscow", "district", "street_2"]],
+             [],
+             [["region", "city", "street"]]])
@@ -0,0 +1,95 @@
+import unittest
+from address_converter.metrics import (
+    ConverterMetrics,
+    Histogram,
+    EXECUTE_STAGE,
+    PARSE_STAGE,
+    SPELLCHECK_STAGE)
+from tests.helpers import create_converter
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_observe(self):
+        histogram = Histogram([1, 10])
+        for value in (0.5, 1, 5, 20):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.max, 20)
+        self.assertEqual(histogram.quantile(0.5), 1)
+        self.assertEqual(histogram.quantile(1.0), 20)
+
+
+class TestConverterMetrics(unittest.TestCase):
+
+    def test_convert_stages(self):
+        stats_list = []
+        metrics = ConverterMetrics(hooks=[stats_list.append])
+        converter = create_converter(metrics=metrics)
+        converter.convert("first, second")
+        converter.convert("fail, second")
+        converter.convert("first", is_check_grammar=True)
+
+        self.assertEqual(len(stats_list), 3)
+        self.assertNotIn(SPELLCHECK_STAGE, stats_list[0].stages)
+        self.assertIn(SPELLCHECK_STAGE, stats_list[2].stages)
+        self.assertEqual(stats_list[0].records, 1)
+        self.assertEqual(stats_list[0].query, converter.executor.queries[0])
+        self.assertEqual(stats_list[1].errors, [EXECUTE_STAGE])
+        self.assertEqual(metrics.conversions, 3)
+        self.assertEqual(metrics.stages[PARSE_STAGE].count, 3)
+        self.assertEqual(metrics.stages[SPELLCHECK_STAGE].count, 1)
+        self.assertEqual(metrics.errors[EXECUTE_STAGE], 1)
+        self.assertEqual(metrics.query_size.count, 3)
+
+    def test_iter_convert(self):
+        stats_list = []
+        metrics = ConverterMetrics(hooks=[stats_list.append])
+        converter = create_converter(metrics=metrics)
+        list(converter.iter_convert("first, second"))
+        list(converter.iter_convert("fail, second"))
+        result = converter.iter_convert("first")
+        next(result)
+        result.close()
+
+        self.assertEqual(len(stats_list), 3)
+        self.assertEqual(stats_list[0].records, 1)
+        self.assertEqual(stats_list[0].query, converter.executor.queries[0])
+        self.assertIn(EXECUTE_STAGE, stats_list[0].stages)
+        self.assertEqual(stats_list[1].errors, [EXECUTE_STAGE])
+        self.assertEqual(stats_list[2].records, 1)
+        self.assertEqual(metrics.conversions, 3)
+
+    def test_parse_error(self):
+        stats_list = []
+        metrics = ConverterMetrics(hooks=[stats_list.append])
+        converter = create_converter(metrics=metrics)
+        with self.assertRaises(Exception):
+            converter.convert(None)
+        self.assertEqual(stats_list[0].errors, [PARSE_STAGE])
+        self.assertEqual(metrics.conversions, 1)
+        self.assertEqual(metrics.errors[PARSE_STAGE], 1)
+
+    def test_slow_query_log(self):
+        metrics = ConverterMetrics(slow_query_threshold=0)
+        converter = create_converter(metrics=metrics)
+        with self.assertLogs("address_converter.slow_query") as logs:
+            converter.convert("first")
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("first", logs.output[0])
+
+    def test_prometheus(self):
+        metrics = ConverterMetrics()
+        create_converter(metrics=metrics).convert("first")
+        text = metrics.to_prometheus()
+        self.assertIn("# TYPE address_converter_stage_seconds histogram",
+                      text)
+        self.assertIn(
+            'address_converter_stage_seconds_count{stage="execute"} 1', text)
+        self.assertIn(
+            'address_converter_query_records_bucket{le="+Inf"} 1', text)
+        self.assertIn('address_converter_errors_total{stage="execute"} 0',
+                      text)
+        self.assertIn("address_converter_conversions_total 1", text)
+        self.assertIn("execute", metrics.summary())
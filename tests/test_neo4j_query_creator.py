@@ -1,6 +1,15 @@
 import unittest
+import threading
+from neo4j.exceptions import ServiceUnavailable, TransientError
 from address_converter.neo4j_query_creator import (
-    _create_mix_addr_query)
+    QueryExecutor,
+    _create_mix_addr_query,
+    _create_set_addr_query,
+    SET_STRATEGY,
+    create_query,
+    create_batch_item,
+    create_batch_query,
+    convert_to_grouped_addr_objects)
 
 
 class TestCreateMixAddrQuery(unittest.TestCase):
@@ -30,3 +39,272 @@ class TestCreateMixAddrQuery(unittest.TestCase):
             _create_mix_addr_query(["a", "b"], 2, 0, "a", "p", False),
             "(a0.p = 'a' AND (a1.p = 'b') OR "
             + "a0.p = 'b' AND (a1.p = 'a'))")
+
+
+class TestCreateBatchQuery(unittest.TestCase):
+
+    def test_create_batch_item(self):
+        self.assertEqual(
+            create_batch_item(3, ["a", "b", "a"], [], []),
+            {"index": 3, "words": ["a", "b"],
+             "postcode_re": None, "house_postcode_re": None,
+             "house_numbers": [], "houses": [], "house_ints": [],
+             "excluded_socrnames": None})
+
+    def test_create_batch_item_houses_postcodes(self):
+        item = create_batch_item(0, ["a", "b"], ["12", "3-a"], ["123456"])
+        self.assertEqual(item["postcode_re"], "^(123[0-9]{3,})$")
+        self.assertEqual(item["house_postcode_re"], "^(123456|)$")
+        self.assertEqual(item["house_numbers"], [3, 12])
+        self.assertEqual(item["houses"], [[3, 0, "a", 0], [12, 0, "", 0]])
+        self.assertEqual(item["house_ints"], [12, 3])
+
+    def test_query_does_not_depend_on_words(self):
+        query_1, params_1 = create_batch_query(
+            [create_batch_item(0, ["a", "b"], [], [])])
+        query_2, params_2 = create_batch_query(
+            [create_batch_item(0, ["c", "d", "e"], ["1"], []),
+             create_batch_item(1, ["f", "g"], [], ["123456"])])
+        self.assertEqual(query_1, query_2)
+        self.assertTrue(query_1.startswith("UNWIND $batch AS item"))
+        self.assertEqual(len(params_2["batch"]), 2)
+        self.assertEqual(params_2["limit"], 100)
+
+    def test_skip_short_items(self):
+        query, params = create_batch_query(
+            [create_batch_item(0, ["a"], [], []),
+             create_batch_item(1, ["a", "b"], [], [])])
+        self.assertEqual([item["index"] for item in params["batch"]], [1])
+        self.assertEqual(
+            create_batch_query([create_batch_item(0, ["a"], [], [])]),
+            ("", {}))
+
+
+def create_record(index, postfix):
+    return {
+        "InputIndex": index,
+        "AddrobjOffname": ["n_{0}".format(postfix)],
+        "AddrobjAoguid": ["a_{0}".format(postfix)],
+        "AddrobjSocrname": ["t_{0}".format(postfix)],
+        "AddrobjPostalcode": ["p_{0}".format(postfix)]}
+
+
+class TestConvertToGroupedAddrObjects(unittest.TestCase):
+
+    def test_group_by_index(self):
+        result = convert_to_grouped_addr_objects(
+            [create_record(2, 1), create_record(0, 2), create_record(2, 3)],
+            3)
+        self.assertEqual(
+            [[address.calc_address_string() for address in group]
+             for group in result],
+            [["t_2 n_2, p_2"], [], ["t_1 n_1, p_1", "t_3 n_3, p_3"]])
+
+    def test_wrong_result(self):
+        self.assertEqual(convert_to_grouped_addr_objects(None, 2), [[], []])
+
+
+class TestCreateParametrizedQuery(unittest.TestCase):
+
+    def test_query_does_not_depend_on_values(self):
+        query_1, params_1 = create_query(
+            ["a", "b"], {"1"}, ["123456"], parametrized=True)
+        query_2, params_2 = create_query(
+            ["c", "d"], ["2", "3-a"], ["654321"], parametrized=True)
+        self.assertEqual(query_1, query_2)
+        self.assertNotIn("'", query_1)
+        self.assertEqual(
+            params_2,
+            {"word0": "c", "word1": "d",
+             "postcode_re": "^(654[0-9]{3,})$",
+             "house_postcode_re": "^(654321|)$",
+             "house_numbers": [2, 3],
+             "houses": [[2, 0, "", 0], [3, 0, "a", 0]],
+             "house_ints": [2, 3]})
+
+    def test_values_are_not_quoted(self):
+        query, params = create_query(
+            ["o'neil", "b"], [], [], parametrized=True)
+        self.assertNotIn("o'neil", query)
+        self.assertIn("a0.biggestword = $word0", query)
+        self.assertEqual(params, {"word0": "o'neil", "word1": "b"})
+
+    def test_empty_query(self):
+        self.assertEqual(
+            create_query(["a"], [], [], parametrized=True), ("", {}))
+
+
+class TestCreateSetAddrQuery(unittest.TestCase):
+
+    def test_one_node(self):
+        self.assertEqual(
+            _create_set_addr_query("$words", 1, "a", "p"),
+            "(a0.p IN $words)")
+
+    def test_three_nodes(self):
+        self.assertEqual(
+            _create_set_addr_query("$words", 3, "a", "p"),
+            "(a0.p IN $words AND a1.p IN $words AND a2.p IN $words"
+            + " AND a0.p <> a1.p AND a0.p <> a2.p AND a1.p <> a2.p)")
+
+    def test_create_query(self):
+        query = create_query(
+            ["a", "b", "a"], [], [], match_strategy=SET_STRATEGY)
+        self.assertIn(
+            "(a0.biggestword IN ['a', 'b'] AND a1.biggestword IN ['a', 'b']"
+            + " AND a0.biggestword <> a1.biggestword)",
+            query)
+        self.assertEqual(
+            create_query(["a", "a"], [], [], match_strategy=SET_STRATEGY),
+            "")
+
+    def test_create_parametrized_query(self):
+        query, params = create_query(
+            ["a", "b", "c"], [], [],
+            parametrized=True, match_strategy=SET_STRATEGY)
+        self.assertIn("a0.biggestword IN $words", query)
+        self.assertEqual(params, {"words": ["a", "b", "c"]})
+
+    def test_linear_query_size(self):
+        words = ["word{0}".format(i) for i in range(10)]
+        size_5 = len(create_query(
+            words[:5], [], [], node_max_num=4, match_strategy=SET_STRATEGY))
+        size_10 = len(create_query(
+            words, [], [], node_max_num=4, match_strategy=SET_STRATEGY))
+        self.assertLess(size_10, size_5 * 2)
+
+
+class TestCreateRootsQuery(unittest.TestCase):
+
+    def test_create_query(self):
+        query = create_query(["a", "b"], [], [], roots=["r1", "r2"])
+        self.assertTrue(query.startswith(
+            "MATCH (s:Addrobj), (a0:Addrobj), (a1:Addrobj),"
+            + " rel = (s)<-[*0..1]-(a0)<-[*..2]-(a1)"
+            + "\nWHERE s.aoguid IN ['r1', 'r2']\n\tAND ("))
+        self.assertNotIn("Root", query)
+
+    def test_create_parametrized_query(self):
+        query, params = create_query(
+            ["a", "b"], [], [], parametrized=True, roots=["r1"])
+        self.assertIn("s.aoguid IN $roots", query)
+        self.assertEqual(params["roots"], ["r1"])
+
+    def test_no_roots(self):
+        self.assertEqual(
+            create_query(["a", "b"], [], [], roots=[]),
+            create_query(["a", "b"], [], []))
+
+
+class TestCreateScoreQuery(unittest.TestCase):
+
+    def test_create_query(self):
+        query = create_query(
+            ["a", "b"], ["1"], ["123456"], output_limit=8,
+            order_by_score=True)
+        self.assertIn(
+            "size([n in nodes(rel) where n:Addrobj"
+            + " AND n.biggestword IN ['a', 'b']])", query)
+        self.assertIn("a1.postalcode IN ['123456']", query)
+        self.assertIn("h IS NULL AND hi IS NULL", query)
+        self.assertTrue(query.endswith(
+            " as Score\nORDER BY Score DESC\nLIMIT 8"))
+
+    def test_create_parametrized_query(self):
+        query, params = create_query(
+            ["a", "b"], [], [], parametrized=True, order_by_score=True)
+        self.assertIn("n.biggestword IN $score_words", query)
+        self.assertNotIn("postalcode IN", query)
+        self.assertEqual(params["score_words"], ["a", "b"])
+
+
+class TestCreateHouseQuery(unittest.TestCase):
+
+    def test_literal_query(self):
+        query = create_query(["a", "b"], ["117", "12к1", "3а"], [])
+        self.assertNotIn("=~", query)
+        self.assertIn(
+            "\th.housenum IN [3, 12, 117]"
+            "\n\tAND (h.housenum = 3 AND h.letter = 'а'"
+            "\n\t OR h.housenum = 12 AND h.building = 1"
+            "\n\t OR h.housenum = 117)", query)
+        self.assertIn("ANY(num IN [117, 12, 3] WHERE", query)
+
+    def test_structure(self):
+        query = create_query(["a", "b"], ["12с2"], [])
+        self.assertIn(
+            "\n\tAND (h.housenum = 12 AND h.structure = 2)", query)
+
+    def test_numbers_only(self):
+        query = create_query(["a", "b"], ["117"], [])
+        self.assertIn("\th.housenum IN [117]\nOPTIONAL MATCH", query)
+
+
+class FakeSession(object):
+    def __init__(self, results):
+        self._results = results
+        self._closed = False
+
+    def run(self, query, params=None):
+        result = self._results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return iter(result)
+
+    def close(self):
+        self._closed = True
+
+    def closed(self):
+        return self._closed
+
+
+class FakeDriver(object):
+    def __init__(self, results):
+        self.results = results
+        self.sessions = []
+
+    def session(self):
+        self.sessions.append(FakeSession(self.results))
+        return self.sessions[-1]
+
+    def close(self):
+        pass
+
+
+class TestQueryExecutor(unittest.TestCase):
+
+    def create_executor(self, results, max_retries=2):
+        executor = QueryExecutor(
+            "bolt://localhost", "", "",
+            max_retries=max_retries, retry_delay=0)
+        executor._driver = FakeDriver(results)
+        return executor
+
+    def test_reuse_session(self):
+        executor = self.create_executor([[1], [2]])
+        self.assertEqual(executor.execute_query("q"), [1])
+        self.assertEqual(executor.execute_query("q"), [2])
+        self.assertEqual(len(executor._driver.sessions), 1)
+
+    def test_retry_transient_error(self):
+        executor = self.create_executor(
+            [TransientError("busy"), ServiceUnavailable("down"), [1]])
+        self.assertEqual(executor.execute_query("q"), [1])
+        self.assertEqual(len(executor._driver.sessions), 3)
+        self.assertTrue(executor._driver.sessions[0].closed())
+
+    def test_retries_exceeded(self):
+        executor = self.create_executor(
+            [TransientError("busy"), TransientError("busy")], max_retries=1)
+        with self.assertRaises(TransientError):
+            executor.execute_query("q")
+
+    def test_session_per_thread(self):
+        executor = self.create_executor([[1], [2]])
+        thread = threading.Thread(target=executor.execute_query, args=("q",))
+        thread.start()
+        thread.join()
+        executor.execute_query("q")
+        self.assertEqual(len(executor._driver.sessions), 2)
+        executor.close()
+        self.assertTrue(all(s.closed() for s in executor._driver.sessions))
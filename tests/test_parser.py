@@ -38,3 +38,58 @@ class TestParseHouseNums(unittest.TestCase):
                 "Россия, Набережные Челны,"
                 + " Комсомольская набережная, 30, кв 204"),
             {"30", "204"})
+
+
+class TestCalcBiggestWord(unittest.TestCase):
+
+    def test_biggest_word(self):
+        self.assertEqual(
+            parser.calc_biggest_word("Маршала Жукова"), "маршала")
+        self.assertEqual(
+            parser.calc_biggest_word("7-й Гвардейской дивизии"), "гвардейской")
+        self.assertEqual(parser.calc_biggest_word("123"), "")
+
+
+class TestTokenizeAddress(unittest.TestCase):
+
+    def test_tokenize(self):
+        text = "Россия, 420000 Казань, ул Баумана 5-а, 1234567890123"
+        result = parser.tokenize_address(text)
+        self.assertEqual(result.names, parser.parse_address_names(text))
+        self.assertEqual(result.house_nums, parser.parse_house_nums(text))
+        self.assertEqual(result.postcodes, ["420000", "123456", "789012"])
+
+    def test_without_house_nums(self):
+        result = parser.tokenize_address(
+            "Казань 12", with_house_nums=False)
+        self.assertEqual(result.names, ["Казань"])
+        self.assertEqual(result.house_nums, set())
+        self.assertEqual(result.postcodes, [])
+
+    def test_no_digits(self):
+        self.assertEqual(parser.parse_house_nums("Казань, Баумана"), set())
+
+
+class TestNormalizeHouseNum(unittest.TestCase):
+
+    def test_number(self):
+        self.assertEqual(parser.normalize_house_num("117"), (117, 0, "", 0))
+        self.assertIsNone(parser.normalize_house_num("влд"))
+
+    def test_building_and_letter(self):
+        for text in ["12/1", "12-1", "12к1", "12 корп 1"]:
+            self.assertEqual(
+                parser.normalize_house_num(text), (12, 1, "", 0), text)
+        for text in ["12а/1", "12ак1", "12-А-1"]:
+            self.assertEqual(
+                parser.normalize_house_num(text), (12, 1, "а", 0), text)
+        self.assertEqual(parser.normalize_house_num("12 а"), (12, 0, "а", 0))
+
+    def test_structure(self):
+        for text in ["12с2", "12стр2", "12 стр. 2", "12 строение 2"]:
+            self.assertEqual(
+                parser.normalize_house_num(text), (12, 0, "", 2), text)
+        self.assertEqual(parser.normalize_house_num("12к1с2"), (12, 1, "", 2))
+        self.assertEqual(parser.normalize_house_num("12ас2"), (12, 0, "а", 2))
+        self.assertNotEqual(parser.normalize_house_num("12с2"),
+                            parser.normalize_house_num("12к2"))
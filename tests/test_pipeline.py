@@ -0,0 +1,31 @@
+import unittest
+from address_converter.pipeline import convert_parallel
+from tests.helpers import create_converter_kwargs
+
+
+class TestConvertParallel(unittest.TestCase):
+
+    def test_keep_order(self):
+        suffixes = [a + b for a in "abcdefg" for b in "abcdefg"]
+        addresses = ["word{0} test{0}".format(s) for s in suffixes]
+        results = list(convert_parallel(
+            addresses,
+            workers=3,
+            converter_kwargs=create_converter_kwargs(),
+            chunk_size=4,
+            max_pending_chunks=2))
+        self.assertEqual([address for address, _ in results], addresses)
+        for address, address_list in results:
+            self.assertEqual(len(address_list), 1)
+            self.assertEqual(
+                sorted(address.split()),
+                [addrobj.aoguid for addrobj in address_list[0].addr_path])
+
+    def test_trailing_empty_lines(self):
+        addresses = ["word test", "\n", ""]
+        results = list(convert_parallel(
+            addresses,
+            workers=2,
+            converter_kwargs=create_converter_kwargs(),
+            chunk_size=2))
+        self.assertEqual([address for address, _ in results], addresses)
@@ -0,0 +1,116 @@
+import unittest
+import os
+from address_converter.converter import Converter
+from address_converter.memory_graph import MemoryGraph
+from address_converter.prefilter import RootIndex
+from address_converter.spellcheck import SpellChecker
+from address_converter.suggester import SymSpellSuggester
+from tests.helpers import NODES, aoguids
+
+
+INDEX_TEMP_FILENAME = "root_index_tmp.json"
+
+# the street is named as the other region
+VYBORG_NODES = [
+    {"aoguid": "lenobl", "parentguid": None, "offname": "Ленинградская",
+     "socrname": "обл", "postalcode": None},
+    {"aoguid": "vyborg_district", "parentguid": "lenobl",
+     "offname": "Выборгский", "socrname": "р-н", "postalcode": None},
+    {"aoguid": "vyborg", "parentguid": "vyborg_district",
+     "offname": "Выборг", "socrname": "г", "postalcode": "188800"},
+    {"aoguid": "moskovskaya_street", "parentguid": "vyborg",
+     "offname": "Московская", "socrname": "ул", "postalcode": "188800"},
+    {"aoguid": "mosobl", "parentguid": None, "offname": "Московская",
+     "socrname": "обл", "postalcode": None}]
+
+
+class FakeExecutor(object):
+    def __init__(self):
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append((query, params))
+        if "PostcodeArea" in query:
+            return [{"PostcodeArea": "141", "RootAoguid": "region"},
+                    {"PostcodeArea": "124", "RootAoguid": "moscow"}]
+        return [{"Word": "химки", "RootAoguid": "region"},
+                {"Word": "", "RootAoguid": "moscow"}]
+
+
+class TestRootIndex(unittest.TestCase):
+
+    def tearDown(self):
+        if os.path.exists(INDEX_TEMP_FILENAME):
+            os.remove(INDEX_TEMP_FILENAME)
+
+    def test_from_nodes(self):
+        index = RootIndex.from_nodes(NODES)
+        self.assertEqual(index.postcode_areas,
+                         {"141": ["region"], "124": ["moscow"]})
+        self.assertEqual(index.tokens,
+                         {"московская": ["region"], "химки": ["region"],
+                          "москва": ["moscow"], "зеленоград": ["moscow"]})
+
+    def test_find_roots(self):
+        index = RootIndex.from_nodes(NODES)
+        self.assertEqual(
+            index.find_roots(["Москва", "маршала"], ["141401"]), ["region"])
+        self.assertEqual(
+            index.find_roots(["Москва", "маршала"], ["999999"]), ["moscow"])
+        self.assertEqual(
+            index.find_roots(["Москва", "Московская"], []),
+            ["moscow", "region"])
+        self.assertIsNone(index.find_roots(["маршала"], []))
+
+    def test_load_or_build(self):
+        executor = FakeExecutor()
+        index = RootIndex.load_or_build(INDEX_TEMP_FILENAME, executor)
+        self.assertEqual(index.tokens, {"химки": ["region"]})
+        self.assertEqual(len(executor.queries), 2)
+        index = RootIndex.load_or_build(INDEX_TEMP_FILENAME, executor)
+        self.assertEqual(index.postcode_areas,
+                         {"141": ["region"], "124": ["moscow"]})
+        self.assertEqual(len(executor.queries), 2)
+
+    def test_converter(self):
+        graph = MemoryGraph()
+        for node in NODES:
+            graph.add_node(node)
+        converter = Converter(
+            spellchecker=SpellChecker(SymSpellSuggester({}), {}),
+            queryExecutor=graph,
+            stop_words_list=["stop"],
+            parametrized_queries=True,
+            prefilter=RootIndex.from_nodes(graph.iter_addrobjs()))
+        self.assertEqual(
+            aoguids(converter.convert("маршала жукова, москва, химки")),
+            [["moscow", "district", "street_2"],
+             ["region", "city", "street"]])
+        self.assertEqual(
+            aoguids(converter.convert("141401 маршала жукова, москва")),
+            [])
+        self.assertEqual(
+            aoguids(converter.convert("141401 маршала жукова, химки")),
+            [["region", "city", "street"]])
+
+    def test_street_named_as_region(self):
+        graph = MemoryGraph()
+        for node in VYBORG_NODES:
+            graph.add_node(node)
+        address = "выборгский район, г выборг, ул московская"
+        converter = Converter(
+            spellchecker=SpellChecker(SymSpellSuggester({}), {}),
+            queryExecutor=graph,
+            stop_words_list=["stop"],
+            parametrized_queries=True)
+        expected = aoguids(converter.convert(address))
+        self.assertEqual(len(expected), 2)
+
+        converter.prefilter = RootIndex.from_nodes(VYBORG_NODES)
+        self.assertEqual(
+            converter.prefilter.find_roots(["московская"], []), ["mosobl"])
+        self.assertEqual(aoguids(converter.convert(address)), expected)
+        self.assertIn(
+            aoguids(converter.convert(address, top_k=1))[0], expected)
+        self.assertEqual(
+            aoguids(converter.iter_convert(address)), expected)
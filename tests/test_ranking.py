@@ -0,0 +1,72 @@
+import unittest
+from address_converter.converter import Converter
+from address_converter.memory_graph import MemoryGraph
+from address_converter.ranking import Ranker
+from address_converter.spellcheck import SpellChecker
+from address_converter.suggester import SymSpellSuggester
+from tests.helpers import NODES
+
+
+def create_record(names, postcodes, houses=None):
+    return {"AddrobjOffname": names,
+            "AddrobjAoguid": names,
+            "AddrobjSocrname": ["" for _ in names],
+            "AddrobjPostalcode": postcodes,
+            "Houses": houses,
+            "HousesInt": None}
+
+
+class TestRanker(unittest.TestCase):
+
+    def setUp(self):
+        self.ranker = Ranker({"химки": 1000, "москва": 0})
+
+    def test_coverage(self):
+        words = ["Москва", "Химки", "маршала"]
+        full = create_record(["Химки", "Маршала Жукова"], ["", ""])
+        part = create_record(["Москва", "Зеленоград"], ["", ""])
+        self.assertGreater(self.ranker.score(full, words),
+                           self.ranker.score(part, words))
+        self.assertAlmostEqual(
+            self.ranker.score(full, words), 2 / 3.0 + 0.1 * 500 / 1500.0)
+
+    def test_postcode_and_house(self):
+        record = create_record(["Химки"], ["", "141401"])
+        record["AddrobjPostalcode"] = ["141401"]
+        self.assertEqual(self.ranker.score(record, [], (), ["141401"]), 1.0)
+        self.assertEqual(self.ranker.score(record, [], (), ["141000"]), 0.5)
+        self.assertEqual(self.ranker.score(record, [], (), ["124000"]), 0.0)
+        record["Houses"] = {"complexnum": "12"}
+        self.assertEqual(self.ranker.score(record, [], ["12"]), 0.5)
+        self.assertEqual(self.ranker.score(record, []), 0.0)
+
+    def test_rank(self):
+        records = [create_record(["Москва"], [""]),
+                   create_record(["Химки"], [""]),
+                   create_record(["Москва"], ["141401"])]
+        self.assertEqual(
+            self.ranker.rank(records, ["москва"], (), ["141401"]),
+            [records[2], records[0], records[1]])
+        self.assertEqual(
+            self.ranker.rank(records, ["химки"], top_k=1), [records[1]])
+        self.assertEqual(self.ranker.rank(None, ["химки"]), [])
+
+
+class TestConverterTopK(unittest.TestCase):
+
+    def test_convert(self):
+        graph = MemoryGraph()
+        for node in NODES:
+            graph.add_node(node)
+        converter = Converter(
+            spellchecker=SpellChecker(SymSpellSuggester({}), {}),
+            queryExecutor=graph,
+            stop_words_list=["stop"],
+            parametrized_queries=True)
+        address = "маршала жукова, москва, химки"
+        self.assertEqual(len(converter.convert(address)), 2)
+        result = converter.convert(address, top_k=1)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].addr_path[-1].aoguid, "street")
+        result = converter.convert("124460 " + address, top_k=1)
+        self.assertEqual(result[0].addr_path[-1].aoguid, "street_2")
@@ -0,0 +1,116 @@
+import unittest
+import io
+import os
+from address_converter.converter import Converter
+from address_converter.memory_graph import MemoryGraph
+from address_converter.neo4j_query_creator import create_query
+from address_converter.recognizer import (
+    AddressRecognizer,
+    HOUSE_TAG,
+    NAME_TAG,
+    POSTCODE_TAG,
+    STOP_TAG,
+    TYPE_TAG)
+from address_converter.spellcheck import SpellChecker
+from address_converter.suggester import SymSpellSuggester
+from tests.helpers import NODES, aoguids
+
+
+SOCRBASE_TEMP_FILENAME = "socrbase_tmp.xml"
+
+SOCRBASE_XML = """<?xml version="1.0" encoding="utf-8"?>
+<AddressObjectTypes>
+<AddressObjectType LEVEL="7" SCNAME="ул" SOCRNAME="Улица" KOD_T_ST="729"/>
+<AddressObjectType LEVEL="7" SCNAME="пр-кт" SOCRNAME="Проспект"
+ KOD_T_ST="728"/>
+</AddressObjectTypes>
+"""
+
+
+class TestAddressRecognizer(unittest.TestCase):
+
+    def setUp(self):
+        self.recognizer = AddressRecognizer(stop_words=["россия", "улица"])
+
+    def test_tag(self):
+        self.assertEqual(
+            [(t.tag, t.text, t.value) for t in self.recognizer.tag(
+                "Россия, 141401 г. Химки, улица Маршала Жукова д. 5 корп 2")],
+            [(STOP_TAG, "Россия", None),
+             (POSTCODE_TAG, "141401", None),
+             (TYPE_TAG, "г", "г"),
+             (NAME_TAG, "Химки", None),
+             (TYPE_TAG, "улица", "ул"),
+             (NAME_TAG, "Маршала", None),
+             (NAME_TAG, "Жукова", None),
+             (STOP_TAG, "д", None),
+             (HOUSE_TAG, "5", None),
+             (STOP_TAG, "корп", None),
+             (HOUSE_TAG, "2", None)])
+
+    def test_phrases(self):
+        result = self.recognizer.recognize(
+            "Дмитровский р-н, поселок городского типа Деденево, 5д")
+        self.assertEqual(result.names, ["Дмитровский", "Деденево"])
+        self.assertEqual(result.socrnames, ["пгт", "р-н"])
+        self.assertEqual(result.house_nums, {"5д"})
+
+    def test_split_types(self):
+        self.assertEqual(
+            self.recognizer.split_types(["Проспект", "Мира"]),
+            (["Мира"], ["пр-кт"]))
+
+    def test_from_socrbase(self):
+        with io.open(SOCRBASE_TEMP_FILENAME, "w",
+                     encoding="utf8") as output_file:
+            output_file.write(SOCRBASE_XML)
+        try:
+            recognizer = AddressRecognizer.from_socrbase(
+                SOCRBASE_TEMP_FILENAME)
+        finally:
+            os.remove(SOCRBASE_TEMP_FILENAME)
+        self.assertEqual(
+            recognizer.recognize("проспект Мира, г Москва").socrnames,
+            ["пр-кт"])
+
+
+class TestTypeFilter(unittest.TestCase):
+
+    def test_exclude_types(self):
+        recognizer = AddressRecognizer()
+        self.assertNotIn("г", recognizer.exclude_types(["пер"]))
+        self.assertIn("ул", recognizer.exclude_types(["пер"]))
+        self.assertEqual(recognizer.exclude_types(["обл"]),
+                         ["АО", "Респ", "край"])
+        self.assertEqual(recognizer.exclude_types(["г", "обл"]),
+                         ["АО", "Респ", "край"])
+        self.assertEqual(recognizer.exclude_types(["unknown"]), [])
+
+    def test_query(self):
+        query, params = create_query(
+            ["a", "b"], [], [], parametrized=True,
+            excluded_socrnames=["ул", "пер"])
+        self.assertIn("\n\tAND NOT a1.socrname IN $excluded_socrnames\n",
+                      query)
+        self.assertEqual(params["excluded_socrnames"], ["пер", "ул"])
+        self.assertIn(
+            "\n\tAND NOT a1.socrname IN ['ул']\n",
+            create_query(["a", "b"], [], [], excluded_socrnames=["ул"]))
+
+    def test_converter(self):
+        graph = MemoryGraph()
+        for node in NODES:
+            graph.add_node(node)
+        converter = Converter(
+            spellchecker=SpellChecker(SymSpellSuggester({}), {}),
+            queryExecutor=graph,
+            stop_words_list=["stop"],
+            parametrized_queries=True,
+            recognizer=AddressRecognizer())
+        self.assertEqual(
+            aoguids(converter.convert("г. Химки, улица Маршала")),
+            [["region", "city", "street"]])
+        self.assertEqual(converter.convert("г. Химки, переулок Маршала"), [])
+        self.assertEqual(
+            aoguids(converter.convert("Московская область, Химки")),
+            [["region", "city"]])
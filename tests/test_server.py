@@ -0,0 +1,118 @@
+import unittest
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+from address_converter.server import ConverterServer
+from tests.helpers import NODES, create_converter, create_graph
+
+
+class BlockingConverter(object):
+    """Wait for the event before converting "slow" addresses
+    """
+    def __init__(self, converter):
+        self.converter = converter
+        self.event = threading.Event()
+
+    def convert(self, address, **kwargs):
+        if address == "slow":
+            assert self.event.wait(5)
+            return []
+        self.event.set()
+        return self.converter.convert(address, **kwargs)
+
+
+def serve(server, requests):
+    infile = io.StringIO("".join(
+        json.dumps(request) + "\n" for request in requests))
+    outfile = io.StringIO()
+    server.serve(infile, outfile)
+    return [json.loads(line) for line in outfile.getvalue().splitlines()]
+
+
+class TestConverterServer(unittest.TestCase):
+
+    def setUp(self):
+        self.converter = create_converter(queryExecutor=create_graph(NODES))
+
+    def test_handle_request(self):
+        server = ConverterServer(self.converter)
+        response = server.handle_request(json.dumps(
+            {"id": "a", "address": "химки маршала"}))
+        self.assertEqual(response["id"], "a")
+        self.assertEqual(
+            [result["aoguid_path"] for result in response["results"]],
+            [["region", "city", "street"]])
+        self.assertEqual(response["results"][0]["postcode"], "141401")
+
+        response = server.handle_request(json.dumps({"id": 2}))
+        self.assertEqual(response, {"id": 2, "error": "KeyError: 'address'"})
+        self.assertIn("error", server.handle_request("{bad json"))
+
+    def test_top_k(self):
+        server = ConverterServer(self.converter)
+        response = server.handle_request(json.dumps(
+            {"id": 1, "address": "химки маршала", "top_k": 1}))
+        self.assertEqual(len(response["results"]), 1)
+        for top_k in [0, -1, 1.5, "2", True]:
+            response = server.handle_request(json.dumps(
+                {"id": 2, "address": "химки маршала", "top_k": top_k}))
+            self.assertEqual(response, {
+                "id": 2,
+                "error": "ValueError: top_k must be a positive integer "
+                         "or null"})
+        response = server.handle_request(json.dumps(
+            {"id": 3, "address": "химки маршала", "top_k": None}))
+        self.assertEqual(len(response["results"]), 1)
+
+    def test_out_of_order(self):
+        # the slow request waits for the next one, so it can complete
+        # only if both are in flight
+        converter = BlockingConverter(self.converter)
+        with ConverterServer(converter, max_workers=2) as server:
+            responses = serve(server, [
+                {"id": 1, "address": "slow"},
+                {"id": 2, "address": "москва зеленоград"}])
+        self.assertEqual([r["id"] for r in responses], [2, 1])
+        self.assertEqual(responses[0]["results"][0]["aoguid_path"],
+                         ["moscow", "district"])
+        self.assertEqual(responses[1]["results"], [])
+
+    def test_many_requests(self):
+        requests = [{"id": i, "address": "химки маршала"}
+                    for i in range(50)]
+        with ConverterServer(self.converter, max_workers=4,
+                             max_pending=3) as server:
+            responses = serve(server, requests)
+        self.assertEqual(sorted(r["id"] for r in responses), list(range(50)))
+        self.assertTrue(all(len(r["results"]) == 1 for r in responses))
+
+    def test_unix_socket(self):
+        if not hasattr(socket, "AF_UNIX"):
+            self.skipTest("no Unix sockets")
+        path = os.path.join(tempfile.mkdtemp(), "converter.sock")
+        with ConverterServer(self.converter) as server:
+            unix_server = server.create_unix_server(path)
+            thread = threading.Thread(target=unix_server.serve_forever)
+            thread.start()
+            try:
+                client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                client.connect(path)
+                client.sendall(json.dumps(
+                    {"id": 7, "address": "химки маршала"}).encode("utf8")
+                    + b"\n")
+                client.shutdown(socket.SHUT_WR)
+                response = json.loads(
+                    client.makefile("r", encoding="utf8").readline())
+                client.close()
+            finally:
+                unix_server.shutdown()
+                unix_server.server_close()
+                thread.join()
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))
+        self.assertEqual(response["id"], 7)
+        self.assertEqual(response["results"][0]["aoguid_path"],
+                         ["region", "city", "street"])
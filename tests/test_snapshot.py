@@ -0,0 +1,84 @@
+import unittest
+import json
+import os
+from address_converter.snapshot import Snapshot, build_snapshot
+from address_converter.spellcheck import (
+    CheckResult,
+    CheckStatus,
+    SpellChecker)
+
+
+PWL_TEMP_FILENAME = "snapshot_pwl_tmp.txt"
+COUNTED_TEMP_FILENAME = "snapshot_counted_tmp.json"
+SNAPSHOT_TEMP_FILENAME = "snapshot_tmp.bin"
+
+
+class TestSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.counted_dict = {
+            "москва": 500, "маршала": 100, "жукова": 50,
+            "моск": 10, "ва": 10, "моква": 50, "виноградный": 70,
+            "виногрыдный": 1, "московская": 10, "обл": 20}
+        with open(PWL_TEMP_FILENAME, "w") as outfile:
+            outfile.writelines(
+                line + '\n' for line in list(cls.counted_dict) + ["ленина"])
+        with open(COUNTED_TEMP_FILENAME, "w") as outfile:
+            json.dump(cls.counted_dict, outfile)
+        build_snapshot(
+            PWL_TEMP_FILENAME, COUNTED_TEMP_FILENAME, SNAPSHOT_TEMP_FILENAME)
+        cls.snapshot = Snapshot(SNAPSHOT_TEMP_FILENAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(PWL_TEMP_FILENAME)
+        os.remove(COUNTED_TEMP_FILENAME)
+        os.remove(SNAPSHOT_TEMP_FILENAME)
+
+    def test_counted_dict(self):
+        counted_dict = self.snapshot.counted_dict
+        self.assertEqual(dict(counted_dict), self.counted_dict)
+        self.assertEqual(len(counted_dict), len(self.counted_dict))
+        self.assertEqual(counted_dict.get("москва"), 500)
+        self.assertEqual(counted_dict.get("ленина", -1), -1)
+        self.assertEqual(counted_dict.get(None, -1), -1)
+        self.assertIn("ленина", list(counted_dict.all_words()))
+
+    def test_prefixes(self):
+        counted_dict = self.snapshot.counted_dict
+        self.assertTrue(counted_dict.has_prefix("моск"))
+        self.assertTrue(counted_dict.has_prefix("московская"))
+        self.assertTrue(counted_dict.has_prefix("лен"))
+        self.assertFalse(counted_dict.has_prefix("московскаяа"))
+        self.assertFalse(counted_dict.has_prefix("я"))
+        self.assertEqual(counted_dict.max_count(), 500)
+
+    def test_suggest(self):
+        suggester = self.snapshot.create_suggester()
+        self.assertEqual(
+            suggester.suggest("виногрXдный"),
+            ["виноградный", "виногрыдный"])
+        self.assertEqual(suggester.suggest("ленинX"), ["ленина"])
+        self.assertEqual(suggester.suggest("testtesttest"), [])
+
+    def test_load_spellchecker(self):
+        sh = SpellChecker.load_snapshot(SNAPSHOT_TEMP_FILENAME)
+        self.assertEqual(
+            sh.check_word("винXгрыдный"),
+            CheckResult(CheckStatus.MISSPELLING,
+                        "виногрыдный",
+                        "винXгрыдный",
+                        1))
+        self.assertEqual(
+            sh.check_words(["виногра", "дный", "моск", "ва", "жуко", "ва"]),
+            ["виноградный", "москва", "жукова"])
+        # the prefixes are read from the snapshot, no set is built
+        prefixes, max_dict_score = sh._get_index()
+        self.assertNotIsInstance(prefixes, set)
+        self.assertIn("виногр", prefixes)
+        self.assertNotIn("виногрх", prefixes)
+        self.assertEqual(max_dict_score, 500)
+
+    def test_wrong_file(self):
+        with self.assertRaises(ValueError):
+            Snapshot(COUNTED_TEMP_FILENAME)
@@ -5,6 +5,7 @@ from address_converter.spellcheck import (
     CheckStatus,
     SpellChecker,
     _max_score)
+from address_converter.suggester import SymSpellSuggester
 import os
 
 
@@ -74,6 +75,25 @@ class TestSpellChecker(unittest.TestCase):
             self.sh.check_word("a"),
             CheckResult.new_not_found("a"))
 
+    def test_check_word_cache(self):
+        sh = SpellChecker(
+            enchant_dict=self.sh.enchant_dict,
+            counted_dict=self.sh.counted_dict,
+            cache_size=2)
+        for _ in range(3):
+            self.assertEqual(
+                sh.check_word("виногрXдный"),
+                CheckResult(CheckStatus.MISSPELLING,
+                            "виноградный",
+                            "виногрXдный",
+                            70))
+        self.assertEqual(sh.cache_info().hits, 2)
+        self.assertEqual(sh.cache_info().misses, 1)
+        sh.check_word("москва")
+        sh.check_word("москва", True)
+        self.assertEqual(sh.cache_info().evictions, 1)
+        self.assertIsNone(self.sh.cache_info())
+
     def test_remix_words_splited_word(self):
         self.assertEqual(
             self.sh._shuffle_symbols("виноград", "ный"),
@@ -184,3 +204,48 @@ class TestSpellChecker(unittest.TestCase):
         self.assertEqual(
             self.sh.check_words(["aaabbb"]),
             ["aaabbb"])
+
+
+class TestSpellCheckerBudget(unittest.TestCase):
+
+    def setUp(self):
+        counted_dict = {
+            "москва": 500, "маршала": 100, "жукова": 50, "ва": 10}
+        self.sh = SpellChecker(SymSpellSuggester(counted_dict), counted_dict)
+        self.sh_no_index = SpellChecker(
+            SymSpellSuggester(counted_dict), counted_dict,
+            prefix_index=False)
+
+    def test_prefix_index(self):
+        for word_1, word_2 in (("марш", "алажукова"),
+                               ("москва", "ва"),
+                               ("маршала", "жукова3")):
+            self.assertEqual(
+                self.sh._shuffle_symbols(word_1, word_2),
+                self.sh_no_index._shuffle_symbols(word_1, word_2))
+
+    def test_max_operations(self):
+        words = ["маршалажукова", "москвава"]
+        self.assertEqual(
+            self.sh.check_words(words),
+            ["маршала", "жукова", "москва", "ва"])
+        # only the single word checks are left
+        self.assertEqual(
+            self.sh.check_words(words, max_operations=0), ["москва"])
+        self.sh.max_operations = 0
+        self.assertEqual(
+            self.sh.check_words(["москва", "жукова"]), ["москва", "жукова"])
+
+    def test_time_budget(self):
+        self.assertEqual(
+            self.sh.check_words(["маршалажукова"], time_budget=0), [])
+
+    def test_reset_index(self):
+        self.assertEqual(
+            self.sh._shuffle_symbols("москвабаг"), (None, 0))
+        self.sh.counted_dict["баг"] = 1
+        self.sh.reset_index()
+        self.assertEqual(
+            self.sh._shuffle_symbols("москвабаг"),
+            ([CheckResult.new_good("москва", 500),
+              CheckResult.new_good("баг", 1)], 500))
@@ -0,0 +1,81 @@
+import unittest
+from address_converter.spellcheck import (
+    CheckResult,
+    CheckStatus,
+    SpellChecker)
+from address_converter.suggester import (
+    SymSpellSuggester,
+    edit_distance)
+
+
+COUNTED_DICT = {
+    "москва": 500, "маршала": 100, "жукова": 50,
+    "моск": 10, "ва": 10, "моква": 50, "виноградный": 70,
+    "виногрыдный": 1, "московская": 10, "обл": 20,
+    "aaabbb": 10, "aaa": 100, "bbb": 100}
+
+
+class TestEditDistance(unittest.TestCase):
+
+    def test_distance(self):
+        self.assertEqual(edit_distance("москва", "москва"), 0)
+        self.assertEqual(edit_distance("москва", "моква"), 1)
+        self.assertEqual(edit_distance("москва", "мсоква"), 1)
+        self.assertEqual(edit_distance("москва", "маскав"), 2)
+        self.assertEqual(edit_distance("", "ва"), 2)
+
+    def test_max_distance(self):
+        self.assertEqual(edit_distance("москва", "жукова", 2), 3)
+        self.assertEqual(edit_distance("москва", "ва", 1), 2)
+
+
+class TestSymSpellSuggester(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.suggester = SymSpellSuggester(COUNTED_DICT)
+
+    def test_suggest_nearest(self):
+        self.assertEqual(
+            self.suggester.suggest("винXгрыдный"), ["виногрыдный"])
+        self.assertEqual(
+            self.suggester.suggest("жукXва"), ["жукова"])
+
+    def test_suggest_sorted_by_frequency(self):
+        self.assertEqual(
+            self.suggester.suggest("виногрXдный"),
+            ["виноградный", "виногрыдный"])
+
+    def test_suggest_long_word(self):
+        self.assertEqual(
+            self.suggester.suggest("виноградныйX"), ["виноградный"])
+
+    def test_not_found(self):
+        self.assertEqual(self.suggester.suggest("testtesttest"), [])
+        self.assertEqual(self.suggester.suggest(""), [])
+
+
+class TestSpellCheckerSymSpell(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.sh = SpellChecker(
+            enchant_dict=SymSpellSuggester(COUNTED_DICT),
+            counted_dict=COUNTED_DICT)
+
+    def test_check_word(self):
+        self.assertEqual(
+            self.sh.check_word("виногрXдный"),
+            CheckResult(CheckStatus.MISSPELLING,
+                        "виноградный",
+                        "виногрXдный",
+                        70))
+        self.assertEqual(
+            self.sh.check_word("a"),
+            CheckResult.new_not_found("a"))
+
+    def test_check_words(self):
+        self.assertEqual(
+            self.sh.check_words(["виногра", "дный", "моск", "ва", "жуко", "ва"]),
+            ["виноградный", "москва", "жукова"])
+        self.assertEqual(
+            self.sh.check_words(["москвавX"]),
+            ["москва"])
@@ -0,0 +1,113 @@
+import unittest
+import io
+import json
+import time
+from address_converter.address_objects import AddrObject, Address
+from address_converter.writers import (
+    CSV_FORMAT,
+    JSONL_FORMAT,
+    PARQUET_FORMAT,
+    SEMICOLON_FORMAT,
+    create_writer)
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+ADDRESS = Address([
+    AddrObject("a1", "Москва", "г", ""),
+    AddrObject("a2", "Тверская", "ул", "125009")])
+
+
+class FakeTimer(object):
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class TestWriters(unittest.TestCase):
+
+    def test_semicolon(self):
+        output = io.StringIO()
+        with create_writer(SEMICOLON_FORMAT, output,
+                           show_input=1, show_address=1) as writer:
+            writer.write("москва тверская\n", [ADDRESS, ADDRESS])
+            writer.write("нет\n", [])
+        self.assertEqual(
+            output.getvalue(),
+            "москва тверская;г Москва, ул Тверская, 125009;a1;a2\n" * 2)
+
+    def test_semicolon_ids_only(self):
+        output = io.StringIO()
+        with create_writer(SEMICOLON_FORMAT, output) as writer:
+            writer.write("москва тверская\n", [ADDRESS])
+        self.assertEqual(output.getvalue(), "a1;a2\n")
+
+    def test_buffering(self):
+        output = io.StringIO()
+        timer = FakeTimer()
+        writer = create_writer(SEMICOLON_FORMAT, output, batch_size=3,
+                               flush_interval=10, timer=timer)
+        writer.write("a\n", [ADDRESS, ADDRESS])
+        self.assertEqual(output.getvalue(), "")
+        writer.write("b\n", [ADDRESS])
+        self.assertEqual(output.getvalue().count("\n"), 3)
+        writer.write("c\n", [ADDRESS])
+        self.assertEqual(output.getvalue().count("\n"), 3)
+        timer.time = 10
+        writer.write("d\n", [])
+        self.assertEqual(output.getvalue().count("\n"), 4)
+        writer.close()
+
+    def test_background_flush(self):
+        output = io.StringIO()
+        writer = create_writer(SEMICOLON_FORMAT, output,
+                               flush_interval=0.01, background_flush=True)
+        writer.write("a\n", [ADDRESS])
+        # no more input, the thread writes the buffered row
+        for _ in range(500):
+            if output.getvalue():
+                break
+            time.sleep(0.01)
+        self.assertEqual(output.getvalue(), "a1;a2\n")
+        writer.close()
+        self.assertIsNone(writer._flush_thread)
+
+    def test_csv(self):
+        output = io.StringIO()
+        with create_writer(CSV_FORMAT, output) as writer:
+            writer.write("москва, тверская\n", [ADDRESS])
+        self.assertEqual(
+            output.getvalue(),
+            "input,address,aoguid_path,postcode\n"
+            + '"москва, тверская","г Москва, ул Тверская, 125009",'
+            + "a1;a2,125009\n")
+
+    def test_jsonl(self):
+        output = io.StringIO()
+        with create_writer(JSONL_FORMAT, output) as writer:
+            writer.write("москва тверская\n", [ADDRESS])
+        self.assertEqual(
+            json.loads(output.getvalue()),
+            {"input": "москва тверская",
+             "address": "г Москва, ул Тверская, 125009",
+             "aoguid_path": ["a1", "a2"],
+             "postcode": "125009"})
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        output = io.BytesIO()
+        with create_writer(PARQUET_FORMAT, output, batch_size=1) as writer:
+            writer.write("москва тверская\n", [ADDRESS, ADDRESS])
+        table = pyarrow.parquet.read_table(io.BytesIO(output.getvalue()))
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column("aoguid_path").to_pylist(),
+                         [["a1", "a2"], ["a1", "a2"]])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            create_writer("xml", io.StringIO())